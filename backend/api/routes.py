@@ -4,12 +4,73 @@ Uses Photon (geocoding) + OSRM (routing) — fully free, no API keys.
 All thresholds and labels from config.constants — no hard-coding.
 """
 
-from fastapi import APIRouter, HTTPException
-from api.schemas import PredictionRequest, PredictionResponse, RouteResult, IncidentRequest, IncidentResponse
-from services.geocoding_service import geocode
-from services.routing_service import fetch_routes
-from services.feature_engineering import build_features
-from services.ml_service import encode_weather, predict_delay
+import asyncio
+import math
+from typing import Literal, Optional, Sequence
+
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from api.schemas import (
+    PredictionRequest,
+    PredictionResponse,
+    RouteResult,
+    CompactPredictionResponse,
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    BatchItemResult,
+    MatrixRequest,
+    MatrixResponse,
+    SweepRequest,
+    SweepResponse,
+    SweepRouteResult,
+    DepartureWindow,
+    IncidentRequest,
+    IncidentResponse,
+    IncidentInfo,
+    IncidentListResponse,
+)
+from services.geocoding_service import (
+    cached_geocode,
+    geocode_async,
+    geocode_many,
+    geocode_cache_stats,
+    normalize_place_name,
+)
+from services.routing_service import (
+    cached_routes,
+    fetch_routes_async,
+    fetch_table_async,
+    route_cache_stats,
+    straight_line_route,
+)
+from services.feature_engineering import (
+    DAYS_OF_WEEK,
+    IS_WEEKEND_BY_DAY,
+    build_feature_matrix,
+    build_feature_matrix_batch,
+    build_feature_matrix_columns,
+    time_context,
+)
+from services.geometry import prepare_geometry, response_vertices, split_segments
+from services import ml_service
+from services.ml_service import encode_weather, model_feature_names, model_version
+from services.inference_executor import predict_delay_async
+from services.incident_store import incident_store
+from services import response_cache
+from services.singleflight import SingleFlight
+from services.deadline import DeadlineExceeded, deadline_scope, within_deadline
+from services.streaming import MEDIA_TYPES, Emit, stream_events
+from services.timing import stage
+from config.settings import (
+    BATCH_CONCURRENCY,
+    STREAM_QUEUE_SIZE,
+    REQUEST_DEADLINE_MS,
+    REQUEST_DEADLINE_MAX_MS,
+    SEGMENT_LENGTH_M,
+    SEGMENT_MAX_PER_ROUTE,
+)
 from config.constants import (
     MAX_ROUTES,
     HIGH_DELAY_THRESHOLD_MIN,
@@ -31,10 +92,19 @@ from config.constants import (
     PEAK_HOUR_EVENING_START,
     PEAK_HOUR_EVENING_END,
     WEATHER_IMPACT_TEMPLATES,
+    SWEEP_WINDOW_TOLERANCE_MIN,
+    COMPACT_MEDIA_TYPE,
+    COMPACT_SCHEMA_VERSION,
+    INCIDENT_SEVERITY_DELAY_MIN,
+    INCIDENT_DEFAULT_SEVERITY,
+    INCIDENT_MAX_EXTRA_DELAY_MIN,
 )
 
 router = APIRouter()
 
+# Identical /predict-route requests in flight at once share one pipeline run
+_prediction_flight = SingleFlight("predict")
+
 
 def _parse_hour(travel_time: str) -> int:
     """Extract hour (0-23) from 'HH:MM' string."""
@@ -87,6 +157,31 @@ def _compute_overall_confidence(num_routes: int, weather_severity: float) -> str
     return CONFIDENCE_LABELS[0]
 
 
+def _incident_severity(severity: str) -> str:
+    """Canonical severity label ('high' → 'High'); unknown labels pass through."""
+    label = severity.strip().title()
+    return label if label in INCIDENT_SEVERITY_DELAY_MIN else severity.strip()
+
+
+def _incident_delays(incidents: list) -> np.ndarray:
+    """Uncapped extra delay (minutes) of each incident, from its severity."""
+    default = INCIDENT_SEVERITY_DELAY_MIN[INCIDENT_DEFAULT_SEVERITY]
+    return np.array([INCIDENT_SEVERITY_DELAY_MIN.get(inc.severity, default) for inc in incidents])
+
+
+def _incident_impact(geometry: list) -> tuple[list, float, bool]:
+    """
+    Active incidents near a route: (the incidents, extra delay in minutes —
+    capped at INCIDENT_MAX_EXTRA_DELAY_MIN, whether any is "High" severity).
+    """
+    matches = incident_store.near_route(geometry)
+    if not matches:
+        return [], 0.0, False
+    extra = float(_incident_delays(matches).sum())
+    severe = any(inc.severity == "High" for inc in matches)
+    return matches, round(min(extra, INCIDENT_MAX_EXTRA_DELAY_MIN), 2), severe
+
+
 def _normalise_confidence(delays: list[float]) -> list[float]:
     """Per-route confidence 0–1: lower delay → higher confidence."""
     if not delays:
@@ -95,118 +190,890 @@ def _normalise_confidence(delays: list[float]) -> list[float]:
     return [round(1.0 - (d / max_delay), 4) for d in delays]
 
 
-@router.post("/predict-route", response_model=PredictionResponse)
-async def predict_route(payload: PredictionRequest):
+async def _resolve_routes(source: str, destination: str) -> list[dict]:
+    """Stages 1–2: geocode both endpoints, then fetch alternative routes."""
+    with stage("geocode"):
+        (src_lat, src_lon), (dst_lat, dst_lon) = await geocode_many([source, destination])
+
+    with stage("osrm"):
+        routes_raw = await fetch_routes_async(src_lat, src_lon, dst_lat, dst_lon, max_routes=MAX_ROUTES)
+    if not routes_raw:
+        raise HTTPException(status_code=400, detail="No routes found")
+    return routes_raw
+
+
+def _segment_profiles(payload: PredictionRequest, routes_raw: list[dict]) -> Optional[list[dict]]:
     """
-    Main prediction endpoint.
+    With segment_profile, each route's response geometry (simplified as it
+    will be returned; the full one for geometry_format='none') cut into
+    pieces of segment_length_m — at most SEGMENT_MAX_PER_ROUTE per route.
+    "share" is each piece's fraction of the route's length and "pace" its
+    travel time per km, both from OSRM's per-edge annotations; a route
+    without them is measured along its geometry at the route's average pace.
+    """
+    if not payload.segment_profile:
+        return None
+    profiles = []
+    for route in routes_raw:
+        geometry = np.asarray(route["geometry"], dtype=np.float64)
+        if payload.geometry_format == "none":
+            kept = np.arange(len(geometry))
+        else:
+            kept = response_vertices(geometry, payload.simplify_tolerance_m, payload.zoom)
+        coords = geometry[kept]
+        length_m = max(
+            payload.segment_length_m or SEGMENT_LENGTH_M,
+            route["distance_km"] * 1000 / SEGMENT_MAX_PER_ROUTE,
+        )
+        route_pace = route["base_duration_min"] / route["distance_km"] if route["distance_km"] > 0 else 0.0
+        if "edge_distance_m" in route:
+            along_m = np.concatenate(([0.0], np.cumsum(route["edge_distance_m"])))[kept]
+            along_s = np.concatenate(([0.0], np.cumsum(route["edge_duration_s"])))[kept]
+            bounds, lengths_m = split_segments(coords, length_m, np.diff(along_m))
+            minutes = (along_s[bounds[:, 1]] - along_s[bounds[:, 0]]) / 60
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pace = np.where(lengths_m > 0, minutes / (lengths_m / 1000), route_pace)
+        else:
+            bounds, lengths_m = split_segments(coords, length_m)
+            pace = np.full(len(lengths_m), route_pace)
+        total = lengths_m.sum()
+        share = lengths_m / total if total > 0 else np.full(len(lengths_m), 1 / max(len(lengths_m), 1))
+        profiles.append({"coords": coords, "bounds": bounds, "share": share, "pace": pace})
+    return profiles
 
-    Pipeline:
-        1. Geocode source & destination via Photon
-        2. Fetch alternative routes via OSRM
-        3. Encode weather using pre-trained encoder
-        4. Build feature matrix matching training schema
-        5. Run ML inference for predicted delay
-        6. Rank routes, assign risk labels, return top routes with derived fields
+
+def _segment_routes(routes_raw: list[dict], profiles: Optional[list[dict]]) -> list[dict]:
     """
-    src_lat, src_lon = geocode(payload.source)
-    dst_lat, dst_lon = geocode(payload.destination)
+    Every segment as a pseudo-route for the model: the whole route's length
+    driven at the segment's own pace. The model only knows whole trips, so
+    scoring a piece by its own few hundred metres would sit below every
+    distance split and score all pieces alike.
+    """
+    if not profiles:
+        return []
+    return [
+        {"distance_km": route["distance_km"], "base_duration_min": route["distance_km"] * float(pace)}
+        for route, profile in zip(routes_raw, profiles)
+        for pace in profile["pace"]
+    ]
 
-    routes_raw = fetch_routes(src_lat, src_lon, dst_lat, dst_lon, max_routes=MAX_ROUTES)
-    if not routes_raw:
-        raise HTTPException(status_code=400, detail="No routes found")
 
-    weather_severity = encode_weather(payload.weather)
+def _nearest_vertex(coords: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Index of the vertex of *coords* closest to each [lat, lon] point (equirectangular)."""
+    scale = np.cos(np.radians(coords[:, 0].mean()))
+    dlat = points[:, None, 0] - coords[None, :, 0]
+    dlon = (points[:, None, 1] - coords[None, :, 1]) * scale
+    return np.argmin(dlat ** 2 + dlon ** 2, axis=1)
+
 
-    features = build_features(
+def _segment_results(
+    profile: dict,
+    scores: Sequence[float],
+    model_delay: float,
+    incidents: list,
+    incident_delay: float,
+    distance_km: float,
+) -> list[dict]:
+    """
+    One route's delay broken down along its segments: the route's model
+    delay split by length × the segment's own score (_segment_routes), plus
+    each nearby incident's part of the incident delay on the segment closest
+    to it. Segments at the same pace get the same delay per km.
+    """
+    bounds, share = profile["bounds"], profile["share"]
+    if not len(bounds):
+        return []
+    weights = share * np.maximum(np.asarray(scores, dtype=np.float64), 0.0)
+    if weights.sum() <= 0:
+        weights = share
+    delays = model_delay * weights / weights.sum()
+    if incidents:
+        points = np.array([(inc.lat, inc.lon) for inc in incidents])
+        segment = np.searchsorted(bounds[:, 0], _nearest_vertex(profile["coords"], points), side="right") - 1
+        extra = _incident_delays(incidents)
+        np.add.at(delays, segment, extra * incident_delay / extra.sum())
+    return [
+        {
+            "start": int(start),
+            "end": int(end),
+            "distance_km": round(distance_km * float(part), 3),
+            "delay_min": round(float(delay), 2),
+            # Level the whole route would have if it all ran like this piece
+            "congestion": _compute_congestion_level(float(delay) / part if part > 0 else 0.0),
+        }
+        for (start, end), part, delay in zip(bounds, share, delays)
+    ]
+
+
+def _build_features_for(payload: PredictionRequest, routes_raw: list[dict], weather_severity: float):
+    """Stage 4: feature matrix (model column order) for one request's candidate routes."""
+    return build_feature_matrix(
         routes=routes_raw,
         travel_time=payload.travel_time,
         travel_day=payload.travel_day,
         weather_severity=weather_severity,
-        vehicle_type=payload.vehicle_type,
-        urgency_level=payload.urgency_level,
-        preferred_route_type=payload.preferred_route_type,
+        feature_names=model_feature_names(),
     )
 
-    delays = predict_delay(features)
 
+def _rank_routes(
+    payload: PredictionRequest,
+    routes_raw: list[dict],
+    delays: Sequence[float],
+    weather_severity: float,
+    profiles: Optional[list[dict]] = None,
+) -> dict:
+    """
+    Stage 6: rank routes, assign risk labels and derived fields.
+
+    Active reported incidents near a route add to its predicted delay (and
+    so to its congestion / risk score) before ranking.
+
+    With *profiles* (_segment_profiles), *delays* continues after the routes
+    with the segment rows of _segment_routes, and each route gets its
+    "segments" breakdown; its geometry is then the profile's, already simplified.
+
+    Returns the compact (schema v2) body — every value once, plain dicts.
+    The verbose PredictionResponse is expanded from it by _build_response.
+    """
     combined = []
-    for route_info, delay in zip(routes_raw, delays):
+    offset = len(routes_raw)                # first segment row
+    for idx, (route_info, model_delay) in enumerate(zip(routes_raw, delays)):
         base = route_info["base_duration_min"]
-        final_time = round(base + delay, 2)
-        risk = _compute_risk(delay, weather_severity)
-        combined.append({
-            "route_name": route_info["route_name"],
+        incidents, incident_delay, severe = _incident_impact(route_info["geometry"])
+        delay = round(model_delay + incident_delay, 2)
+        item = {
+            "name": route_info["route_name"],
             "distance_km": route_info["distance_km"],
-            "base_duration_min": base,
-            "predicted_delay": delay,
-            "final_time": final_time,
-            "risk": risk,
+            "base_time_min": base,
+            "delay_min": delay,
+            "total_time_min": round(base + delay, 2),
+            "risk": RISK_HIGH if severe else _compute_risk(delay, weather_severity),
             "geometry": route_info["geometry"],
-        })
-
-    combined.sort(key=lambda r: r["final_time"])
-    sorted_delays = [r["predicted_delay"] for r in combined]
-    conf_scores = _normalise_confidence(sorted_delays)
+        }
+        if incidents:
+            item["incidents"] = len(incidents)
+            item["incident_delay_min"] = incident_delay
+        if profiles is not None:
+            profile = profiles[idx]
+            n_segments = len(profile["bounds"])
+            item["geometry"] = profile["coords"]
+            item["segments"] = _segment_results(
+                profile, delays[offset:offset + n_segments], model_delay,
+                incidents, incident_delay, route_info["distance_km"],
+            )
+            offset += n_segments
+        combined.append(item)
 
-    hour = _parse_hour(payload.travel_time)
-    peak_hour_flag = _is_peak_hour(hour)
-    weather_note = _get_weather_impact_note(weather_severity)
+    combined.sort(key=lambda r: r["total_time_min"])
+    conf_scores = _normalise_confidence([r["delay_min"] for r in combined])
 
-    route_results: list[RouteResult] = []
     for rank, (item, conf) in enumerate(zip(combined, conf_scores), start=1):
-        delay_val = item["predicted_delay"]
-        base_val = item["base_duration_min"]
-        final_val = item["final_time"]
-
-        route_results.append(
-            RouteResult(
-                rank=rank,
-                route=item["route_name"],
-                name=item["route_name"],
-                distance=item["distance_km"],
-                distance_km=item["distance_km"],
-                duration_min=base_val,
-                baseTime=base_val,
-                base_time_min=base_val,
-                predicted_time=final_val,
-                predicted_time_min=final_val,
-                predicted_delay=delay_val,
-                predictedDelay=delay_val,
-                predicted_delay_min=delay_val,
-                risk=item["risk"],
-                isRecommended=(rank == 1),
-                confidence=conf,
-                geometry=item["geometry"],
-                congestionLevel=_compute_congestion_level(delay_val),
-                riskScore=_compute_risk_score(delay_val, weather_severity),
-                peakHourFlag=peak_hour_flag,
-                weatherImpactNote=weather_note,
-            )
+        presimplified = profiles is not None
+        coordinates, polyline = prepare_geometry(
+            item.pop("geometry"),
+            payload.geometry_format,
+            tolerance_m=None if presimplified else payload.simplify_tolerance_m,
+            zoom=None if presimplified else payload.zoom,
         )
+        item["rank"] = rank
+        item["recommended"] = rank == 1
+        item["confidence"] = conf
+        item["congestion"] = _compute_congestion_level(item["delay_min"])
+        item["risk_score"] = _compute_risk_score(item["delay_min"], weather_severity)
+        if coordinates is not None:
+            item["geometry"] = coordinates
+        if polyline is not None:
+            item["polyline"] = polyline
+
+    hour = _parse_hour(payload.travel_time)
+    avg_risk = sum(r["risk_score"] for r in combined) / len(combined) if combined else 0.0
 
-    overall_confidence = _compute_overall_confidence(len(route_results), weather_severity)
+    return {
+        "schema_version": COMPACT_SCHEMA_VERSION,
+        "confidence": _compute_overall_confidence(len(combined), weather_severity),
+        "congestion": combined[0]["congestion"] if combined else None,
+        "risk_score": round(avg_risk, 1),
+        "peak_hour": _is_peak_hour(hour),
+        "weather_note": _get_weather_impact_note(weather_severity),
+        "model_version": model_version(),
+        "routes": combined,
+    }
 
-    avg_risk = sum(r.riskScore or 0 for r in route_results) / len(route_results) if route_results else 0.0
-    top_congestion = route_results[0].congestionLevel if route_results else None
 
+def _build_response(ranked: dict) -> PredictionResponse:
+    """Verbose (current frontend) response, with its alias fields, from _rank_routes output."""
+    route_results = [
+        RouteResult(
+            rank=item["rank"],
+            route=item["name"],
+            name=item["name"],
+            distance=item["distance_km"],
+            distance_km=item["distance_km"],
+            duration_min=item["base_time_min"],
+            baseTime=item["base_time_min"],
+            base_time_min=item["base_time_min"],
+            predicted_time=item["total_time_min"],
+            predicted_time_min=item["total_time_min"],
+            predicted_delay=item["delay_min"],
+            predictedDelay=item["delay_min"],
+            predicted_delay_min=item["delay_min"],
+            risk=item["risk"],
+            isRecommended=item["recommended"],
+            confidence=item["confidence"],
+            geometry=item.get("geometry"),
+            geometry_polyline=item.get("polyline"),
+            congestionLevel=item["congestion"],
+            riskScore=item["risk_score"],
+            peakHourFlag=ranked["peak_hour"],
+            weatherImpactNote=ranked["weather_note"],
+            incidentCount=item.get("incidents"),
+            incidentDelay=item.get("incident_delay_min"),
+            segments=item.get("segments"),
+        )
+        for item in ranked["routes"]
+    ]
     return PredictionResponse(
         routes=route_results,
-        confidence=overall_confidence,
-        congestionLevel=top_congestion,
-        riskScore=round(avg_risk, 1),
-        peakHourFlag=peak_hour_flag,
-        weatherImpactNote=weather_note,
+        confidence=ranked["confidence"],
+        congestionLevel=ranked["congestion"],
+        riskScore=ranked["risk_score"],
+        peakHourFlag=ranked["peak_hour"],
+        weatherImpactNote=ranked["weather_note"],
+        modelVersion=ranked.get("model_version"),
+        degraded=ranked.get("degraded"),
+    )
+
+
+def _prediction_key(payload: PredictionRequest) -> tuple:
+    """Coalescing key — the request with place names and day/time normalised."""
+    fields = payload.model_dump()
+    fields["source"] = normalize_place_name(payload.source)
+    fields["destination"] = normalize_place_name(payload.destination)
+    fields["travel_day"] = payload.travel_day.strip().lower()
+    fields["travel_time"] = payload.travel_time.strip()
+    return tuple(sorted(fields.items()))
+
+
+async def _predict_ranked(payload: PredictionRequest, allow_surface: bool = False) -> dict:
+    """
+    Stages 1–7 for one request, up to the compact ranked body. *allow_surface*
+    lets the delay surface answer, as for the other batch workloads.
+    """
+    routes_raw = await _resolve_routes(payload.source, payload.destination)
+    with stage("features"):
+        weather_severity = encode_weather(payload.weather)
+        profiles = _segment_profiles(payload, routes_raw)
+        # Segment rows ride in the same model call as the routes
+        features = _build_features_for(payload, routes_raw + _segment_routes(routes_raw, profiles), weather_severity)
+    with stage("model"):
+        delays = await predict_delay_async(features, allow_surface=allow_surface)
+    with stage("rank"):
+        return _rank_routes(payload, routes_raw, delays, weather_severity, profiles)
+
+
+def _batch_flight_key(item: PredictionRequest) -> tuple:
+    """
+    Coalescing key of a streamed batch item — kept apart from /predict-route
+    keys, whose runs are exact-model only and carry a deadline.
+    """
+    return _prediction_key(item), "batch"
+
+
+def _request_budget(deadline_ms: Optional[int]) -> Optional[float]:
+    """Seconds allowed for one prediction: ?deadline_ms=, else REQUEST_DEADLINE_MS (0 = none)."""
+    ms = deadline_ms if deadline_ms is not None else REQUEST_DEADLINE_MS
+    return ms / 1000 if ms > 0 else None
+
+
+def _degraded_ranked(payload: PredictionRequest, exhausted: DeadlineExceeded) -> dict:
+    """
+    Best answer without waiting on anything: endpoints from the geocode
+    cache, routes from the route cache or else a straight-line estimate,
+    scored inline by the model and flagged as degraded. An endpoint that
+    was never geocoded leaves nothing to estimate from (504).
+    """
+    endpoints = []
+    for place in (payload.source, payload.destination):
+        coords = cached_geocode(place)
+        if coords is None:
+            raise HTTPException(
+                status_code=504,
+                detail=f"{exhausted}, and '{place}' is not in the geocode cache",
+            )
+        endpoints.append(coords)
+    (src_lat, src_lon), (dst_lat, dst_lon) = endpoints
+
+    routes_raw = cached_routes(src_lat, src_lon, dst_lat, dst_lon, max_routes=MAX_ROUTES)
+    route_source = "cache"
+    if not routes_raw:
+        routes_raw = [straight_line_route(src_lat, src_lon, dst_lat, dst_lon)]
+        route_source = "straight_line"
+
+    weather_severity = encode_weather(payload.weather)
+    features = _build_features_for(payload, routes_raw, weather_severity)
+    # Inline, not on the pool: a backed-up pool may be what used the budget
+    delays = ml_service.predict_delay(features)
+    ranked = _rank_routes(payload, routes_raw, delays, weather_severity)
+    ranked["confidence"] = CONFIDENCE_LABELS[0]
+    ranked["degraded"] = {"reason": "deadline_exceeded", "stage": exhausted.stage, "route_source": route_source}
+    return ranked
+
+
+def _wants_compact(response_format: Optional[str], accept: Optional[str]) -> bool:
+    """Compact schema via ?format=compact or an Accept header naming its media type."""
+    if response_format is not None:
+        return response_format == "compact"
+    return bool(accept) and COMPACT_MEDIA_TYPE in accept
+
+
+def _compact_json(body: dict) -> Response:
+    """Serialise a plain-dict body straight to bytes — no model validation pass."""
+    return Response(content=orjson.dumps(body), media_type=COMPACT_MEDIA_TYPE)
+
+
+def _response_cache_key(payload: PredictionRequest, compact: bool) -> tuple:
+    """
+    Everything a /predict-route body depends on: the canonical request with
+    day/time reduced to the (hour, weekend) slot the model sees, the model
+    version, the incident revision and the representation. Raises
+    ValueError on an unparseable travel_time.
+    """
+    fields = dict(_prediction_key(payload))
+    fields["travel_time"], fields["travel_day"] = time_context(payload.travel_time, payload.travel_day)
+    return tuple(sorted(fields.items())), model_version(), incident_store.revision, compact
+
+
+def _cached_response(entry: response_cache.CachedResponse, if_none_match: Optional[str], public: bool) -> Response:
+    """200 with the cached body, or 304 when the client already holds it."""
+    if not response_cache.enabled():
+        cache_control = "no-cache, max-age=0"       # no slots: every request revalidates
+    elif public:
+        # GET responses may be reused by browsers and proxies until the slot ends
+        cache_control = f"public, max-age={response_cache.slot_remaining()}"
+    else:
+        cache_control = "private, no-cache"         # POST responses are only revalidated
+    headers = {"ETag": entry.etag, "Vary": "Accept", "Cache-Control": cache_control}
+    if response_cache.etag_matches(if_none_match, entry.etag, safe_method=public):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+
+async def _serve_prediction(
+    payload: PredictionRequest,
+    compact: bool,
+    deadline_ms: Optional[int],
+    if_none_match: Optional[str],
+    public: bool,
+) -> Response:
+    """Shared body of POST and GET /predict-route (see predict_route)."""
+    try:
+        key = _response_cache_key(payload, compact)
+    except ValueError as exc:
+        # Rejected before the cache, the deadline and the coalescer see it
+        raise HTTPException(status_code=400, detail=f"Invalid travel_time: {exc}")
+    entry = response_cache.lookup(key)
+    if entry is not None:
+        return _cached_response(entry, if_none_match, public)
+
+    with deadline_scope(_request_budget(deadline_ms)):
+        try:
+            ranked = await within_deadline(
+                _prediction_flight.do((_prediction_key(payload), deadline_ms), lambda: _predict_ranked(payload)),
+                "request",
+            )
+        except DeadlineExceeded as exc:
+            with stage("degraded"):
+                ranked = _degraded_ranked(payload, exc)
+    with stage("serialize"):
+        if compact:
+            body, media_type = orjson.dumps(ranked), COMPACT_MEDIA_TYPE
+        else:
+            body = _build_response(ranked).model_dump_json(exclude_none=True).encode()
+            media_type = "application/json"
+    if ranked.get("degraded"):
+        # A stand-in answer: never cached, never validated
+        return Response(content=body, media_type=media_type, headers={"Cache-Control": "no-store"})
+    return _cached_response(response_cache.store(key, body, media_type), if_none_match, public)
+
+
+def _batch_error(idx: int, exc: BaseException) -> BatchItemResult:
+    """Per-item error entry — HTTPExceptions keep their status and detail."""
+    if isinstance(exc, HTTPException):
+        return BatchItemResult(index=idx, status_code=exc.status_code, error=str(exc.detail))
+    if isinstance(exc, ValueError):      # e.g. malformed travel_time
+        return BatchItemResult(index=idx, status_code=400, error=f"Invalid request: {exc}")
+    return BatchItemResult(index=idx, status_code=500, error=f"Prediction failed: {exc}")
+
+
+def _streaming_response(produce, fmt: str) -> StreamingResponse:
+    """NDJSON / SSE response fed by *produce(emit)* (see services.streaming)."""
+    return StreamingResponse(
+        stream_events(produce, fmt, STREAM_QUEUE_SIZE),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_COMPACT_RESPONSES = {
+    200: {"content": {COMPACT_MEDIA_TYPE: {"schema": CompactPredictionResponse.model_json_schema()}}},
+}
+
+
+@router.post(
+    "/predict-route",
+    response_model=PredictionResponse,
+    response_model_exclude_none=True,
+    responses=_COMPACT_RESPONSES,
+)
+async def predict_route(
+    payload: PredictionRequest,
+    response_format: Optional[Literal["verbose", "compact"]] = Query(None, alias="format"),
+    deadline_ms: Optional[int] = Query(None, ge=1, le=REQUEST_DEADLINE_MAX_MS),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Main prediction endpoint.
+
+    Pipeline:
+        1. Geocode source & destination concurrently via Photon
+        2. Fetch alternative routes via OSRM
+        3. Encode weather using pre-trained encoder
+        4. Build feature matrix matching training schema
+        5. Run ML inference for predicted delay
+        6. Rank routes, assign risk labels, return top routes with derived fields
+        7. Simplify / encode / drop geometry per geometry_format, zoom, tolerance
+
+    ?format=compact (or Accept: COMPACT_MEDIA_TYPE) returns the versioned
+    compact schema — each field once, serialised by orjson.
+
+    segment_profile=true adds each route's delay broken down along its
+    geometry in segment_length_m pieces (see _segment_results), scored in
+    the same model call as the routes.
+
+    Serialised responses are cached (see _response_cache_key) until the next
+    RESPONSE_CACHE_SLOT_SEC boundary and carry a strong ETag; a request whose
+    If-None-Match names it gets 304 Not Modified. This POST is a read-only
+    query, so the 304 is given here too rather than a 412.
+
+    Concurrent identical requests (see _prediction_key) share one run of
+    stages 1–7; each caller only serialises the shared result.
+
+    The whole pipeline runs within a time budget (?deadline_ms=, default
+    REQUEST_DEADLINE_MS); every upstream call and the model queue get only
+    what is left of it. If it runs out, the response is built from cached
+    data or a straight-line estimate, carries a "degraded" block and is
+    not cached.
+    """
+    compact = _wants_compact(response_format, accept)
+    return await _serve_prediction(payload, compact, deadline_ms, if_none_match, public=False)
+
+
+def _query_payload(
+    source: str = Query(..., min_length=1),
+    destination: str = Query(..., min_length=1),
+    travel_day: str = Query(..., min_length=1),
+    travel_time: str = Query(..., min_length=1),
+    weather: Literal["Clear", "Fog", "Rain", "Snow", "Extreme"] = Query(...),
+    vehicle_type: Optional[str] = Query(None),
+    urgency_level: Optional[str] = Query(None),
+    preferred_route_type: Optional[str] = Query(None),
+    geometry_format: Literal["coordinates", "polyline", "none"] = Query("coordinates"),
+    simplify_tolerance_m: Optional[float] = Query(None, ge=0),
+    zoom: Optional[int] = Query(None, ge=0, le=22),
+    segment_profile: bool = Query(False),
+    segment_length_m: Optional[float] = Query(None, ge=50, le=50_000),
+) -> PredictionRequest:
+    """PredictionRequest from query parameters (same names and limits as the JSON body)."""
+    return PredictionRequest(
+        source=source,
+        destination=destination,
+        travel_day=travel_day,
+        travel_time=travel_time,
+        weather=weather,
+        vehicle_type=vehicle_type,
+        urgency_level=urgency_level,
+        preferred_route_type=preferred_route_type,
+        geometry_format=geometry_format,
+        simplify_tolerance_m=simplify_tolerance_m,
+        zoom=zoom,
+        segment_profile=segment_profile,
+        segment_length_m=segment_length_m,
+    )
+
+
+@router.get(
+    "/predict-route",
+    response_model=PredictionResponse,
+    response_model_exclude_none=True,
+    responses=_COMPACT_RESPONSES,
+)
+async def predict_route_get(
+    payload: PredictionRequest = Depends(_query_payload),
+    response_format: Optional[Literal["verbose", "compact"]] = Query(None, alias="format"),
+    deadline_ms: Optional[int] = Query(None, ge=1, le=REQUEST_DEADLINE_MAX_MS),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    GET form of /predict-route — the request fields as query parameters.
+    Same response and cache as the POST, but marked public with a max-age up
+    to the next slot boundary, so browsers and proxies can reuse it.
+    """
+    compact = _wants_compact(response_format, accept)
+    return await _serve_prediction(payload, compact, deadline_ms, if_none_match, public=True)
+
+
+@router.post("/predict-routes/batch", response_model=BatchPredictionResponse)
+async def predict_routes_batch(
+    payload: BatchPredictionRequest,
+    response_format: Optional[Literal["verbose", "compact"]] = Query(None, alias="format"),
+    stream: Optional[Literal["ndjson", "sse"]] = Query(None),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Batch prediction for many origin–destination pairs.
+
+    Geocoding and routing fan out with at most BATCH_CONCURRENCY items in
+    flight; every candidate route of every item is then stacked into one
+    feature matrix for a single model call. A failing item gets its
+    own status code and error instead of failing the whole batch.
+    Supports the compact schema like /predict-route.
+
+    ?stream=ndjson|sse emits each item as soon as it is scored instead
+    (see _produce_batch).
+    """
+    compact = _wants_compact(response_format, accept)
+    if stream is not None:
+        return _streaming_response(lambda emit: _produce_batch(payload, compact, emit), stream)
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def resolve(item: PredictionRequest):
+        async with slots:
+            routes_raw = await _resolve_routes(item.source, item.destination)
+        return routes_raw, encode_weather(item.weather)
+
+    resolved = await asyncio.gather(
+        *(resolve(item) for item in payload.items), return_exceptions=True
+    )
+
+    results: list = [None] * len(payload.items)
+    scored: list[tuple[int, list[dict], float, Optional[list[dict]], int, int]] = []
+    feature_items = []
+    offset = 0
+    for idx, (item, outcome) in enumerate(zip(payload.items, resolved)):
+        if isinstance(outcome, BaseException):
+            results[idx] = _batch_error(idx, outcome)
+            continue
+        routes_raw, weather_severity = outcome
+        try:
+            hour, weekend = time_context(item.travel_time, item.travel_day)
+        except Exception as exc:
+            results[idx] = _batch_error(idx, exc)
+            continue
+        profiles = _segment_profiles(item, routes_raw)
+        rows = routes_raw + _segment_routes(routes_raw, profiles)
+        feature_items.append((rows, hour, weekend, weather_severity))
+        scored.append((idx, routes_raw, weather_severity, profiles, offset, offset + len(rows)))
+        offset += len(rows)
+
+    if feature_items:
+        with stage("features"):
+            features = build_feature_matrix_batch(feature_items, model_feature_names())
+        with stage("model"):
+            delays = await predict_delay_async(features, allow_surface=True)
+        with stage("rank"):
+            for idx, routes_raw, weather_severity, profiles, start, end in scored:
+                ranked = _rank_routes(payload.items[idx], routes_raw, delays[start:end], weather_severity, profiles)
+                if compact:
+                    results[idx] = {"index": idx, "status_code": 200, "result": ranked}
+                else:
+                    results[idx] = BatchItemResult(index=idx, status_code=200, result=_build_response(ranked))
+
+    if compact:
+        results = [r if isinstance(r, dict) else r.model_dump(exclude_none=True) for r in results]
+        failed = sum(1 for r in results if "error" in r)
+        return _compact_json({
+            "schema_version": COMPACT_SCHEMA_VERSION,
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed,
+        })
+
+    failed = sum(1 for r in results if r.error is not None)
+    return BatchPredictionResponse(
+        results=results,
+        succeeded=len(results) - failed,
+        failed=failed,
+    )
+
+
+async def _produce_batch(payload: BatchPredictionRequest, compact: bool, emit: Emit) -> None:
+    """
+    Streamed batch: items are scored one by one and emitted in completion
+    order as "item" events carrying their request index and the total; an
+    "end" event closes the stream. Scoring matches the non-streamed batch
+    (delay surface allowed), so numbers do not depend on ?stream=; identical
+    items of concurrent streamed batches share one run (_batch_flight_key).
+    """
+    total = len(payload.items)
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    outcome = {"succeeded": 0, "failed": 0}
+
+    async def score(idx: int, item: PredictionRequest) -> None:
+        async with slots:
+            try:
+                ranked = await _prediction_flight.do(
+                    _batch_flight_key(item), lambda: _predict_ranked(item, allow_surface=True),
+                )
+                result = ranked if compact else _build_response(ranked).model_dump(exclude_none=True)
+                entry = {"index": idx, "status_code": 200, "result": result}
+                outcome["succeeded"] += 1
+            except Exception as exc:
+                entry = _batch_error(idx, exc).model_dump(exclude_none=True)
+                outcome["failed"] += 1
+            # Emitted while holding the slot: a stalled client stops new items
+            await emit("item", {**entry, "total": total})
+
+    await asyncio.gather(*(score(idx, item) for idx, item in enumerate(payload.items)))
+    await emit("end", {"total": total, **outcome})
+
+
+@router.post("/predict-matrix", response_model=MatrixResponse)
+async def predict_matrix(payload: MatrixRequest):
+    """
+    Delay-adjusted travel times from every source to every destination.
+
+    Distinct place names (after normalisation) are geocoded once, OSRM's
+    /table service supplies distance and duration for all pairs (no
+    geometry), and the N·M pairs go through the model in one pass.
+    Returns [source][destination] arrays; null marks pairs with no route.
+    """
+    try:
+        hour, weekend = time_context(payload.travel_time, payload.travel_day)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid travel_time: {exc}")
+    weather_severity = encode_weather(payload.weather)
+
+    names = [*payload.sources, *payload.destinations]
+    keys = [normalize_place_name(name) for name in names]
+    unique = {}
+    for key, name in zip(keys, names):
+        unique.setdefault(key, name)
+    with stage("geocode"):
+        located = dict(zip(unique, await geocode_many(list(unique.values()))))
+    points = [located[key] for key in keys]
+    n = len(payload.sources)
+
+    with stage("osrm"):
+        distance_km, base_min = await fetch_table_async(points[:n], points[n:])
+    reachable = np.isfinite(distance_km) & np.isfinite(base_min)
+    delay_min = np.full(distance_km.shape, np.nan)
+    if reachable.any():
+        with stage("features"):
+            features = build_feature_matrix_columns(
+                distance_km[reachable], base_min[reachable], hour, weekend, weather_severity,
+                model_feature_names(),
+            )
+        with stage("model"):
+            delay_min[reachable] = await predict_delay_async(features, allow_surface=True)
+
+    with stage("serialize"):
+        body = {
+            "sources": payload.sources,
+            "destinations": payload.destinations,
+            "distance_km": np.round(distance_km, 2).tolist(),
+            "base_time_min": np.round(base_min, 2).tolist(),
+            "delay_min": delay_min.tolist(),
+            "total_time_min": np.round(base_min + delay_min, 2).tolist(),
+            "model_version": model_version(),
+        }
+        # orjson writes NaN as null; no validation pass over N·M cells
+        return Response(content=orjson.dumps(body), media_type="application/json")
+
+
+def _slot_label(minute_of_day: int) -> str:
+    """'HH:MM' for a minute offset into the day (1440 → '24:00')."""
+    return f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+
+def _best_window(totals: np.ndarray, days: list[str], slot_minutes: int) -> DepartureWindow:
+    """
+    Best departure slot in a (days × slots) grid of total travel times, widened
+    to the contiguous run of slots that day within SWEEP_WINDOW_TOLERANCE_MIN.
+    """
+    day_idx, slot_idx = np.unravel_index(int(np.argmin(totals)), totals.shape)
+    row = totals[day_idx]
+    best = float(row[slot_idx])
+    ok = row <= best + SWEEP_WINDOW_TOLERANCE_MIN
+    start = slot_idx
+    while start > 0 and ok[start - 1]:
+        start -= 1
+    end = slot_idx
+    while end + 1 < row.size and ok[end + 1]:
+        end += 1
+    return DepartureWindow(
+        day=days[day_idx],
+        best_time=_slot_label(slot_idx * slot_minutes),
+        window_start=_slot_label(start * slot_minutes),
+        window_end=_slot_label((end + 1) * slot_minutes),
+        predicted_time_min=round(best, 2),
+    )
+
+
+async def _sweep_grid(routes_raw: list[dict], days: list[str], weather_severity: float, slot_minutes: int) -> np.ndarray:
+    """Delays for routes × days × 24 hours in one model pass, as (routes, days, slots)."""
+    # One feature block per (day, hour); rows within a block follow route order
+    items = [
+        (routes_raw, hour, IS_WEEKEND_BY_DAY[day], weather_severity)
+        for day in days
+        for hour in range(24)
+    ]
+    with stage("features"):
+        features = build_feature_matrix_batch(items, model_feature_names())
+    with stage("model"):
+        delays = np.asarray(await predict_delay_async(features, allow_surface=True))
+    # (days, 24, routes) → (routes, days, slots)
+    grid = delays.reshape(len(days), 24, len(routes_raw)).transpose(2, 0, 1)
+    return np.repeat(grid, 60 // slot_minutes, axis=2)
+
+
+def _sweep_route_result(route_info: dict, route_grid: np.ndarray, days: list[str], slot_minutes: int) -> SweepRouteResult:
+    totals = route_info["base_duration_min"] + route_grid
+    return SweepRouteResult(
+        route=route_info["route_name"],
+        distance_km=route_info["distance_km"],
+        base_time_min=route_info["base_duration_min"],
+        delay_grid=route_grid.tolist(),
+        best=_best_window(totals, days, slot_minutes),
+        geometry=route_info["geometry"],
+    )
+
+
+@router.post("/predict-route/sweep", response_model=SweepResponse)
+async def predict_route_sweep(
+    payload: SweepRequest,
+    stream: Optional[Literal["ndjson", "sse"]] = Query(None),
+):
+    """
+    "When should I leave?" — delay for every departure slot of the week.
+
+    Routes the pair once, then scores routes × days × 24 hours in a single
+    model pass. The model only sees the hour, so finer slots repeat their
+    hour's prediction. Returns a (days × slots) delay grid per route plus
+    the best departure window per route and overall.
+
+    ?stream=ndjson|sse scores and emits one route at a time: a "meta" event
+    (days, slots, total), a "route" event per route (with its index), then
+    an "end" event with the overall best.
+    """
+    days = [d.strip().lower() for d in (payload.days or DAYS_OF_WEEK)]
+    unknown = [d for d in days if d not in DAYS_OF_WEEK]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown travel day(s): {unknown}")
+    if 60 % payload.slot_minutes:
+        raise HTTPException(status_code=400, detail="slot_minutes must divide 60")
+
+    routes_raw = await _resolve_routes(payload.source, payload.destination)
+    weather_severity = encode_weather(payload.weather)
+    slots = [_slot_label(m) for m in range(0, 24 * 60, payload.slot_minutes)]
+
+    if stream is not None:
+        async def produce(emit: Emit) -> None:
+            total = len(routes_raw)
+            await emit("meta", {
+                "days": days, "slots": slots, "slot_minutes": payload.slot_minutes,
+                "total": total, "model_version": model_version(),
+            })
+            best = None
+            for idx, route_info in enumerate(routes_raw):
+                grid = await _sweep_grid([route_info], days, weather_severity, payload.slot_minutes)
+                result = _sweep_route_result(route_info, grid[0], days, payload.slot_minutes)
+                if best is None or result.best.predicted_time_min < best.best.predicted_time_min:
+                    best = result
+                await emit("route", {"index": idx, "total": total, **result.model_dump()})
+            await emit("end", {"total": total, "best_route": best.route, "best": best.best.model_dump()})
+
+        return _streaming_response(produce, stream)
+
+    grid = await _sweep_grid(routes_raw, days, weather_severity, payload.slot_minutes)
+    results = [
+        _sweep_route_result(route_info, route_grid, days, payload.slot_minutes)
+        for route_info, route_grid in zip(routes_raw, grid)
+    ]
+    overall = min(range(len(results)), key=lambda i: results[i].best.predicted_time_min)
+    return SweepResponse(
+        days=days,
+        slots=slots,
+        slot_minutes=payload.slot_minutes,
+        routes=results,
+        best_route=results[overall].route,
+        best=results[overall].best,
+        model_version=model_version(),
     )
 
 
 @router.post("/report-incident", response_model=IncidentResponse)
 async def report_incident(payload: IncidentRequest):
-    """Accept an incident report from the frontend."""
-    print(
-        f"[INCIDENT] location={payload.location} type={payload.type} "
-        f"severity={payload.severity} desc={payload.description!r}"
+    """
+    Accept an incident report from the frontend.
+
+    The incident is placed at lat/lon when given, otherwise at the geocoded
+    location, and stays active for INCIDENT_TTL_SEC — routes passing within
+    INCIDENT_MATCH_RADIUS_M get extra delay and risk meanwhile.
+    """
+    if (payload.lat is None) != (payload.lon is None):
+        raise HTTPException(status_code=400, detail="lat and lon must be given together")
+    if payload.lat is not None:
+        lat, lon = payload.lat, payload.lon
+    else:
+        lat, lon = await geocode_async(payload.location)
+
+    incident = incident_store.add(
+        lat=lat,
+        lon=lon,
+        location=payload.location,
+        type=payload.type,
+        severity=_incident_severity(payload.severity),
+        description=payload.description,
     )
     return IncidentResponse(
         status="ok",
         message=f"Incident at '{payload.location}' recorded successfully.",
+        incident=IncidentInfo(**incident.to_dict()),
     )
+
+
+@router.get("/incidents", response_model=IncidentListResponse)
+async def list_incidents(
+    bbox: str = Query(..., description="Viewport as 'min_lon,min_lat,max_lon,max_lat'"),
+):
+    """Active incidents inside a map viewport."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be 'min_lon,min_lat,max_lon,max_lat'")
+    # float() accepts "nan" / "inf", which would break the grid lookup
+    if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat)):
+        raise HTTPException(status_code=400, detail="bbox values must be finite numbers")
+    if not (-180 <= min_lon and max_lon <= 180 and -90 <= min_lat and max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox must lie within lon -180..180, lat -90..90")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox minimums must not exceed maximums")
+
+    incidents = incident_store.in_bbox(min_lat, min_lon, max_lat, max_lon)
+    return IncidentListResponse(
+        count=len(incidents),
+        incidents=[IncidentInfo(**incident.to_dict()) for incident in incidents],
+    )
+
+
+@router.get("/cache-stats")
+async def cache_stats():
+    """Hit/miss counters for the lookup and response caches — for sizing them."""
+    return {
+        "geocode": geocode_cache_stats(),
+        "routes": route_cache_stats(),
+        "responses": response_cache.response_cache_stats(),
+    }
@@ -3,7 +3,9 @@ Pydantic schemas for request validation and response serialisation.
 """
 
 from typing import List, Literal, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+from config.settings import BATCH_MAX_ITEMS, MATRIX_MAX_POINTS
 
 
 # ── Request ──────────────────────────────────────────────────────────────────
@@ -30,10 +32,39 @@ class PredictionRequest(BaseModel):
     vehicle_type: Optional[str] = Field(None, description="Vehicle type (e.g. car, truck)")
     urgency_level: Optional[str] = Field(None, description="Urgency: low, normal, high")
     preferred_route_type: Optional[str] = Field(None, description="Preferred route type (e.g. fastest, shortest)")
+    # Response geometry — full [lat, lon] lists by default
+    geometry_format: Literal["coordinates", "polyline", "none"] = Field(
+        "coordinates",
+        description="'coordinates' ([[lat, lon], ...]), 'polyline' (encoded, precision 5) or 'none'",
+    )
+    simplify_tolerance_m: Optional[float] = Field(
+        None, ge=0, description="Douglas–Peucker tolerance in metres",
+    )
+    zoom: Optional[int] = Field(
+        None, ge=0, le=22, description="Map zoom level; derives the tolerance when none is given",
+    )
+    # Opt-in per-segment delay along each route's (response) geometry
+    segment_profile: bool = Field(False, description="Add per-segment delay / congestion to each route")
+    segment_length_m: Optional[float] = Field(
+        None, ge=50, le=50_000, description="Segment length in metres (default SEGMENT_LENGTH_M)",
+    )
 
 
 # ── Response ─────────────────────────────────────────────────────────────────
 
+class RouteSegment(BaseModel):
+    """
+    One piece of a route's segment profile. start / end are vertex indices
+    (inclusive) into the route's returned geometry — or into the full OSRM
+    geometry with geometry_format='none'; delays sum to the route's delay.
+    """
+    start: int
+    end: int
+    distance_km: float
+    delay_min: float
+    congestion: str                      # level if the whole route ran like this piece
+
+
 class RouteResult(BaseModel):
     """Single route in the prediction response — standardised fields."""
     rank: int
@@ -52,12 +83,25 @@ class RouteResult(BaseModel):
     risk: str
     isRecommended: bool
     confidence: float
-    geometry: List[List[float]]
+    geometry: Optional[List[List[float]]] = None   # omitted for 'polyline' / 'none'
+    geometry_polyline: Optional[str] = None        # geometry_format='polyline' only
     # Optional derived fields — computed from config thresholds
     congestionLevel: Optional[str] = None
     riskScore: Optional[float] = None
     peakHourFlag: Optional[bool] = None
     weatherImpactNote: Optional[str] = None
+    # Active reported incidents near the route (only when there are any);
+    # predicted_delay already includes incidentDelay
+    incidentCount: Optional[int] = None
+    incidentDelay: Optional[float] = None
+    segments: Optional[List[RouteSegment]] = None  # segment_profile=true only
+
+
+class DegradedInfo(BaseModel):
+    """Why and how a response was degraded (absent on normal responses)."""
+    reason: str                          # "deadline_exceeded"
+    stage: str                           # where the budget ran out: photon, osrm, model, request
+    route_source: str                    # "cache" (cached OSRM routes) or "straight_line"
 
 
 class PredictionResponse(BaseModel):
@@ -69,6 +113,156 @@ class PredictionResponse(BaseModel):
     riskScore: Optional[float] = None
     peakHourFlag: Optional[bool] = None
     weatherImpactNote: Optional[str] = None
+    modelVersion: Optional[str] = None   # model version that scored the routes
+    degraded: Optional[DegradedInfo] = None
+
+
+# ── Compact response (schema v2) ──────────────────────────────────────────────
+# Each value carried once; built as plain dicts and serialised without a
+# validation pass — these models document the shape (OpenAPI) only.
+
+class CompactRouteResult(BaseModel):
+    """One route in the compact response."""
+    rank: int
+    name: str
+    distance_km: float
+    base_time_min: float
+    delay_min: float
+    total_time_min: float
+    risk: str
+    risk_score: float
+    congestion: str
+    confidence: float
+    recommended: bool
+    geometry: Optional[List[List[float]]] = None   # geometry_format='coordinates'
+    polyline: Optional[str] = None                 # geometry_format='polyline'
+    incidents: Optional[int] = None                # active incidents near the route
+    incident_delay_min: Optional[float] = None     # included in delay_min
+    segments: Optional[List[RouteSegment]] = None  # segment_profile=true only
+
+
+class CompactPredictionResponse(BaseModel):
+    """Compact /predict-route response (?format=compact)."""
+    model_config = ConfigDict(protected_namespaces=())      # allow "model_version"
+
+    schema_version: int
+    confidence: str
+    congestion: Optional[str] = None
+    risk_score: float
+    peak_hour: bool
+    weather_note: str
+    model_version: Optional[str] = None
+    degraded: Optional[DegradedInfo] = None
+    routes: List[CompactRouteResult]
+
+
+# ── Batch ─────────────────────────────────────────────────────────────────────
+
+class BatchPredictionRequest(BaseModel):
+    """Payload for POST /predict-routes/batch — many independent predictions."""
+    items: List[PredictionRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_MAX_ITEMS,
+        description="Prediction requests, scored together",
+    )
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one batch item — either a result or an error, never both."""
+    index: int                           # position in the request's items
+    status_code: int
+    result: Optional[PredictionResponse] = None
+    error: Optional[str] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    """Response for POST /predict-routes/batch, results in request order."""
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+
+# ── ETA matrix ────────────────────────────────────────────────────────────────
+
+class MatrixRequest(BaseModel):
+    """Payload for POST /predict-matrix — every source to every destination."""
+    sources: List[str] = Field(..., min_length=1, max_length=MATRIX_MAX_POINTS, description="Origin place names")
+    destinations: List[str] = Field(
+        ..., min_length=1, max_length=MATRIX_MAX_POINTS, description="Destination place names",
+    )
+    travel_day: str = Field(..., min_length=1, description="Day of travel, e.g. 'monday'")
+    travel_time: str = Field(..., min_length=1, description="Time of travel in HH:MM 24-hr format")
+    weather: Literal["Clear", "Fog", "Rain", "Snow", "Extreme"] = Field(
+        ...,
+        description="Weather condition",
+    )
+
+
+class MatrixResponse(BaseModel):
+    """
+    Response for POST /predict-matrix. Each array is indexed
+    [source][destination]; null where no driving route exists.
+    """
+    model_config = ConfigDict(protected_namespaces=())      # allow "model_version"
+
+    sources: List[str]
+    destinations: List[str]
+    distance_km: List[List[Optional[float]]]
+    base_time_min: List[List[Optional[float]]]
+    delay_min: List[List[Optional[float]]]
+    total_time_min: List[List[Optional[float]]]
+    model_version: Optional[str] = None
+
+
+# ── Departure-time sweep ───────────────────────────────────────────────────────
+
+class SweepRequest(BaseModel):
+    """Payload for POST /predict-route/sweep — one pair, every departure slot."""
+    source: str = Field(..., min_length=1, description="Origin place name")
+    destination: str = Field(..., min_length=1, description="Destination place name")
+    weather: Literal["Clear", "Fog", "Rain", "Snow", "Extreme"] = Field(
+        ...,
+        description="Weather condition",
+    )
+    days: Optional[List[str]] = Field(
+        None,
+        min_length=1,
+        description="Days to sweep, e.g. ['monday']; all seven when omitted",
+    )
+    slot_minutes: int = Field(60, ge=5, le=60, description="Slot size; must divide 60")
+
+
+class DepartureWindow(BaseModel):
+    """Best departure slot and the surrounding near-optimal window."""
+    day: str
+    best_time: str                       # HH:MM
+    window_start: str                    # HH:MM
+    window_end: str                      # HH:MM (exclusive)
+    predicted_time_min: float            # base time + predicted delay at best_time
+
+
+class SweepRouteResult(BaseModel):
+    """One route's delay grid, indexed [day][slot] like SweepResponse.days/slots."""
+    route: str
+    distance_km: float
+    base_time_min: float
+    delay_grid: List[List[float]]
+    best: DepartureWindow
+    geometry: List[List[float]]
+
+
+class SweepResponse(BaseModel):
+    """Response for POST /predict-route/sweep."""
+    model_config = ConfigDict(protected_namespaces=())      # allow "model_version"
+
+    days: List[str]
+    slots: List[str]
+    slot_minutes: int
+    routes: List[SweepRouteResult]
+    best_route: str
+    best: DepartureWindow
+    model_version: Optional[str] = None
 
 
 # ── Incident ──────────────────────────────────────────────────────────────────
@@ -79,9 +273,32 @@ class IncidentRequest(BaseModel):
     type: str = Field(..., min_length=1, description="Incident type")
     severity: str = Field(..., min_length=1, description="Severity level")
     description: str = Field("", description="Optional description")
+    # Exact position, when the client has one; otherwise `location` is geocoded
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lon: Optional[float] = Field(None, ge=-180, le=180)
+
+
+class IncidentInfo(BaseModel):
+    """A stored, active incident (times are Unix epoch seconds)."""
+    id: int
+    location: str
+    type: str
+    severity: str
+    description: str
+    lat: float
+    lon: float
+    reported_at: float
+    expires_at: float
 
 
 class IncidentResponse(BaseModel):
     """Response for POST /report-incident."""
     status: str
     message: str
+    incident: Optional[IncidentInfo] = None
+
+
+class IncidentListResponse(BaseModel):
+    """Active incidents inside a viewport (GET /incidents)."""
+    count: int
+    incidents: List[IncidentInfo]
@@ -0,0 +1,294 @@
+"""
+run_benchmark.py
+================
+End-to-end latency benchmark for /predict-route against local Photon/OSRM
+stubs (benchmarks/stub_servers.py). Starts the stubs and the app under
+uvicorn, drives the app at fixed concurrency levels and reports p50/p95/p99
+latency, throughput and a per-stage breakdown (from Server-Timing).
+Results are written as JSON so runs can be compared between commits.
+
+Usage:
+    cd backend
+    python -m benchmarks.run_benchmark --concurrency 1 8 32 --requests 300
+    python -m benchmarks.run_benchmark --cache warm --compare benchmarks/results/<previous>.json
+    python -m benchmarks.run_benchmark --backends 2 --slow-rate 0.05 --slow-ms 1500   # tail-heavy pool
+
+Scenarios (--cache):
+    cold   every request uses new place names → geocode + route cache misses
+    warm   a few fixed pairs, primed during warm-up → all cache hits
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+_WARM_PAIRS = [("Andheri", "Hinjewadi"), ("Thane", "Lonavala"), ("Colaba", "Kothrud")]
+
+
+# ── Processes ────────────────────────────────────────────────────────────────
+
+def _start(module_app: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module_app, "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+    )
+
+
+def _wait_ready(url: str, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+# ── Load generation ──────────────────────────────────────────────────────────
+
+def _payload(i: int, cache: str) -> dict:
+    if cache == "warm":
+        source, destination = _WARM_PAIRS[i % len(_WARM_PAIRS)]
+    else:
+        source, destination = f"Bench Origin {i}", f"Bench Destination {i}"
+    return {
+        "source": source,
+        "destination": destination,
+        "travel_day": "monday",
+        "travel_time": f"{(7 + i) % 24:02d}:30",
+        "weather": "Rain",
+    }
+
+
+def _parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    stages = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.startswith("dur="):
+            stages[name] = float(params[4:])
+    return stages
+
+
+async def _run_level(
+    client: httpx.AsyncClient,
+    url: str,
+    concurrency: int,
+    n_requests: int,
+    cache: str,
+    offset: int,
+) -> dict:
+    """Fire *n_requests* with *concurrency* workers; one record per request."""
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    counter = iter(range(n_requests))
+
+    async def worker():
+        for i in counter:
+            body = _payload(offset + i, cache)
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, json=body)
+            except httpx.HTTPError as exc:
+                errors[type(exc).__name__] = errors.get(type(exc).__name__, 0) + 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                continue
+            for name, ms in _parse_server_timing(response.headers.get("server-timing")).items():
+                stages.setdefault(name, []).append(ms)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    lat = np.asarray(latencies) if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "mean": round(float(lat.mean()), 2),
+            "p50": round(float(np.percentile(lat, 50)), 2),
+            "p95": round(float(np.percentile(lat, 95)), 2),
+            "p99": round(float(np.percentile(lat, 99)), 2),
+            "max": round(float(lat.max()), 2),
+        },
+        "stages_ms": {
+            name: {
+                "mean": round(float(np.mean(values)), 2),
+                "p50": round(float(np.percentile(values, 50)), 2),
+                "p95": round(float(np.percentile(values, 95)), 2),
+            }
+            for name, values in stages.items()
+        },
+    }
+
+
+async def _benchmark(args, app_url: str) -> List[dict]:
+    url = f"{app_url}{args.endpoint}"
+    if args.format:
+        url += f"?format={args.format}"
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    results = []
+    offset = 0
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        for concurrency in args.concurrency:
+            await _run_level(client, url, concurrency, args.warmup, args.cache, offset)
+            offset += args.warmup
+            level = await _run_level(client, url, concurrency, args.requests, args.cache, offset)
+            offset += args.requests
+            results.append(level)
+            _print_level(level)
+    return results
+
+
+# ── Reporting ────────────────────────────────────────────────────────────────
+
+def _print_level(level: dict) -> None:
+    lat = level["latency_ms"]
+    breakdown = "  ".join(f"{name}={s['p50']:.1f}" for name, s in level["stages_ms"].items())
+    print(
+        f"c={level['concurrency']:<4d} {level['throughput_rps']:>8.1f} req/s  "
+        f"p50={lat['p50']:.1f}  p95={lat['p95']:.1f}  p99={lat['p99']:.1f} ms  "
+        f"errors={sum(level['errors'].values())}"
+    )
+    if breakdown:
+        print(f"       stages p50 (ms): {breakdown}")
+
+
+def _print_comparison(current: List[dict], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {lvl["concurrency"]: lvl for lvl in json.load(f)["levels"]}
+    print(f"\nvs {baseline_path}:")
+    for level in current:
+        base = baseline.get(level["concurrency"])
+        if base is None:
+            continue
+        deltas = []
+        for key in ("p50", "p95", "p99"):
+            old, new = base["latency_ms"][key], level["latency_ms"][key]
+            deltas.append(f"{key} {new - old:+.1f} ms ({(new - old) / old * 100 if old else 0:+.1f}%)")
+        old, new = base["throughput_rps"], level["throughput_rps"]
+        deltas.append(f"throughput {(new - old) / old * 100 if old else 0:+.1f}%")
+        print(f"  c={level['concurrency']:<4d} " + "  ".join(deltas))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per level")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per level")
+    parser.add_argument("--cache", choices=("cold", "warm"), default="cold")
+    parser.add_argument("--endpoint", default="/predict-route")
+    parser.add_argument("--format", choices=("verbose", "compact"), default=None)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--photon-latency-ms", type=float, default=40.0)
+    parser.add_argument("--osrm-latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--geometry-points", type=int, default=500)
+    parser.add_argument("--backends", type=int, default=1, help="stub instances (ports from --stub-port up)")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of stub calls that stall")
+    parser.add_argument("--slow-ms", type=float, default=1000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub calls answered 503")
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--app-port", type=int, default=9200)
+    parser.add_argument("--url", default=None, help="benchmark an already-running app instead")
+    parser.add_argument("--output", default=None, help="result JSON path (default benchmarks/results/)")
+    parser.add_argument("--compare", default=None, help="previous result JSON to diff against")
+    args = parser.parse_args(argv)
+
+    stub_env = {
+        "STUB_PHOTON_LATENCY_MS": str(args.photon_latency_ms),
+        "STUB_OSRM_LATENCY_MS": str(args.osrm_latency_ms),
+        "STUB_JITTER_MS": str(args.jitter_ms),
+        "STUB_GEOMETRY_POINTS": str(args.geometry_points),
+        "STUB_SLOW_RATE": str(args.slow_rate),
+        "STUB_SLOW_MS": str(args.slow_ms),
+        "STUB_ERROR_RATE": str(args.error_rate),
+    }
+    stub_ports = [args.stub_port + i for i in range(args.backends)]
+    app_env = {
+        "PHOTON_URLS": ",".join(f"http://127.0.0.1:{port}/api" for port in stub_ports),
+        "OSRM_BASE_URLS": ",".join(f"http://127.0.0.1:{port}" for port in stub_ports),
+        "GEOCODE_CACHE_DB_PATH": "",        # memory-only: runs must not share a cache
+        "LOG_LEVEL": "WARNING",
+    }
+
+    processes: List[subprocess.Popen] = []
+    try:
+        app_url = args.url
+        if app_url is None:
+            for port in stub_ports:
+                processes.append(_start("benchmarks.stub_servers:app", port, stub_env))
+            for port in stub_ports:
+                _wait_ready(f"http://127.0.0.1:{port}/calls")
+            processes.append(_start("main:app", args.app_port, app_env))
+            app_url = f"http://127.0.0.1:{args.app_port}"
+            _wait_ready(f"{app_url}/ready")
+        levels = asyncio.run(_benchmark(args, app_url.rstrip("/")))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    commit = _git_commit()
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            key: getattr(args, key)
+            for key in ("endpoint", "format", "cache", "requests", "warmup",
+                        "photon_latency_ms", "osrm_latency_ms", "jitter_ms", "geometry_points",
+                        "backends", "slow_rate", "slow_ms", "error_rate")
+        },
+        "levels": levels,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"bench-{stamp}-{commit or 'nogit'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        _print_comparison(levels, args.compare)
+
+
+if __name__ == "__main__":
+    main()
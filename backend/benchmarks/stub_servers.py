@@ -0,0 +1,186 @@
+"""
+stub_servers.py
+===============
+Local stand-ins for Photon and OSRM, so the backend can be benchmarked
+without the rate-limited public servers. Both are served by one app:
+
+    GET /api?q=...                      Photon search
+    GET /route/v1/driving/{lon,lat;lon,lat}   OSRM route
+    GET /table/v1/driving/{lon,lat;...}       OSRM distance / duration table
+
+Responses are the recorded fixtures in fixtures/, adapted per request:
+each place name geocodes to a stable point derived from its hash, and the
+recorded route geometries are mapped onto the requested endpoints and
+resampled to STUB_GEOMETRY_POINTS, with per-edge annotations to match.
+Latency is simulated per call.
+
+Configuration (env):
+    STUB_PHOTON_LATENCY_MS   mean Photon latency             (default 40)
+    STUB_OSRM_LATENCY_MS     mean OSRM latency               (default 80)
+    STUB_JITTER_MS           ± uniform jitter on both        (default 10)
+    STUB_GEOMETRY_POINTS     points per route geometry       (default 500)
+    STUB_SLOW_RATE           fraction of calls that stall    (default 0)
+    STUB_SLOW_MS             extra latency of a stalled call (default 1000)
+    STUB_ERROR_RATE          fraction of calls answered 503  (default 0)
+
+Run several instances on different ports to stand in for a backend pool
+(OSRM_BASE_URLS / PHOTON_URLS); the stall and error rates model a tail-heavy
+or failing replica.
+
+Usage:
+    cd backend
+    uvicorn benchmarks.stub_servers:app --port 9100
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import os
+import random
+
+import numpy as np
+from fastapi import FastAPI, HTTPException
+
+_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+PHOTON_LATENCY_MS = float(os.getenv("STUB_PHOTON_LATENCY_MS", "40"))
+OSRM_LATENCY_MS = float(os.getenv("STUB_OSRM_LATENCY_MS", "80"))
+JITTER_MS = float(os.getenv("STUB_JITTER_MS", "10"))
+GEOMETRY_POINTS = int(os.getenv("STUB_GEOMETRY_POINTS", "500"))
+SLOW_RATE = float(os.getenv("STUB_SLOW_RATE", "0"))
+SLOW_MS = float(os.getenv("STUB_SLOW_MS", "1000"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+
+# Place names hash into this box (lat, lon) — roughly the Mumbai–Pune region
+_GEOCODE_BOX = ((18.4, 19.3), (72.8, 74.0))
+
+
+def _load(name: str) -> dict:
+    with open(os.path.join(_FIXTURES, name)) as f:
+        return json.load(f)
+
+
+_PHOTON = _load("photon_search.json")
+_OSRM = _load("osrm_route.json")
+
+app = FastAPI(title="Photon / OSRM benchmark stubs")
+calls = {"photon": 0, "osrm": 0, "table": 0}
+
+
+async def _delay(mean_ms: float) -> None:
+    ms = max(0.0, mean_ms + random.uniform(-JITTER_MS, JITTER_MS))
+    if random.random() < SLOW_RATE:
+        ms += SLOW_MS
+    if ms:
+        await asyncio.sleep(ms / 1000)
+    if random.random() < ERROR_RATE:
+        raise HTTPException(status_code=503, detail="Injected stub failure")
+
+
+def _place_point(query: str) -> tuple:
+    """Stable (lon, lat) for a place name."""
+    digest = hashlib.sha1(query.strip().lower().encode()).digest()
+    u = int.from_bytes(digest[:4], "big") / 2 ** 32
+    v = int.from_bytes(digest[4:8], "big") / 2 ** 32
+    (lat_lo, lat_hi), (lon_lo, lon_hi) = _GEOCODE_BOX
+    return lon_lo + u * (lon_hi - lon_lo), lat_lo + v * (lat_hi - lat_lo)
+
+
+def _resample(coords: np.ndarray, n: int) -> np.ndarray:
+    """*n* points evenly spaced along a polyline."""
+    seg = np.hypot(*np.diff(coords, axis=0).T)
+    along = np.concatenate(([0.0], np.cumsum(seg)))
+    target = np.linspace(0.0, along[-1], max(n, 2))
+    return np.column_stack([np.interp(target, along, coords[:, i]) for i in range(2)])
+
+
+def _fit_to(coords: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Rotate/scale a recorded path so its endpoints land on *start* and *end*."""
+    src = complex(*(coords[-1] - coords[0]))
+    dst = complex(*(end - start))
+    factor = dst / src if src else 0
+    z = (coords[:, 0] - coords[0, 0]) + 1j * (coords[:, 1] - coords[0, 1])
+    z = z * factor
+    return np.column_stack((z.real + start[0], z.imag + start[1]))
+
+
+def _annotate(coords: np.ndarray, distance_m: float, duration_s: float) -> dict:
+    """
+    Per-edge distance / duration (OSRM annotations=distance,duration) summing
+    to the route's totals; the first and last tenth drive 1.5× slower, like
+    town streets at either end of a highway.
+    """
+    edge = np.hypot(*np.diff(coords, axis=0).T)
+    distance = edge * distance_m / max(edge.sum(), 1e-12)
+    along = (np.cumsum(distance) - distance / 2) / max(distance_m, 1e-12)
+    slowness = np.where((along < 0.1) | (along > 0.9), 1.5, 1.0)
+    duration = distance * slowness * duration_s / max((distance * slowness).sum(), 1e-12)
+    return {"distance": distance.round(1).tolist(), "duration": duration.round(1).tolist()}
+
+
+@app.get("/api")
+async def photon_search(q: str, limit: int = 1):
+    calls["photon"] += 1
+    await _delay(PHOTON_LATENCY_MS)
+    body = copy.deepcopy(_PHOTON)
+    feature = body["features"][0]
+    feature["geometry"]["coordinates"] = list(_place_point(q))
+    feature["properties"]["name"] = q
+    return body
+
+
+@app.get("/route/v1/driving/{coordinates}")
+async def osrm_route(coordinates: str, alternatives: str = "false"):
+    calls["osrm"] += 1
+    await _delay(OSRM_LATENCY_MS)
+    try:
+        (start, end) = [np.array(p.split(","), dtype=float) for p in coordinates.split(";")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Expected 'lon,lat;lon,lat'")
+
+    body = copy.deepcopy(_OSRM)
+    recorded = body["routes"][0]["geometry"]["coordinates"]
+    # Scale distance/duration by straight-line length relative to the recording
+    ratio = math.dist(start, end) / max(math.dist(recorded[0], recorded[-1]), 1e-9)
+    routes = body["routes"] if alternatives == "true" else body["routes"][:1]
+    for route in routes:
+        path = _fit_to(np.asarray(route["geometry"]["coordinates"]), start, end)
+        route["geometry"]["coordinates"] = _resample(path, GEOMETRY_POINTS).round(6).tolist()
+        for key in ("distance", "duration", "weight"):
+            route[key] = max(route[key] * ratio, 1.0)
+        annotation = _annotate(np.asarray(route["geometry"]["coordinates"]), route["distance"], route["duration"])
+        route["legs"] = route["legs"][:1]
+        route["legs"][0].update(distance=route["distance"], duration=route["duration"], annotation=annotation)
+    body["routes"] = routes
+    body["waypoints"][0]["location"] = start.tolist()
+    body["waypoints"][1]["location"] = end.tolist()
+    return body
+
+
+@app.get("/table/v1/driving/{coordinates}")
+async def osrm_table(coordinates: str, sources: str = "", destinations: str = ""):
+    """Great-circle distance × 1.3 at ~45 km/h for every requested pair."""
+    calls["table"] += 1
+    await _delay(OSRM_LATENCY_MS)
+    try:
+        points = np.radians([np.array(p.split(","), dtype=float)[::-1] for p in coordinates.split(";")])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Expected 'lon,lat;lon,lat;...'")
+    src = [int(i) for i in sources.split(";")] if sources else list(range(len(points)))
+    dst = [int(i) for i in destinations.split(";")] if destinations else list(range(len(points)))
+    a, b = points[src][:, None, :], points[dst][None, :, :]
+    h = np.sin((b[..., 0] - a[..., 0]) / 2) ** 2 + np.cos(a[..., 0]) * np.cos(b[..., 0]) * np.sin((b[..., 1] - a[..., 1]) / 2) ** 2
+    distances = 2 * 6_371_008.8 * np.arcsin(np.sqrt(h)) * 1.3
+    return {
+        "code": "Ok",
+        "distances": distances.round(1).tolist(),
+        "durations": (distances / 12.5).round(1).tolist(),
+    }
+
+
+@app.get("/calls")
+async def call_counts():
+    """Upstream calls served so far — lets a run check its cache hit rate."""
+    return calls
@@ -56,6 +56,47 @@ WEATHER_IMPACT_TEMPLATES: Dict[int, str] = {
 MAX_ROUTES: int = 3
 ROUTE_NAME_FALLBACK_PREFIX: str = "Route "
 
+# ── Degraded answers (request deadline exceeded) ──────────────────────────────
+# Without a route from OSRM, distance is the great-circle distance times a
+# road detour factor, and base time assumes this average speed
+DEGRADED_DETOUR_FACTOR: float = 1.3
+DEGRADED_SPEED_KMH: float = 40.0
+DEGRADED_ROUTE_NAME: str = "Straight-line estimate"
+
+# ── Response geometry ─────────────────────────────────────────────────────────
+# Simplification tolerance derived from a zoom level = this many screen pixels
+GEOMETRY_PIXEL_TOLERANCE: float = 1.0
+# Web-Mercator ground resolution at zoom 0 on the equator (metres / pixel)
+WEB_MERCATOR_M_PER_PX_Z0: float = 156543.03392
+# Decimal places kept by encoded-polyline output (5 = Google / OSRM default)
+POLYLINE_PRECISION: int = 5
+
+# ── Compact response schema ───────────────────────────────────────────────────
+# Selected with ?format=compact or this media type in the Accept header
+COMPACT_SCHEMA_VERSION: int = 2
+COMPACT_MEDIA_TYPE: str = "application/vnd.urban-traffic.v2+json"
+
+# ── Streaming responses (?stream=ndjson|sse on batch / sweep) ─────────────────
+NDJSON_MEDIA_TYPE: str = "application/x-ndjson"
+SSE_MEDIA_TYPE: str = "text/event-stream"
+
+# ── Departure-time sweep ───────────────────────────────────────────────────────
+# Slots whose total time is within this many minutes of the best slot widen
+# the recommended departure window
+SWEEP_WINDOW_TOLERANCE_MIN: float = 2.0
+
+# ── Incident impact ───────────────────────────────────────────────────────────
+# Extra delay (min) per active incident near a route, by reported severity;
+# unrecognised severities count as INCIDENT_DEFAULT_SEVERITY. The total added
+# to one route is capped. A "High" incident also makes the route's risk High.
+INCIDENT_SEVERITY_DELAY_MIN: Dict[str, float] = {
+    "Low": 2.0,
+    "Medium": 5.0,
+    "High": 12.0,
+}
+INCIDENT_DEFAULT_SEVERITY: str = "Medium"
+INCIDENT_MAX_EXTRA_DELAY_MIN: float = 30.0
+
 # ── Weather encoding (must match training-time label encoder) ───────────────────
 WEATHER_SEVERITY_MAP: Dict[str, float] = {
     "Clear": 0.0,
@@ -29,3 +29,114 @@ OSRM_TIMEOUT_SEC: int = int(os.getenv("OSRM_TIMEOUT_SEC", "15"))
 # Photon geocoding (overridable via env)
 PHOTON_URL: str = os.getenv("PHOTON_URL", "https://photon.komoot.io/api/")
 PHOTON_TIMEOUT_SEC: int = int(os.getenv("PHOTON_TIMEOUT_SEC", "10"))
+
+# Several OSRM / Photon backends (comma-separated; default: the single URL above).
+# Requests go to the backend with the lowest latency EWMA × in-flight load; if it
+# hasn't answered by the UPSTREAM_HEDGE_PERCENTILE latency of recent requests
+# (never sooner than UPSTREAM_HEDGE_MIN_MS) a duplicate goes to the next backend
+# and the first answer wins. UPSTREAM_BREAKER_FAILURES consecutive failures open a
+# backend's circuit; after UPSTREAM_BREAKER_COOLDOWN_SEC one trial request probes it.
+OSRM_BASE_URLS: list[str] = [u.strip() for u in os.getenv("OSRM_BASE_URLS", OSRM_BASE_URL).split(",") if u.strip()]
+PHOTON_URLS: list[str] = [u.strip() for u in os.getenv("PHOTON_URLS", PHOTON_URL).split(",") if u.strip()]
+UPSTREAM_HEDGE_PERCENTILE: float = float(os.getenv("UPSTREAM_HEDGE_PERCENTILE", "95"))   # 0 = no hedging
+UPSTREAM_HEDGE_MIN_MS: float = float(os.getenv("UPSTREAM_HEDGE_MIN_MS", "50"))
+UPSTREAM_EWMA_ALPHA: float = float(os.getenv("UPSTREAM_EWMA_ALPHA", "0.2"))
+UPSTREAM_BREAKER_FAILURES: int = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_COOLDOWN_SEC: float = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN_SEC", "10"))
+
+# Request deadline — total budget for /predict-route (?deadline_ms= overrides per
+# call, up to the max); each stage's timeout is capped at the time left, and an
+# exhausted budget returns a flagged degraded answer. 0 = no budget.
+REQUEST_DEADLINE_MS: int = int(os.getenv("REQUEST_DEADLINE_MS", "8000"))
+REQUEST_DEADLINE_MAX_MS: int = int(os.getenv("REQUEST_DEADLINE_MAX_MS", "30000"))
+
+# Shared async HTTP pool for Photon + OSRM (overridable via env)
+HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SEC: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SEC", "30"))
+HTTP_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+
+# Geocode cache — in-memory LRU + SQLite file shared by workers on the host
+# (set GEOCODE_CACHE_DB_PATH to an empty string to keep it memory-only)
+GEOCODE_CACHE_SIZE: int = int(os.getenv("GEOCODE_CACHE_SIZE", "5000"))
+GEOCODE_CACHE_TTL_SEC: float = float(os.getenv("GEOCODE_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL_SEC: float = float(os.getenv("GEOCODE_NEGATIVE_TTL_SEC", "3600"))
+GEOCODE_CACHE_DB_PATH: str = os.getenv(
+    "GEOCODE_CACHE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "geocode_cache.sqlite3"),
+)
+
+# OSRM route cache — coordinates snapped to a grid (degrees; 0.001 ≈ 110 m),
+# memory bounded by total geometry points across all cached routes
+ROUTE_CACHE_GRID_DEG: float = float(os.getenv("ROUTE_CACHE_GRID_DEG", "0.001"))
+ROUTE_CACHE_TTL_SEC: float = float(os.getenv("ROUTE_CACHE_TTL_SEC", "900"))
+ROUTE_CACHE_MAX_POINTS: int = int(os.getenv("ROUTE_CACHE_MAX_POINTS", "500000"))
+
+# /predict-route response cache — serialised bodies keyed on the canonical
+# request, model version and incident state, bounded by total body bytes.
+# Entries (and the max-age sent to browsers / proxies) expire together at the
+# next RESPONSE_CACHE_SLOT_SEC wall-clock boundary; 0 disables the cache
+RESPONSE_CACHE_SLOT_SEC: int = int(os.getenv("RESPONSE_CACHE_SLOT_SEC", "900"))
+RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Batch prediction limits (overridable via env)
+BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "16"))
+
+# ETA matrix (POST /predict-matrix) — max sources / destinations per request;
+# OSRM /table calls are split so none carries more than OSRM_TABLE_MAX_COORDS
+# coordinates (the OSRM server's --max-table-size, 100 by default)
+MATRIX_MAX_POINTS: int = int(os.getenv("MATRIX_MAX_POINTS", "100"))
+OSRM_TABLE_MAX_COORDS: int = int(os.getenv("OSRM_TABLE_MAX_COORDS", "100"))
+
+# Segment congestion profile (segment_profile=true on /predict-route) — default
+# piece length along the response geometry, and the most pieces per route
+# (longer routes get proportionally longer pieces, bounding the model rows)
+SEGMENT_LENGTH_M: float = float(os.getenv("SEGMENT_LENGTH_M", "500"))
+SEGMENT_MAX_PER_ROUTE: int = int(os.getenv("SEGMENT_MAX_PER_ROUTE", "200"))
+
+# Compiled (array-backed) tree evaluator — falls back to sklearn when the model
+# type is unsupported or its output differs from sklearn by more than the tolerance
+USE_COMPILED_MODEL: bool = os.getenv("USE_COMPILED_MODEL", "true").lower() in ("1", "true", "yes")
+COMPILED_MODEL_TOLERANCE: float = float(os.getenv("COMPILED_MODEL_TOLERANCE", "1e-6"))
+COMPILED_MODEL_MAX_ROWS: int = int(os.getenv("COMPILED_MODEL_MAX_ROWS", "256"))
+
+# Startup — preload + warm up models before reporting ready (overridable via env)
+PRELOAD_MODELS: bool = os.getenv("PRELOAD_MODELS", "true").lower() in ("1", "true", "yes")
+LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Delay surface — optional exact lookup-table tier for batch / sweep scoring,
+# built at preload and enabled only if its measured max error is within tolerance
+DELAY_SURFACE_ENABLED: bool = os.getenv("DELAY_SURFACE_ENABLED", "false").lower() in ("1", "true", "yes")
+DELAY_SURFACE_MAX_ERROR_MIN: float = float(os.getenv("DELAY_SURFACE_MAX_ERROR_MIN", "1.0"))
+
+# Coalesce concurrent identical predictions / geocode / route lookups into one
+# execution (in-flight only — results are not kept once it completes)
+COALESCE_REQUESTS: bool = os.getenv("COALESCE_REQUESTS", "true").lower() in ("1", "true", "yes")
+
+# Incident reports — kept in memory on a lat/lon grid (degrees; 0.01 ≈ 1.1 km)
+# and applied to routes passing within the match radius until they expire
+INCIDENT_TTL_SEC: float = float(os.getenv("INCIDENT_TTL_SEC", str(2 * 3600)))
+INCIDENT_MATCH_RADIUS_M: float = float(os.getenv("INCIDENT_MATCH_RADIUS_M", "150"))
+INCIDENT_GRID_DEG: float = float(os.getenv("INCIDENT_GRID_DEG", "0.01"))
+INCIDENT_MAX_ACTIVE: int = int(os.getenv("INCIDENT_MAX_ACTIVE", "10000"))
+
+# Streaming (NDJSON / SSE) — events buffered for a slow client before the
+# producer pauses; bounds memory per stream
+STREAM_QUEUE_SIZE: int = int(os.getenv("STREAM_QUEUE_SIZE", "8"))
+
+# Inference executor — model calls run off the event loop on a "thread" or
+# "process" pool ("inline" = on the loop, as before); calls arriving within
+# INFERENCE_MAX_WAIT_MS are merged into one predict of ≤ INFERENCE_MAX_BATCH_ROWS rows
+INFERENCE_EXECUTOR: str = os.getenv("INFERENCE_EXECUTOR", "thread").lower()
+INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_MAX_BATCH_ROWS: int = int(os.getenv("INFERENCE_MAX_BATCH_ROWS", "256"))
+INFERENCE_MAX_WAIT_MS: float = float(os.getenv("INFERENCE_MAX_WAIT_MS", "2"))
+
+# Model registry — versioned, memory-mapped model artefacts (export_model.py)
+# under MODEL_VERSIONS_DIR; the newest valid version is served and re-checked
+# every MODEL_RELOAD_INTERVAL_SEC (0 = only at startup). MODEL_VERSION pins one.
+# With no version on disk the pickled TRAFFIC_MODEL_PATH is served.
+MODEL_VERSIONS_DIR: str = os.getenv("MODEL_VERSIONS_DIR", os.path.join(MODEL_DIR, "versions"))
+MODEL_VERSION: str = os.getenv("MODEL_VERSION", "")
+MODEL_RELOAD_INTERVAL_SEC: float = float(os.getenv("MODEL_RELOAD_INTERVAL_SEC", "30"))
@@ -0,0 +1,55 @@
+"""
+export_model.py
+===============
+Publish a trained .pkl traffic model as a versioned, memory-mappable
+artefact under models/versions/ (MODEL_VERSIONS_DIR). The model is compiled
+to flat arrays, checked against its own predict(), and written with a smoke
+batch; running servers pick the new version up within
+MODEL_RELOAD_INTERVAL_SEC, validate it and switch without a restart.
+
+Usage:
+    cd backend
+    python export_model.py                                  # models/traffic_ranking_model.pkl
+    python export_model.py --model path/to/model.pkl --version 2026-10-17
+    python export_model.py --list
+"""
+
+import argparse
+import os
+import sys
+
+import joblib
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from config.settings import MODEL_VERSIONS_DIR, TRAFFIC_MODEL_PATH  # noqa: E402
+from services.model_registry import export_version, list_versions, load_version  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=TRAFFIC_MODEL_PATH, help="Pickled GradientBoostingRegressor")
+    parser.add_argument("--versions-dir", default=MODEL_VERSIONS_DIR)
+    parser.add_argument("--version", help="Version name (default: UTC timestamp); the latest export is served, whatever its name")
+    parser.add_argument("--list", action="store_true", help="List exported versions and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for version in list_versions(args.versions_dir):
+            print(version)
+        return 0
+
+    model = joblib.load(args.model)
+    try:
+        version = export_version(model, args.versions_dir, args.version)
+    except (ValueError, FileExistsError) as exc:
+        print(f"Export failed: {exc}", file=sys.stderr)
+        return 1
+    path = os.path.join(args.versions_dir, version)
+    load_version(path)                      # same load + smoke test the server runs
+    print(f"Exported {args.model} → {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
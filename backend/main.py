@@ -3,6 +3,11 @@ FastAPI entry point — Urban Traffic Congestion Prediction backend.
 Inference-only: no database, no retraining.
 """
 
+import time
+
+_IMPORT_START = time.perf_counter()
+
+import logging
 import sys
 import os
 
@@ -10,14 +15,89 @@ import os
 # regardless of the working directory used to launch uvicorn.
 sys.path.insert(0, os.path.dirname(__file__))
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from api.routes import router
+from config.settings import LOG_LEVEL, PRELOAD_MODELS, MODEL_RELOAD_INTERVAL_SEC
+from services.http_client import open_http_client, close_http_client
+from services.geocoding_service import open_geocode_cache
+from services import metrics
+from services.ml_service import preload_models, refresh_models, model_status
+from services.upstream_pool import photon_pool, osrm_pool
+from services.inference_executor import get_inference_executor, shutdown_inference_executor
+from config.settings import INFERENCE_WORKERS
+from services.timing import StageTimingMiddleware
+
+logging.basicConfig(level=LOG_LEVEL, format="%(levelname)s:     %(name)s - %(message)s")
+logging.getLogger("httpx").setLevel(logging.WARNING)   # one INFO line per upstream call otherwise
+logger = logging.getLogger(__name__)
+
+_IMPORT_MS = round((time.perf_counter() - _IMPORT_START) * 1000, 1)
+
+# Readiness — flipped by the lifespan once artefacts are loaded and warm
+_startup: dict = {"ready": False, "import_ms": _IMPORT_MS}
+
+
+async def _reload_models_periodically() -> None:
+    """Pick up newly exported model versions without a restart."""
+    while True:
+        await asyncio.sleep(MODEL_RELOAD_INTERVAL_SEC)
+        try:
+            await asyncio.to_thread(refresh_models)
+        except Exception as exc:
+            logger.warning("Model reload check failed: %s", getattr(exc, "detail", exc))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup: open the shared Photon/OSRM connection pool and the on-disk
+    geocode cache, preload + validate the model artefacts, run a warm-up
+    prediction and start the inference pool's workers. A preload failure keeps /ready at 503 (the process stays
+    up so /health and logs remain reachable). While running, new model
+    versions are checked for every MODEL_RELOAD_INTERVAL_SEC.
+    """
+    logger.info("Imports took %.1f ms", _IMPORT_MS)
+    await open_http_client()
+    await asyncio.to_thread(open_geocode_cache)
+    if PRELOAD_MODELS:
+        start = time.perf_counter()
+        try:
+            report = preload_models()
+            executor = get_inference_executor()
+            if executor is not None:
+                pool_start = time.perf_counter()
+                await executor.warm_up(INFERENCE_WORKERS)
+                report["inference_pool"] = executor.kind
+                report["inference_pool_start_ms"] = round((time.perf_counter() - pool_start) * 1000, 1)
+            _startup.update(report)
+            _startup["ready"] = True
+            logger.info("Models preloaded in %.1f ms: %s", (time.perf_counter() - start) * 1000, report)
+        except Exception as exc:
+            detail = getattr(exc, "detail", str(exc))
+            _startup["error"] = detail
+            logger.error("Model preload failed: %s", detail)
+    else:
+        _startup["ready"] = True     # lazy loading on first request
+    reloader = asyncio.ensure_future(_reload_models_periodically()) if MODEL_RELOAD_INTERVAL_SEC > 0 else None
+    try:
+        yield
+    finally:
+        if reloader is not None:
+            reloader.cancel()
+        shutdown_inference_executor()
+        await close_http_client()
+
 
 app = FastAPI(
     title="Urban Traffic Congestion Predictor",
     description="Inference-only backend — predicts route delays using pre-trained ML models.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # ── CORS — allow the Vite dev server and any localhost origin ────────────────
@@ -27,8 +107,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],   # readable by the frontend for profiling
 )
 
+# ── Per-stage timings → Server-Timing response header ───────────────────────
+app.add_middleware(StageTimingMiddleware)
+
 # ── Register routes ──────────────────────────────────────────────────────────
 app.include_router(router)
 
@@ -37,3 +121,20 @@ app.include_router(router)
 async def health():
     """Simple liveness probe."""
     return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe — 503 until models are loaded and warmed up."""
+    status = 200 if _startup["ready"] else 503
+    content = {"status": "ready" if status == 200 else "not ready", **_startup}
+    if status == 200 and PRELOAD_MODELS:
+        content["model"] = model_status()
+    content["upstreams"] = {pool.name: pool.status() for pool in (photon_pool, osrm_pool)}
+    return JSONResponse(status_code=status, content=content)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage / upstream / request latency histograms, cache and model counters (Prometheus text format)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
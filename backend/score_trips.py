@@ -0,0 +1,402 @@
+"""
+score_trips.py
+==============
+Offline bulk scoring for trip files — the /predict-route pipeline without
+HTTP, for nightly planning runs over hundreds of thousands of trips.
+
+The file is read in chunks. Place names and origin/destination pairs are
+deduplicated across the whole file (bounded memos on top of the geocode and
+route caches), upstream lookups run with bounded concurrency, and each chunk
+is scored as one feature matrix. Results are written chunk by chunk, so
+memory stays flat whatever the file size.
+
+Input columns:  source, destination, travel_day, travel_time, weather
+                (weather may be left out in favour of --weather); any other
+                columns are passed through unchanged.
+Output columns: the input columns + route_name, n_routes, distance_km,
+                base_time_min, delay_min, total_time_min (the route with the
+                lowest predicted total time) and error (empty on success).
+
+CSV output is appended per chunk. Parquet output (a path ending in .parquet)
+is a directory with one part file per chunk. After every chunk a checkpoint
+(<output>.checkpoint.json) records the progress; --resume continues after
+the last completed chunk. Parquet input or output needs pyarrow.
+
+Usage:
+    cd backend
+    python score_trips.py trips.csv scored.csv
+    python score_trips.py trips.parquet scored.parquet --chunk-size 20000 --concurrency 16
+    python score_trips.py trips.csv scored.csv --resume
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi import HTTPException  # noqa: E402
+
+from config.constants import MAX_ROUTES  # noqa: E402
+from services import ml_service  # noqa: E402
+from services.cache import TTLCache  # noqa: E402
+from services.feature_engineering import build_feature_matrix_batch, time_context  # noqa: E402
+from services.geocoding_service import geocode_async, normalize_place_name  # noqa: E402
+from services.http_client import close_http_client  # noqa: E402
+from services.routing_service import fetch_routes_async  # noqa: E402
+
+REQUIRED_COLUMNS = ("source", "destination", "travel_day", "travel_time")
+RESULT_COLUMNS = ("route_name", "n_routes", "distance_km", "base_time_min", "delay_min", "total_time_min", "error")
+# Fixed per column, so chunks with failed (empty) rows write the same types as the rest
+RESULT_DTYPES = {"route_name": object, "n_routes": "Int64", "distance_km": "float64", "base_time_min": "float64",
+                 "delay_min": "float64", "total_time_min": "float64", "error": object}
+
+_NO_EXPIRY = float("inf")
+
+
+# ── Input / output ───────────────────────────────────────────────────────────
+
+def _is_parquet(path: str) -> bool:
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        sys.exit("Parquet files need pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def count_rows(path: str) -> Optional[int]:
+    """Row count when it is free (Parquet metadata); None for CSV."""
+    if _is_parquet(path):
+        return _pyarrow().parquet.ParquetFile(path).metadata.num_rows
+    return None
+
+
+def read_chunks(path: str, chunk_size: int, skip_rows: int) -> Iterator[pd.DataFrame]:
+    """DataFrames of up to *chunk_size* trips, starting after *skip_rows* data rows."""
+    if _is_parquet(path):
+        parquet = _pyarrow().parquet.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunk_size):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            frame = batch.to_pandas()
+            yield frame.iloc[skip_rows:].reset_index(drop=True)
+            skip_rows = 0
+        return
+    yield from pd.read_csv(
+        path,
+        chunksize=chunk_size,
+        skiprows=range(1, skip_rows + 1),
+        dtype=str,
+        keep_default_na=False,
+    )
+
+
+class CsvOutput:
+    """Appends chunks to one CSV; on resume, first cuts off anything past the checkpoint."""
+
+    def __init__(self, path: str, resume_bytes: Optional[int]):
+        self.path = path
+        if resume_bytes is None:
+            self._file = open(path, "w", newline="")
+        else:
+            self._file = open(path, "r+", newline="")
+            self._file.truncate(resume_bytes)
+            self._file.seek(resume_bytes)
+        self._header = self._file.tell() == 0
+
+    def write(self, frame: pd.DataFrame, chunk_index: int) -> int:
+        frame.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetOutput:
+    """One part file per chunk in a directory; each part appears atomically."""
+
+    def __init__(self, path: str, resume_chunks: Optional[int]):
+        self.path = path
+        self._pa = _pyarrow()
+        os.makedirs(path, exist_ok=True)
+        keep = resume_chunks or 0
+        for name in os.listdir(path):
+            # Parts past the checkpoint (or all of them on a fresh run) are stale
+            if name.startswith("part-") and int(name[5:10]) >= keep:
+                os.remove(os.path.join(path, name))
+
+    def write(self, frame: pd.DataFrame, chunk_index: int) -> int:
+        target = os.path.join(self.path, f"part-{chunk_index:05d}.parquet")
+        staging = target + ".tmp"
+        self._pa.parquet.write_table(self._pa.Table.from_pandas(frame, preserve_index=False), staging)
+        os.replace(staging, target)
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+# ── Checkpoints ──────────────────────────────────────────────────────────────
+
+def _input_fingerprint(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "input_size": stat.st_size, "input_mtime": stat.st_mtime}
+
+
+def load_checkpoint(path: str, input_path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        checkpoint = json.load(f)
+    fingerprint = _input_fingerprint(input_path)
+    if any(checkpoint.get(key) != value for key, value in fingerprint.items()):
+        sys.exit(f"{input_path} changed since checkpoint {path} was written; rerun without --resume")
+    return checkpoint
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    staging = path + ".tmp"
+    with open(staging, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(staging, path)
+
+
+# ── Scoring ──────────────────────────────────────────────────────────────────
+
+class TripScorer:
+    """
+    Scores chunks of trips. Geocodes and routes are memoised per normalised
+    place name / coordinate pair (failures included, so a bad name costs one
+    lookup), up to *memo_size* entries each; upstream failures (5xx) are not
+    memoised, so a later chunk tries again. Upstream calls are limited to
+    *concurrency* at a time.
+    """
+
+    def __init__(self, concurrency: int, memo_size: int, default_weather: Optional[str]):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.places = TTLCache(max_weight=memo_size, default_ttl=_NO_EXPIRY)
+        self.routes = TTLCache(max_weight=memo_size, default_ttl=_NO_EXPIRY)
+        self.default_weather = default_weather
+        self._weather: Dict[str, Any] = {}
+        self._times: Dict[Tuple[str, str], Any] = {}
+        self.geocode_lookups = 0                # memo misses (served by the geocode cache or Photon)
+        self.route_lookups = 0
+
+    async def _geocode(self, key: str, name: str) -> Any:
+        async with self.slots:
+            try:
+                value: Any = await geocode_async(name)
+            except HTTPException as exc:
+                if exc.status_code >= 500:                  # upstream trouble: retry in a later chunk
+                    return f"geocode: {exc.detail}"
+                value = f"geocode: {exc.detail}"
+        self.places.set(key, value)
+        return value
+
+    async def _route(self, pair: Tuple[Tuple[float, float], Tuple[float, float]]) -> Any:
+        (src_lat, src_lon), (dst_lat, dst_lon) = pair
+        async with self.slots:
+            try:
+                routes = await fetch_routes_async(src_lat, src_lon, dst_lat, dst_lon, max_routes=MAX_ROUTES)
+                # Geometry is not needed here, and is most of a route's memory
+                value: Any = [
+                    {key: r[key] for key in ("route_name", "distance_km", "base_duration_min")}
+                    for r in routes
+                ] or "routing: no routes found"
+            except HTTPException as exc:
+                if exc.status_code >= 500:
+                    return f"routing: {exc.detail}"
+                value = f"routing: {exc.detail}"
+        self.routes.set(pair, value)
+        return value
+
+    def _weather_severity(self, weather: str) -> Any:
+        if weather not in self._weather:
+            try:
+                self._weather[weather] = ml_service.encode_weather(weather)
+            except HTTPException as exc:
+                self._weather[weather] = f"weather: {exc.detail}"
+        return self._weather[weather]
+
+    def _time(self, travel_time: str, travel_day: str) -> Any:
+        key = (travel_time, travel_day)
+        if key not in self._times:
+            try:
+                self._times[key] = time_context(travel_time, travel_day)
+            except (ValueError, IndexError):
+                self._times[key] = f"invalid travel_time '{travel_time}'"
+        return self._times[key]
+
+    async def score(self, frame: pd.DataFrame) -> pd.DataFrame:
+        sources = frame["source"].astype(str).tolist()
+        destinations = frame["destination"].astype(str).tolist()
+        if "weather" in frame.columns:
+            weathers = frame["weather"].astype(str).tolist()
+        else:
+            weathers = [self.default_weather] * len(frame)
+
+        # 1. Geocode every distinct place not already memoised
+        keys = {}
+        for name in (*sources, *destinations):
+            keys.setdefault(name, normalize_place_name(name))
+        known = {key: self.places.get(key) for key in set(keys.values())}
+        missing = {key: name for name, key in keys.items() if known[key] is None}
+        self.geocode_lookups += len(missing)
+        known.update(zip(missing, await asyncio.gather(*(self._geocode(k, n) for k, n in missing.items()))))
+        located = {name: known[key] for name, key in keys.items()}
+
+        # 2. Route every distinct coordinate pair not already memoised
+        pairs = {
+            (located[s], located[d])
+            for s, d in zip(sources, destinations)
+            if isinstance(located[s], tuple) and isinstance(located[d], tuple)
+        }
+        routed = {pair: self.routes.get(pair) for pair in pairs}
+        missing_pairs = [pair for pair, value in routed.items() if value is None]
+        self.route_lookups += len(missing_pairs)
+        routed.update(zip(missing_pairs, await asyncio.gather(*(self._route(p) for p in missing_pairs))))
+
+        # 3. One feature matrix for every candidate route of every valid trip
+        results: Dict[str, List[Any]] = {column: [None] * len(frame) for column in RESULT_COLUMNS}
+        items, owners = [], []
+        for row, (src, dst, day, when, weather) in enumerate(
+            zip(sources, destinations, frame["travel_day"], frame["travel_time"], weathers)
+        ):
+            origin, target = located[src], located[dst]
+            routes = routed.get((origin, target))
+            context = self._time(str(when), str(day))
+            severity = self._weather_severity(str(weather))
+            error = next(
+                (v for v in (origin, target, routes, context, severity) if isinstance(v, str)),
+                None,
+            )
+            if error is not None:
+                results["error"][row] = error
+                continue
+            hour, weekend = context
+            items.append((routes, hour, weekend, severity))
+            owners.append(row)
+
+        if items:
+            features = build_feature_matrix_batch(items, ml_service.model_feature_names())
+            delays = np.asarray(ml_service.predict_delay(features, allow_surface=True))
+            offset = 0
+            for row, (routes, _, _, _) in zip(owners, items):
+                base = np.array([r["base_duration_min"] for r in routes])
+                delay = delays[offset:offset + len(routes)]
+                offset += len(routes)
+                best = int(np.argmin(base + delay))
+                results["route_name"][row] = routes[best]["route_name"]
+                results["n_routes"][row] = len(routes)
+                results["distance_km"][row] = routes[best]["distance_km"]
+                results["base_time_min"][row] = base[best]
+                results["delay_min"][row] = float(delay[best])
+                results["total_time_min"][row] = round(float(base[best] + delay[best]), 2)
+                results["error"][row] = ""
+
+        out = frame.copy()
+        for column in RESULT_COLUMNS:
+            out[column] = pd.array(results[column], dtype=RESULT_DTYPES[column])
+        return out
+
+
+# ── Driver ───────────────────────────────────────────────────────────────────
+
+def _progress(state: Dict[str, Any], total: Optional[int], started: float, resumed_rows: int) -> str:
+    elapsed = time.perf_counter() - started
+    rate = (state["rows_done"] - resumed_rows) / elapsed if elapsed > 0 else 0.0
+    line = f"{state['rows_done']:>10,} rows  {rate:>8,.0f} rows/s  failed {state['failed']:,}"
+    if total:
+        line += f"  {100 * state['rows_done'] / total:5.1f}%"
+        if rate > 0:
+            line += f"  eta {(total - state['rows_done']) / rate:,.0f}s"
+    return line
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    checkpoint_path = args.checkpoint or f"{args.output.rstrip('/')}.checkpoint.json"
+    if args.resume and os.path.exists(checkpoint_path):
+        state = load_checkpoint(checkpoint_path, args.input)
+        print(f"Resuming after {state['rows_done']:,} rows ({state['chunks_done']} chunks)", file=sys.stderr)
+    else:
+        if os.path.exists(args.output) and not args.force and not args.resume:
+            sys.exit(f"{args.output} exists; pass --force to overwrite or --resume to continue")
+        state = {**_input_fingerprint(args.input), "rows_done": 0, "chunks_done": 0,
+                 "output_bytes": 0, "scored": 0, "failed": 0}
+        args.resume = False
+
+    if _is_parquet(args.output):
+        output: Any = ParquetOutput(args.output, state["chunks_done"] if args.resume else None)
+    else:
+        output = CsvOutput(args.output, state["output_bytes"] if args.resume else None)
+
+    ml_service.preload_models()
+    scorer = TripScorer(args.concurrency, args.memo_size, args.weather)
+    total = count_rows(args.input)
+    started = time.perf_counter()
+    resumed_rows = state["rows_done"]
+    try:
+        for frame in read_chunks(args.input, args.chunk_size, state["rows_done"]):
+            missing = [c for c in REQUIRED_COLUMNS if c not in frame.columns]
+            if "weather" not in frame.columns and args.weather is None:
+                missing.append("weather (or --weather)")
+            if missing:
+                sys.exit(f"{args.input} is missing column(s): {', '.join(missing)}")
+
+            scored = await scorer.score(frame)
+            failed = int((scored["error"] != "").sum())
+            state["output_bytes"] = output.write(scored, state["chunks_done"])
+            state["rows_done"] += len(frame)
+            state["chunks_done"] += 1
+            state["scored"] += len(frame) - failed
+            state["failed"] += failed
+            save_checkpoint(checkpoint_path, state)
+            print(_progress(state, total, started, resumed_rows), file=sys.stderr)
+    finally:
+        output.close()
+        await close_http_client()
+
+    state["elapsed_sec"] = round(time.perf_counter() - started, 1)
+    state["geocode_lookups"] = scorer.geocode_lookups
+    state["route_lookups"] = scorer.route_lookups
+    return state
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="trips .csv or .parquet")
+    parser.add_argument("output", help="scored .csv, or .parquet (a directory of part files)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="trips per chunk / model pass")
+    parser.add_argument("--concurrency", type=int, default=8, help="upstream lookups in flight")
+    parser.add_argument("--memo-size", type=int, default=200_000,
+                        help="places / routes remembered across chunks (each)")
+    parser.add_argument("--weather", choices=("Clear", "Fog", "Rain", "Snow", "Extreme"),
+                        help="weather for files without a weather column")
+    parser.add_argument("--checkpoint", help="checkpoint path (default <output>.checkpoint.json)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument("--force", action="store_true", help="overwrite an existing output")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        sys.exit("Interrupted — rerun with --resume to continue after the last completed chunk")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
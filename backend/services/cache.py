@@ -0,0 +1,92 @@
+"""
+In-memory LRU cache with per-entry TTLs and hit/miss counters.
+Shared by the geocode and routing caches; sizes and TTLs come from settings.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU map whose entries expire after their own TTL.
+
+    Capacity is measured in "weight" — one per entry by default, or whatever
+    *weigh(value)* returns (e.g. number of geometry points) so the bound can
+    track real memory use rather than entry count.
+    """
+
+    def __init__(
+        self,
+        max_weight: int,
+        default_ttl: float,
+        weigh: Optional[Callable[[Any], int]] = None,
+    ):
+        self.max_weight = max_weight
+        self.default_ttl = default_ttl
+        self._weigh = weigh or (lambda _value: 1)
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the live value for *key* (refreshing its LRU position) or *default*."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at, weight = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._weight -= weight
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store *value*; *ttl* overrides the default lifetime for this entry."""
+        weight = self._weigh(value)
+        if weight > self.max_weight:
+            return
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._weight -= old[2]
+            self._data[key] = (value, expires_at, weight)
+            self._weight += weight
+            while self._weight > self.max_weight:
+                _, (_, _, evicted_weight) = self._data.popitem(last=False)
+                self._weight -= evicted_weight
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for tuning cache size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "weight": self._weight,
+            "max_weight": self.max_weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,174 @@
+"""
+Array-backed evaluator for fitted sklearn GradientBoostingRegressor models.
+Flattens every tree into contiguous NumPy arrays and walks all trees for a
+whole batch at once — no per-call validation, no per-tree Python dispatch.
+"""
+
+import warnings
+from typing import Optional
+
+import numpy as np
+
+# Rows walked per pass; bounds the (n_trees × rows) node-index buffer.
+_CHUNK_ROWS = 256
+
+
+class CompiledTreeEnsemble:
+    """
+    Additive tree ensemble stored as flat arrays:
+
+        feature[i], threshold[i]  split of node i
+        left[i]                   left child id; the right child is left[i] + 1
+        value[i]                  leaf value (unused for split nodes)
+        roots[t]                  node id of tree t's root
+
+    Nodes are renumbered so siblings are adjacent, which makes a step
+    ``node = left[node] + (x > threshold)``. Leaves point at themselves with
+    a +inf threshold, so every row takes exactly ``depth`` vectorised steps
+    whatever depth its leaf sits at.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        depth: int,
+        init: float,
+        learning_rate: float,
+        n_features: int,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.init = init
+        self.learning_rate = learning_rate
+        self.n_features = n_features
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Raw predictions for a (rows × n_features) matrix in training column order."""
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Expected a (n, {self.n_features}) feature matrix, got shape {X.shape}"
+            )
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], _CHUNK_ROWS):
+            out[start:start + _CHUNK_ROWS] = self._predict_chunk(X[start:start + _CHUNK_ROWS])
+        return out
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        # Index the flattened matrix directly: row offset + feature column
+        flat = X.ravel()
+        row_offset = (np.arange(X.shape[0], dtype=np.int64) * X.shape[1])[None, :]
+        node = np.repeat(self.roots[:, None], X.shape[0], axis=1)
+        for _ in range(self.depth):
+            go_right = flat[row_offset + self.feature[node]] > self.threshold[node]
+            node = self.left[node] + go_right
+        return self.init + self.learning_rate * self.value[node].sum(axis=0)
+
+
+def compile_gradient_boosting(model) -> Optional[CompiledTreeEnsemble]:
+    """
+    Flatten a fitted single-output GradientBoostingRegressor.
+    Returns None for anything else, so the caller can keep using sklearn.
+    """
+    if type(model).__name__ != "GradientBoostingRegressor" or not hasattr(model, "estimators_"):
+        return None
+    if model.estimators_.ndim != 2 or model.estimators_.shape[1] != 1:
+        return None
+
+    init = model.init_
+    if isinstance(init, str) and init == "zero":
+        init_value = 0.0
+    elif type(init).__name__ == "DummyRegressor" and hasattr(init, "constant_"):
+        init_value = float(np.ravel(init.constant_)[0])
+    else:
+        return None
+
+    features, thresholds, lefts, values, roots = [], [], [], [], []
+    offset = 0
+    depth = 0
+    for estimator in model.estimators_[:, 0]:
+        tree = estimator.tree_
+        feature, threshold, left, value = _flatten_tree(tree)
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left + offset)
+        values.append(value)
+        roots.append(offset)
+        offset += len(feature)
+        depth = max(depth, int(tree.max_depth))
+
+    return CompiledTreeEnsemble(
+        feature=np.concatenate(features).astype(np.int64),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.int64),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.asarray(roots, dtype=np.int64),
+        depth=depth,
+        init=init_value,
+        learning_rate=float(model.learning_rate),
+        n_features=int(model.n_features_in_),
+    )
+
+
+def _flatten_tree(tree):
+    """Renumber one sklearn tree breadth-first so every node's children are adjacent."""
+    children_left = tree.children_left
+    children_right = tree.children_right
+    leaf_values = tree.value.reshape(tree.node_count, -1)[:, 0]
+
+    order = [0]                 # new id → old id
+    new_left = {}
+    for old in order:           # grows while iterating: breadth-first walk
+        if children_left[old] >= 0:
+            new_left[old] = len(order)
+            order.extend((children_left[old], children_right[old]))
+
+    n = len(order)
+    feature = np.zeros(n, dtype=np.int64)
+    threshold = np.full(n, np.inf)
+    left = np.arange(n, dtype=np.int64)          # leaves point at themselves
+    value = np.zeros(n, dtype=np.float64)
+    for new, old in enumerate(order):
+        if old in new_left:
+            feature[new] = tree.feature[old]
+            threshold[new] = tree.threshold[old]
+            left[new] = new_left[old]
+        else:
+            value[new] = leaf_values[old]
+    return feature, threshold, left, value
+
+
+def validation_batch(compiled: CompiledTreeEnsemble, n_rows: int = 256, seed: int = 0) -> np.ndarray:
+    """
+    Synthetic rows spanning every feature's split range, including rows that
+    sit exactly on thresholds (where float32/float64 handling matters).
+    """
+    rng = np.random.RandomState(seed)
+    X = np.zeros((n_rows, compiled.n_features), dtype=np.float64)
+    is_split = np.isfinite(compiled.threshold)
+    for col in range(compiled.n_features):
+        cuts = compiled.threshold[is_split & (compiled.feature == col)]
+        lo, hi = (cuts.min() - 1.0, cuts.max() + 1.0) if cuts.size else (0.0, 1.0)
+        X[:, col] = rng.uniform(lo, hi, n_rows)
+        if cuts.size:
+            on_cut = rng.rand(n_rows) < 0.1
+            X[on_cut, col] = rng.choice(cuts, on_cut.sum())
+    return X
+
+
+def max_abs_error(compiled: CompiledTreeEnsemble, model, X: np.ndarray) -> float:
+    """Largest |compiled − sklearn| over *X* — checked once at load time."""
+    with warnings.catch_warnings():
+        # Plain ndarray input on a model fitted with feature names
+        warnings.simplefilter("ignore", UserWarning)
+        reference = model.predict(X)
+    return float(np.max(np.abs(compiled.predict(X) - reference)))
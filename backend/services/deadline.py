@@ -0,0 +1,83 @@
+"""
+Request deadlines — one time budget per request, carried in a context
+variable so every stage underneath (geocoding, routing, inference) can cap
+its own timeout at the time that is left.
+"""
+
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+from services.metrics import counter
+
+T = TypeVar("T")
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+DEADLINE_EXCEEDED = counter(
+    "traffic_deadline_exceeded_total",
+    "Requests whose time budget ran out, by the stage it ran out in.",
+    labels=("stage",),
+)
+
+
+class DeadlineExceeded(Exception):
+    """The current request's time budget ran out before *stage* finished."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded during {stage}")
+        self.stage = stage
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """Give the code inside (and tasks it starts) *seconds* in total; None = no budget."""
+    if seconds is None:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget (≥ 0), or None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0.0
+
+
+def capped_timeout(timeout: float, stage: str) -> float:
+    """*timeout* capped at the time left; raises DeadlineExceeded once none is."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0.0:
+        raise_exceeded(stage)
+    return min(timeout, left)
+
+
+def raise_exceeded(stage: str) -> None:
+    DEADLINE_EXCEEDED.inc(stage=stage)
+    raise DeadlineExceeded(stage)
+
+
+async def within_deadline(awaitable: Awaitable[T], stage: str) -> T:
+    """Await *awaitable*, cancelling it and raising DeadlineExceeded when the budget runs out."""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=left)
+    except asyncio.TimeoutError:
+        raise_exceeded(stage)
@@ -0,0 +1,196 @@
+"""
+Precomputed delay surface — optional fast inference tier.
+
+Apart from distance and duration, every model input is discrete: 24 hours,
+weekend flag, the WEATHER_SEVERITY_MAP levels and the constant defaults. With
+those fixed, a tree ensemble collapses to a step function of distance and
+duration that only changes at the split thresholds still reachable in that
+context. Each context gets one table with a cell per step, read straight off
+the compiled trees, so a lookup is exact: a binary search on each axis
+instead of a walk through every tree. Rows whose context is not on the table
+are left to the real model.
+"""
+
+import math
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import DEFAULT_DENSITY, DEFAULT_LANES, DEFAULT_SIGNALS
+from services.compiled_model import CompiledTreeEnsemble
+from services.feature_engineering import HOUR_SIN, HOUR_COS, column_positions
+
+# (distance thresholds, duration thresholds, cell values) of one context
+Table = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class DelaySurface:
+    """
+    tables[(hour * 2 + weekend) * len(weather_levels) + weather_idx] holds
+    that context's sorted distance / duration thresholds and a
+    (len(distance) + 1, len(duration) + 1) table of raw model output; cell
+    (i, j) covers inputs above i distance and j duration thresholds.
+    """
+
+    def __init__(self, weather_levels: np.ndarray, tables: List[Table], feature_names: Sequence[str]):
+        self.weather_levels = weather_levels
+        self.tables = tables
+        self.positions = column_positions(tuple(feature_names))
+        self.max_error = math.inf
+        self.p99_error = math.inf
+
+    @classmethod
+    def build(
+        cls,
+        compiled: CompiledTreeEnsemble,
+        feature_names: Sequence[str],
+        weather_levels: Sequence[float],
+    ) -> "DelaySurface":
+        """Tabulate *compiled* (columns in *feature_names* order) for every context."""
+        levels = np.asarray(sorted(weather_levels), dtype=np.float64)
+        pos = column_positions(tuple(feature_names))
+        context = np.zeros(compiled.n_features, dtype=np.float64)
+        context[pos[6]], context[pos[7]], context[pos[8]] = DEFAULT_DENSITY, DEFAULT_LANES, DEFAULT_SIGNALS
+        tables = []
+        for hour in range(24):
+            for weekend in (0, 1):
+                for level in levels:
+                    context[pos[2]], context[pos[3]] = HOUR_SIN[hour], HOUR_COS[hour]
+                    context[pos[4]], context[pos[5]] = weekend, level
+                    tables.append(_tabulate(compiled, context, pos[0], pos[1]))
+        return cls(levels, tables, feature_names)
+
+    def measure_error(
+        self,
+        predict_raw: Callable[[np.ndarray], np.ndarray],
+        n_rows: int = 4096,
+        seed: int = 0,
+    ) -> Dict[str, float]:
+        """
+        Max / p99 |surface − model| over random in-table rows, a tenth of them
+        exactly on a threshold; stored on the surface. Only float32 rounding
+        of the table should show.
+        """
+        rng = np.random.RandomState(seed)
+        pos = self.positions
+        X = np.empty((n_rows, len(pos)), dtype=np.float64)
+        hours = rng.randint(0, 24, n_rows)
+        for col, axis in ((pos[0], 0), (pos[1], 1)):
+            cuts = np.concatenate([table[axis] for table in self.tables] + [np.zeros(1)])
+            X[:, col] = rng.uniform(cuts.min() - 1.0, cuts.max() + 1.0, n_rows)
+            on_cut = rng.rand(n_rows) < 0.1
+            X[on_cut, col] = rng.choice(cuts, on_cut.sum())
+        X[:, pos[2]] = HOUR_SIN[hours]
+        X[:, pos[3]] = HOUR_COS[hours]
+        X[:, pos[4]] = rng.randint(0, 2, n_rows)
+        X[:, pos[5]] = rng.choice(self.weather_levels, n_rows)
+        X[:, pos[6]] = DEFAULT_DENSITY
+        X[:, pos[7]] = DEFAULT_LANES
+        X[:, pos[8]] = DEFAULT_SIGNALS
+        estimate, _ = self.lookup(X)
+        error = np.abs(estimate - predict_raw(X))
+        self.max_error = float(error.max())
+        self.p99_error = float(np.percentile(error, 99))
+        return {"max_error_min": round(self.max_error, 4), "p99_error_min": round(self.p99_error, 4)}
+
+    def lookup(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (raw estimates, covered mask) for a feature matrix in model order.
+        Estimates are only meaningful where covered is True.
+        """
+        pos = self.positions
+
+        # Decode the discrete context and check every row really is on the table
+        sin, cos = X[:, pos[2]], X[:, pos[3]]
+        hour = np.rint(np.arctan2(sin, cos) * 24 / (2 * math.pi)).astype(np.int64) % 24
+        weekend = X[:, pos[4]]
+        weather = X[:, pos[5]]
+        w_idx = np.clip(np.searchsorted(self.weather_levels, weather), 0, self.weather_levels.size - 1)
+        # Trees compare float32 inputs (see CompiledTreeEnsemble.predict)
+        distance = X[:, pos[0]].astype(np.float32).astype(np.float64)
+        duration = X[:, pos[1]].astype(np.float32).astype(np.float64)
+        covered = (
+            (HOUR_SIN[hour] == sin) & (HOUR_COS[hour] == cos)
+            & ((weekend == 0) | (weekend == 1))
+            & (self.weather_levels[w_idx] == weather)
+            & (X[:, pos[6]] == DEFAULT_DENSITY)
+            & (X[:, pos[7]] == DEFAULT_LANES)
+            & (X[:, pos[8]] == DEFAULT_SIGNALS)
+            & np.isfinite(distance) & np.isfinite(duration)
+        )
+
+        estimate = np.zeros(X.shape[0], dtype=np.float64)
+        context = (hour * 2 + (weekend == 1)) * self.weather_levels.size + w_idx
+        rows = np.flatnonzero(covered)
+        for ctx in np.unique(context[rows]):
+            at = rows[context[rows] == ctx]
+            distance_cuts, duration_cuts, values = self.tables[ctx]
+            # Cell = number of thresholds the input lies above (x > t goes right)
+            i = np.searchsorted(distance_cuts, distance[at], side="left")
+            j = np.searchsorted(duration_cuts, duration[at], side="left")
+            estimate[at] = values[i, j]
+        return estimate, covered
+
+    def stats(self) -> Dict[str, float]:
+        cells = [table[2].size for table in self.tables]
+        return {
+            "contexts": len(self.tables),
+            "cells": int(sum(cells)),
+            "max_cells_per_context": int(max(cells)),
+            "bytes": int(sum(sum(part.nbytes for part in table) for table in self.tables)),
+            "max_error_min": round(self.max_error, 4),
+            "p99_error_min": round(self.p99_error, 4),
+        }
+
+
+def _tabulate(compiled: CompiledTreeEnsemble, context: np.ndarray, distance_col: int, duration_col: int) -> Table:
+    """
+    One context's step table. Every tree is walked with the context columns
+    fixed, so only distance / duration splits branch; each leaf reached adds
+    its value over the rectangle of cells its path allows, and a 2-D prefix
+    sum of those rectangle corners gives the table.
+    """
+    fixed = context.astype(np.float32).astype(np.float64)
+    leaves = []                           # (value, distance (lo, hi], duration (lo, hi])
+    for root in compiled.roots:
+        stack = [(int(root), -math.inf, math.inf, -math.inf, math.inf)]
+        while stack:
+            node, d_lo, d_hi, t_lo, t_hi = stack.pop()
+            threshold = compiled.threshold[node]
+            if not math.isfinite(threshold):
+                leaves.append((compiled.value[node], d_lo, d_hi, t_lo, t_hi))
+                continue
+            left = int(compiled.left[node])
+            column = compiled.feature[node]
+            if column == distance_col:
+                if d_lo < threshold:
+                    stack.append((left, d_lo, min(d_hi, threshold), t_lo, t_hi))
+                if threshold < d_hi:
+                    stack.append((left + 1, max(d_lo, threshold), d_hi, t_lo, t_hi))
+            elif column == duration_col:
+                if t_lo < threshold:
+                    stack.append((left, d_lo, d_hi, t_lo, min(t_hi, threshold)))
+                if threshold < t_hi:
+                    stack.append((left + 1, d_lo, d_hi, max(t_lo, threshold), t_hi))
+            else:
+                stack.append((left + int(fixed[column] > threshold), d_lo, d_hi, t_lo, t_hi))
+
+    value, d_lo, d_hi, t_lo, t_hi = (np.array(column, dtype=np.float64) for column in zip(*leaves))
+    distance_cuts = np.unique(np.concatenate((d_lo, d_hi)))
+    duration_cuts = np.unique(np.concatenate((t_lo, t_hi)))
+    distance_cuts = distance_cuts[np.isfinite(distance_cuts)]
+    duration_cuts = duration_cuts[np.isfinite(duration_cuts)]
+
+    # Inputs in (lo, hi] occupy cells [index(lo) + 1, index(hi) + 1); ±inf are the ends
+    i0 = np.where(np.isfinite(d_lo), np.searchsorted(distance_cuts, d_lo) + 1, 0)
+    i1 = np.where(np.isfinite(d_hi), np.searchsorted(distance_cuts, d_hi) + 1, distance_cuts.size + 1)
+    j0 = np.where(np.isfinite(t_lo), np.searchsorted(duration_cuts, t_lo) + 1, 0)
+    j1 = np.where(np.isfinite(t_hi), np.searchsorted(duration_cuts, t_hi) + 1, duration_cuts.size + 1)
+    corners = np.zeros((distance_cuts.size + 2, duration_cuts.size + 2), dtype=np.float64)
+    value = compiled.learning_rate * value
+    np.add.at(corners, (i0, j0), value)
+    np.add.at(corners, (i0, j1), -value)
+    np.add.at(corners, (i1, j0), -value)
+    np.add.at(corners, (i1, j1), value)
+    values = compiled.init + corners.cumsum(axis=0).cumsum(axis=1)[:-1, :-1]
+    return distance_cuts, duration_cuts, values.astype(np.float32)
@@ -3,14 +3,39 @@ Feature engineering — build the feature vector expected by the trained model.
 All transformations MUST match what was used at training time.
 Optional inputs (vehicle_type, urgency_level, preferred_route_type) are accepted
 for future extensibility; the current model schema does not include them.
+
+The inference path writes straight into float64 NumPy matrices
+(build_feature_matrix / build_feature_matrix_batch); build_features keeps the
+labelled DataFrame form for debugging and inspection.
 """
 
 import math
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 
-import pandas as pd
+import numpy as np
 from config.settings import DEFAULT_DENSITY, DEFAULT_LANES, DEFAULT_SIGNALS
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Training-time feature order
+FEATURE_NAMES: Tuple[str, ...] = (
+    "distance_km",
+    "base_duration_min",
+    "hour_sin",
+    "hour_cos",
+    "is_weekend",
+    "weather_severity",
+    "default_density",
+    "default_lanes",
+    "default_signals",
+)
+
+DAYS_OF_WEEK: Tuple[str, ...] = (
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+)
+
 
 def _parse_hour(travel_time: str) -> int:
     """Extract the hour (0-23) from an 'HH:MM' string."""
@@ -30,6 +55,96 @@ def _cyclic_hour(hour: int):
     return round(hour_sin, 6), round(hour_cos, 6)
 
 
+# Lookup tables — same rounding as _cyclic_hour so both paths agree exactly
+HOUR_SIN = np.array([_cyclic_hour(h)[0] for h in range(24)], dtype=np.float64)
+HOUR_COS = np.array([_cyclic_hour(h)[1] for h in range(24)], dtype=np.float64)
+IS_WEEKEND_BY_DAY: Dict[str, int] = {day: _is_weekend(day) for day in DAYS_OF_WEEK}
+
+
+def time_context(travel_time: str, travel_day: str) -> Tuple[int, int]:
+    """(hour 0-23, is_weekend) for a request — raises ValueError on a bad time."""
+    hour = _parse_hour(travel_time) % 24     # sin/cos are 24h-periodic anyway
+    weekend = IS_WEEKEND_BY_DAY.get(travel_day.strip().lower(), 0)
+    return hour, weekend
+
+
+@lru_cache(maxsize=8)
+def column_positions(feature_names: Tuple[str, ...]) -> Tuple[int, ...]:
+    """Position of each FEATURE_NAMES entry within *feature_names* (model order)."""
+    missing = [name for name in FEATURE_NAMES if name not in feature_names]
+    if missing or len(feature_names) != len(FEATURE_NAMES):
+        raise ValueError(f"Model feature names {feature_names} do not match {FEATURE_NAMES}")
+    return tuple(feature_names.index(name) for name in FEATURE_NAMES)
+
+
+def build_feature_matrix_batch(
+    items: Sequence[Tuple[List[Dict], int, int, float]],
+    feature_names: Sequence[str] = FEATURE_NAMES,
+) -> np.ndarray:
+    """
+    Stack the candidate routes of many requests into one float64 matrix.
+
+    *items* holds (routes, hour, is_weekend, weather_severity) per request
+    (hour/is_weekend from time_context). Rows follow *items* then route
+    order; columns follow *feature_names* — pass the model's column order.
+    """
+    pos = column_positions(tuple(feature_names))
+    counts = [len(routes) for routes, _, _, _ in items]
+    X = np.empty((sum(counts), len(FEATURE_NAMES)), dtype=np.float64)
+    if not X.shape[0]:
+        return X
+
+    hours = np.repeat([hour for _, hour, _, _ in items], counts)
+    X[:, pos[0]] = [r["distance_km"] for routes, _, _, _ in items for r in routes]
+    X[:, pos[1]] = [r["base_duration_min"] for routes, _, _, _ in items for r in routes]
+    X[:, pos[2]] = HOUR_SIN[hours]
+    X[:, pos[3]] = HOUR_COS[hours]
+    X[:, pos[4]] = np.repeat([weekend for _, _, weekend, _ in items], counts)
+    X[:, pos[5]] = np.repeat([severity for _, _, _, severity in items], counts)
+    X[:, pos[6]] = DEFAULT_DENSITY
+    X[:, pos[7]] = DEFAULT_LANES
+    X[:, pos[8]] = DEFAULT_SIGNALS
+    return X
+
+
+def build_feature_matrix_columns(
+    distance_km: np.ndarray,
+    base_duration_min: np.ndarray,
+    hour: int,
+    is_weekend: int,
+    weather_severity: float,
+    feature_names: Sequence[str] = FEATURE_NAMES,
+) -> np.ndarray:
+    """
+    Feature matrix for many distance / duration pairs sharing one time and
+    weather context (e.g. every cell of an ETA matrix) — column fills only.
+    """
+    pos = column_positions(tuple(feature_names))
+    X = np.empty((len(distance_km), len(FEATURE_NAMES)), dtype=np.float64)
+    X[:, pos[0]] = distance_km
+    X[:, pos[1]] = base_duration_min
+    X[:, pos[2]] = HOUR_SIN[hour]
+    X[:, pos[3]] = HOUR_COS[hour]
+    X[:, pos[4]] = is_weekend
+    X[:, pos[5]] = weather_severity
+    X[:, pos[6]] = DEFAULT_DENSITY
+    X[:, pos[7]] = DEFAULT_LANES
+    X[:, pos[8]] = DEFAULT_SIGNALS
+    return X
+
+
+def build_feature_matrix(
+    routes: List[Dict],
+    travel_time: str,
+    travel_day: str,
+    weather_severity: float,
+    feature_names: Sequence[str] = FEATURE_NAMES,
+) -> np.ndarray:
+    """Feature matrix (one row per route) for a single request — see build_features for the schema."""
+    hour, weekend = time_context(travel_time, travel_day)
+    return build_feature_matrix_batch([(routes, hour, weekend, weather_severity)], feature_names)
+
+
 def build_features(
     routes: List[Dict],
     travel_time: str,
@@ -38,9 +153,10 @@ def build_features(
     vehicle_type: Optional[str] = None,
     urgency_level: Optional[str] = None,
     preferred_route_type: Optional[str] = None,
-) -> pd.DataFrame:
+) -> "pd.DataFrame":
     """
-    Build the feature matrix as a pandas DataFrame for model inference.
+    Build the feature matrix as a labelled pandas DataFrame — the debugging
+    path; inference uses build_feature_matrix.
 
     Feature order (must match training):
         0  distance_km
@@ -56,19 +172,6 @@ def build_features(
     Optional args (vehicle_type, urgency_level, preferred_route_type) are
     accepted for future model extensions; not used in current schema.
     """
-    # Define the exact feature names expected by the model
-    FEATURE_NAMES = [
-        "distance_km",
-        "base_duration_min", 
-        "hour_sin",
-        "hour_cos",
-        "is_weekend",
-        "weather_severity",
-        "default_density",
-        "default_lanes", 
-        "default_signals"
-    ]
-    
     hour = _parse_hour(travel_time)
     h_sin, h_cos = _cyclic_hour(hour)
     weekend = _is_weekend(travel_day)
@@ -89,5 +192,8 @@ def build_features(
         }
         rows.append(feature_row)
 
+    # pandas is only needed on this debugging path — keep it off the import path
+    import pandas as pd
+
     # Create DataFrame with explicit column order
-    return pd.DataFrame(rows, columns=FEATURE_NAMES)
+    return pd.DataFrame(rows, columns=list(FEATURE_NAMES))
@@ -3,30 +3,289 @@ Geocoding service — Photon (OpenStreetMap-based, komoot).
 FREE, no API key required. Config from settings — no hard-coded URLs.
 """
 
-from typing import Tuple
-import requests
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import httpx
 from fastapi import HTTPException
 
-from config.settings import PHOTON_URL, PHOTON_TIMEOUT_SEC
+from config.settings import (
+    PHOTON_TIMEOUT_SEC,
+    GEOCODE_CACHE_SIZE,
+    GEOCODE_CACHE_TTL_SEC,
+    GEOCODE_NEGATIVE_TTL_SEC,
+    GEOCODE_CACHE_DB_PATH,
+)
+from services import metrics
+from services.cache import TTLCache
+from services.singleflight import SingleFlight
+from services.upstream_pool import photon_pool
 
 _HEADERS = {
     "User-Agent": "Urban-Traffic-Congestion-Intelligence/1.0 (college-project)"
 }
 
-def geocode(place_name: str) -> Tuple[float, float]:
+_MISS = object()
+
+
+# ── Geocode cache ────────────────────────────────────────────────────────────
+
+def normalize_place_name(place_name: str) -> str:
+    """Cache key: unicode-folded, case-folded, whitespace-collapsed place name."""
+    decomposed = unicodedata.normalize("NFKD", place_name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+class GeocodeCache:
     """
-    Convert a human-readable address string to (latitude, longitude)
-    using the Photon geocoding API (komoot / OpenStreetMap).
+    Two-tier geocode cache: bounded in-memory LRU in front of a SQLite file.
+
+    The SQLite tier survives restarts and is shared by every uvicorn worker
+    on the host (WAL mode). Negative results ("could not geocode") are stored
+    as ``None`` with their own, shorter TTL. Disk errors never fail a lookup —
+    the cache just degrades to memory-only.
+
+    The file is opened on first use (or by open() at startup), not at import.
+    get()/set() touch it directly, for blocking callers; the event loop uses
+    get_async()/set_async(), which run the SQLite work in a thread.
     """
-    params = {
+
+    def __init__(
+        self,
+        memory_size: int,
+        ttl: float,
+        negative_ttl: float,
+        db_path: Optional[str] = None,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory = TTLCache(max_weight=memory_size, default_ttl=ttl)
+        self._db_path = db_path or None       # None: memory-only (unset, or failed to open)
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self.disk_hits = 0
+        self.negative_hits = 0
+        self.disk_errors = 0
+
+    def open(self) -> bool:
+        """Open the SQLite tier now rather than on the first lookup; True if usable."""
+        return self._connection() is not None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._db is None and self._db_path is not None:
+            with self._open_lock:
+                if self._db is None and self._db_path is not None:
+                    self._open_db(self._db_path)
+        return self._db
+
+    def _open_db(self, db_path: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            db = sqlite3.connect(
+                db_path, timeout=1.0, isolation_level=None, check_same_thread=False
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode_cache ("
+                " key TEXT PRIMARY KEY, lat REAL, lon REAL, expires_at REAL NOT NULL)"
+            )
+            db.execute("DELETE FROM geocode_cache WHERE expires_at <= ?", (time.time(),))
+            self._db = db
+        except (OSError, sqlite3.Error):
+            self.disk_errors += 1
+            self._db_path = None            # don't retry on every lookup
+
+    def get(self, key: str) -> Any:
+        """Cached (lat, lon), ``None`` for a cached negative, or _MISS."""
+        value = self._memory.get(key, _MISS)
+        if value is _MISS and self._db_path is not None:
+            value = self._get_disk(key)
+        return self._count(value)
+
+    async def get_async(self, key: str) -> Any:
+        """get() with the SQLite read (memory misses only) off the event loop."""
+        value = self._memory.get(key, _MISS)
+        if value is _MISS and self._db_path is not None:
+            value = await asyncio.to_thread(self._get_disk, key)
+        return self._count(value)
+
+    def _count(self, value: Any) -> Any:
+        if value is None:
+            self.negative_hits += 1
+        return value
+
+    def _get_disk(self, key: str) -> Any:
+        db = self._connection()
+        if db is None:
+            return _MISS
+        try:
+            with self._db_lock:
+                row = db.execute(
+                    "SELECT lat, lon, expires_at FROM geocode_cache WHERE key = ?",
+                    (key,),
+                ).fetchone()
+        except sqlite3.Error:
+            self.disk_errors += 1
+            return _MISS
+        if row is None:
+            return _MISS
+        lat, lon, expires_at = row
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            return _MISS
+        value = None if lat is None else (lat, lon)
+        self.disk_hits += 1
+        self._memory.set(key, value, ttl=remaining)
+        return value
+
+    def set(self, key: str, value: Optional[Tuple[float, float]], ttl: Optional[float] = None) -> None:
+        """Store coordinates, or ``None`` for "no result" (negative TTL by default)."""
+        ttl = self._memory_set(key, value, ttl)
+        if self._db_path is not None:
+            self._set_disk(key, value, ttl)
+
+    async def set_async(self, key: str, value: Optional[Tuple[float, float]], ttl: Optional[float] = None) -> None:
+        """set() with the SQLite write off the event loop."""
+        ttl = self._memory_set(key, value, ttl)
+        if self._db_path is not None:
+            await asyncio.to_thread(self._set_disk, key, value, ttl)
+
+    def _memory_set(self, key: str, value: Optional[Tuple[float, float]], ttl: Optional[float]) -> float:
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        self._memory.set(key, value, ttl=ttl)
+        return ttl
+
+    def _set_disk(self, key: str, value: Optional[Tuple[float, float]], ttl: float) -> None:
+        db = self._connection()
+        if db is None:
+            return
+        lat, lon = (None, None) if value is None else value
+        try:
+            with self._db_lock:
+                db.execute(
+                    "INSERT OR REPLACE INTO geocode_cache (key, lat, lon, expires_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, lat, lon, time.time() + ttl),
+                )
+        except sqlite3.Error:
+            self.disk_errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self._memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.disk_hits
+        return {
+            "memory": memory,
+            "disk_enabled": self._db_path is not None,
+            "disk_hits": self.disk_hits,
+            "negative_hits": self.negative_hits,
+            "misses": lookups - hits,
+            "disk_errors": self.disk_errors,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_geocode_cache = GeocodeCache(
+    memory_size=GEOCODE_CACHE_SIZE,
+    ttl=GEOCODE_CACHE_TTL_SEC,
+    negative_ttl=GEOCODE_NEGATIVE_TTL_SEC,
+    db_path=GEOCODE_CACHE_DB_PATH or None,
+)
+
+
+def open_geocode_cache() -> bool:
+    """Open the on-disk geocode cache (lifespan startup); lookups open it lazily otherwise."""
+    return _geocode_cache.open()
+
+
+def geocode_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the geocode cache."""
+    return _geocode_cache.stats()
+
+
+def _geocode_cache_metrics() -> Dict[str, float]:
+    stats = _geocode_cache.stats()
+    memory = stats["memory"]
+    return {
+        "hits": memory["hits"] + stats["disk_hits"],
+        "misses": stats["misses"],
+        "evictions": memory["evictions"],
+        "entries": memory["entries"],
+    }
+
+
+metrics.register_cache("geocode", _geocode_cache_metrics)
+
+
+def _cached_coordinates(key: str, place_name: str) -> Optional[Tuple[float, float]]:
+    """Cached coordinates, None on a miss; re-raises a cached negative as 400."""
+    return _cache_outcome(_geocode_cache.get(key), place_name)
+
+
+def _cache_outcome(value: Any, place_name: str) -> Optional[Tuple[float, float]]:
+    if value is _MISS:
+        return None
+    if value is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Could not geocode '{place_name}'. No results from Photon.",
+        )
+    return value
+
+
+def cached_geocode(place_name: str) -> Optional[Tuple[float, float]]:
+    """Coordinates from the geocode cache only (None on a miss) — never calls Photon."""
+    return _cached_coordinates(normalize_place_name(place_name), place_name)
+
+
+def _photon_params(place_name: str) -> Dict[str, Any]:
+    return {
         "q": place_name,
         "limit": 1,
     }
 
+
+def _parse_photon_response(data: Dict[str, Any], place_name: str) -> Tuple[float, float]:
+    """Pull (lat, lon) out of a Photon GeoJSON response."""
+    features = data.get("features", [])
+
+    if not features:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Could not geocode '{place_name}'. No results from Photon.",
+        )
+
+    # Photon returns GeoJSON: [lon, lat]
+    lon, lat = features[0]["geometry"]["coordinates"]
+    return float(lat), float(lon)
+
+
+def geocode(place_name: str) -> Tuple[float, float]:
+    """
+    Convert a human-readable address string to (latitude, longitude)
+    using the Photon geocoding API (komoot / OpenStreetMap).
+
+    Blocking variant — request handlers should await geocode_async instead.
+    """
+    import requests   # blocking path only (scripts) — kept off the app import path
+
+    key = normalize_place_name(place_name)
+    cached = _cached_coordinates(key, place_name)
+    if cached is not None:
+        return cached
+
     try:
         resp = requests.get(
-            PHOTON_URL.rstrip("/"),
-            params=params,
+            photon_pool.primary_url(),
+            params=_photon_params(place_name),
             headers=_HEADERS,
             timeout=PHOTON_TIMEOUT_SEC,
         )
@@ -37,15 +296,72 @@ def geocode(place_name: str) -> Tuple[float, float]:
             detail=f"Photon geocoding request failed: {exc}",
         )
 
-    data = resp.json()
-    features = data.get("features", [])
+    try:
+        coords = _parse_photon_response(resp.json(), place_name)
+    except HTTPException:
+        _geocode_cache.set(key, None)   # "no results" is cached; upstream failures are not
+        raise
+    _geocode_cache.set(key, coords)
+    return coords
 
-    if not features:
+
+_geocode_flight = SingleFlight("geocode")
+
+
+async def geocode_async(place_name: str) -> Tuple[float, float]:
+    """
+    Non-blocking geocode through the shared, pooled HTTP client.
+    Same result and error contract as geocode(), same cache. Concurrent
+    misses for the same normalised name share one Photon request.
+    """
+    key = normalize_place_name(place_name)
+    cached = _cache_outcome(await _geocode_cache.get_async(key), place_name)
+    if cached is not None:
+        return cached
+    return await _geocode_flight.do(key, lambda: _fetch_coordinates(key, place_name))
+
+
+async def _fetch_coordinates(key: str, place_name: str) -> Tuple[float, float]:
+    """Photon lookup for a cache miss; caches the outcome under *key*."""
+    try:
+        resp = await photon_pool.get(params=_photon_params(place_name))
+        resp.raise_for_status()
+    except httpx.HTTPError as exc:
         raise HTTPException(
-            status_code=400,
-            detail=f"Could not geocode '{place_name}'. No results from Photon.",
+            status_code=502,
+            detail=f"Photon geocoding request failed: {exc}",
         )
 
-    # Photon returns GeoJSON: [lon, lat]
-    lon, lat = features[0]["geometry"]["coordinates"]
-    return float(lat), float(lon)
+    try:
+        coords = _parse_photon_response(resp.json(), place_name)
+    except HTTPException:
+        await _geocode_cache.set_async(key, None)   # "no results" is cached; upstream failures are not
+        raise
+    await _geocode_cache.set_async(key, coords)
+    return coords
+
+
+async def geocode_many(place_names: Sequence[str]) -> List[Tuple[float, float]]:
+    """
+    Geocode several places concurrently (source, destination, waypoints…).
+
+    Results come back in input order. Cancellation policy: fail fast — the
+    first lookup that raises cancels every lookup still in flight, and its
+    exception is re-raised unchanged (so a 400/502 keeps its status code).
+    """
+    if len(place_names) == 1:
+        return [await geocode_async(place_names[0])]
+
+    tasks = [asyncio.create_task(geocode_async(name)) for name in place_names]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        # Abandon whatever is still running — on failure or if we were cancelled.
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,185 @@
+"""
+Route geometry pipeline — simplification and compact encodings for responses.
+Operates on [lat, lon] coordinate lists as produced by the routing service.
+"""
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.constants import (
+    GEOMETRY_PIXEL_TOLERANCE,
+    POLYLINE_PRECISION,
+    WEB_MERCATOR_M_PER_PX_Z0,
+)
+
+_EARTH_RADIUS_M = 6_371_008.8
+
+
+def zoom_tolerance_m(zoom: int, latitude: float) -> float:
+    """Ground size (m) of GEOMETRY_PIXEL_TOLERANCE screen pixels at a web-map zoom level."""
+    m_per_px = WEB_MERCATOR_M_PER_PX_Z0 * math.cos(math.radians(latitude)) / (2 ** zoom)
+    return GEOMETRY_PIXEL_TOLERANCE * m_per_px
+
+
+def _project(coords: np.ndarray) -> np.ndarray:
+    """Equirectangular projection to metres around the route's mean latitude."""
+    lat = np.radians(coords[:, 0])
+    lon = np.radians(coords[:, 1])
+    x = lon * math.cos(float(lat.mean())) * _EARTH_RADIUS_M
+    y = lat * _EARTH_RADIUS_M
+    return np.column_stack((x, y))
+
+
+def simplify(coords: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """
+    Douglas–Peucker simplification of an (n, 2) [lat, lon] array.
+
+    Iterative (no recursion limit on long routes); each split step measures
+    all candidate points of the span at once. Endpoints are always kept.
+    """
+    if len(coords) < 3 or tolerance_m <= 0:
+        return coords
+    return coords[simplify_indices(coords, tolerance_m)]
+
+
+def simplify_indices(coords: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """Ascending indices of the vertices simplify() keeps."""
+    n = len(coords)
+    if n < 3 or tolerance_m <= 0:
+        return np.arange(n)
+    xy = _project(coords)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack: List[Tuple[int, int]] = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = xy[start], xy[end]
+        pts = xy[start + 1:end]
+        ab = b - a
+        denom = float(ab @ ab)
+        if denom == 0.0:
+            dist = np.hypot(pts[:, 0] - a[0], pts[:, 1] - a[1])
+        else:
+            # Distance to the segment (not the infinite line) — robust to loops
+            t = np.clip(((pts - a) @ ab) / denom, 0.0, 1.0)
+            proj = a + t[:, None] * ab
+            dist = np.hypot(pts[:, 0] - proj[:, 0], pts[:, 1] - proj[:, 1])
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance_m:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return np.flatnonzero(keep)
+
+
+def haversine_m(coords: np.ndarray) -> np.ndarray:
+    """Great-circle length (m) of each of the n - 1 edges of an (n, 2) [lat, lon] array."""
+    lat = np.radians(coords[:, 0])
+    lon = np.radians(coords[:, 1])
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    h = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * _EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def split_segments(
+    coords: np.ndarray,
+    segment_length_m: float,
+    edge_lengths_m: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cut a polyline into consecutive pieces of about *segment_length_m*.
+
+    Cuts fall on existing vertices (the first one at or past each multiple of
+    the length), so every segment is a vertex range of *coords*. Edges are
+    measured by *edge_lengths_m* (e.g. road distance) when given, else as
+    great-circle lengths. Returns (bounds, lengths_m): bounds is (k, 2)
+    [start, end] vertex indices, both inclusive — segment i+1 starts where
+    segment i ends.
+    """
+    if len(coords) < 2:
+        return np.zeros((0, 2), dtype=np.int64), np.zeros(0)
+    if edge_lengths_m is None:
+        edge_lengths_m = haversine_m(coords)
+    cumulative = np.concatenate(([0.0], np.cumsum(edge_lengths_m)))
+    slot = np.floor(cumulative[:-1] / segment_length_m).astype(np.int64)   # per edge
+    starts = np.flatnonzero(np.diff(slot, prepend=-1))
+    ends = np.append(starts[1:], len(coords) - 1)
+    return np.column_stack((starts, ends)), cumulative[ends] - cumulative[starts]
+
+
+def encode_polyline(coords: np.ndarray, precision: int = POLYLINE_PRECISION) -> str:
+    """
+    Encoded Polyline Algorithm Format (Google / OSRM "polyline") for [lat, lon]
+    pairs — vectorised over all values instead of a per-character loop.
+    """
+    if len(coords) == 0:
+        return ""
+    scaled = np.round(np.asarray(coords, dtype=np.float64) * (10 ** precision)).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    zigzag = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    # Up to 7 five-bit chunks per value (enough for any 32-bit delta)
+    chunks = (zigzag[:, None] >> (5 * np.arange(7))) & 0x1F
+    n_chunks = np.maximum(1, (np.floor(np.log2(np.maximum(zigzag, 1))).astype(np.int64) // 5) + 1)
+    position = np.arange(7)[None, :]
+    continues = position < (n_chunks[:, None] - 1)
+    chars = (chunks | np.where(continues, 0x20, 0)) + 63
+    return chars[position < n_chunks[:, None]].astype(np.uint8).tobytes().decode("ascii")
+
+
+def response_coordinates(
+    geometry: Sequence[Sequence[float]],
+    tolerance_m: Optional[float] = None,
+    zoom: Optional[int] = None,
+) -> np.ndarray:
+    """
+    The (n, 2) array a response carries for *geometry*: simplified with an
+    explicit *tolerance_m*, else the one derived from *zoom*, else as is.
+    """
+    coords = np.asarray(geometry, dtype=np.float64)
+    tolerance_m = _response_tolerance(coords, tolerance_m, zoom)
+    if tolerance_m:
+        coords = simplify(coords, tolerance_m)
+    return coords
+
+
+def response_vertices(
+    geometry: Sequence[Sequence[float]],
+    tolerance_m: Optional[float] = None,
+    zoom: Optional[int] = None,
+) -> np.ndarray:
+    """Indices into *geometry* of the vertices response_coordinates() keeps."""
+    coords = np.asarray(geometry, dtype=np.float64)
+    return simplify_indices(coords, _response_tolerance(coords, tolerance_m, zoom) or 0.0)
+
+
+def _response_tolerance(coords: np.ndarray, tolerance_m: Optional[float], zoom: Optional[int]) -> Optional[float]:
+    if len(coords) and tolerance_m is None and zoom is not None:
+        return zoom_tolerance_m(zoom, float(coords[:, 0].mean()))
+    return tolerance_m
+
+
+def prepare_geometry(
+    geometry: Sequence[Sequence[float]],
+    geometry_format: str = "coordinates",
+    tolerance_m: Optional[float] = None,
+    zoom: Optional[int] = None,
+) -> Tuple[Optional[List[List[float]]], Optional[str]]:
+    """
+    Response-side geometry stage: (coordinates, polyline) for one route.
+
+    *geometry_format* is "coordinates" (nested [lat, lon] lists), "polyline"
+    (encoded string) or "none". An explicit *tolerance_m* wins over the one
+    derived from *zoom*; with neither, the full geometry is kept.
+    """
+    if geometry_format == "none" or len(geometry) == 0:
+        return None, None
+    coords = response_coordinates(geometry, tolerance_m, zoom)
+    if geometry_format == "polyline":
+        return None, encode_polyline(coords)
+    return coords.tolist(), None
@@ -0,0 +1,96 @@
+"""
+Shared async HTTP client — one pooled connection set for Photon and OSRM.
+Opened/closed by the FastAPI lifespan in main.py; lazily created when used
+outside the app (scripts, CLI). Limits come from settings — no hard-coding.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from config.settings import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY_SEC,
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+)
+from services.metrics import UPSTREAM_DURATION, UPSTREAM_REQUESTS
+
+_HEADERS = {
+    "User-Agent": "Urban-Traffic-Congestion-Intelligence/1.0 (college-project)"
+}
+
+_client: Optional[httpx.AsyncClient] = None
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SEC,
+    )
+    return httpx.AsyncClient(limits=limits, headers=_HEADERS)
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    """Create the shared client (called on app startup)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and drop pooled connections (app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _host_slots.clear()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use outside the app."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def _slot_for(url: str) -> asyncio.Semaphore:
+    """Per-host semaphore — httpx only limits the pool as a whole."""
+    host = urlsplit(url).netloc
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = asyncio.Semaphore(HTTP_MAX_CONNECTIONS_PER_HOST)
+        _host_slots[host] = slot
+    return slot
+
+
+async def get(
+    url: str,
+    params: Optional[dict] = None,
+    timeout: float = 10.0,
+    upstream: str = "other",
+) -> httpx.Response:
+    """
+    GET through the shared pool, honouring the per-host concurrency limit.
+    Latency and outcome (status code or transport error) are recorded per
+    *upstream* label ("photon", "osrm") for /metrics.
+    """
+    client = get_http_client()
+    async with _slot_for(url):
+        start = time.perf_counter()
+        try:
+            response = await client.get(url, params=params, timeout=timeout)
+        except httpx.HTTPError as exc:
+            UPSTREAM_REQUESTS.inc(upstream=upstream, status=type(exc).__name__)
+            raise
+        finally:
+            UPSTREAM_DURATION.observe(time.perf_counter() - start, upstream=upstream)
+    UPSTREAM_REQUESTS.inc(upstream=upstream, status=str(response.status_code))
+    return response
@@ -0,0 +1,189 @@
+"""
+Incident store — active incident reports in memory, indexed on a uniform
+lat/lon grid, expiring after a TTL. Routes are matched against it by
+bounding-box pruning, then vectorised point-to-segment distances.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from config.settings import (
+    INCIDENT_GRID_DEG,
+    INCIDENT_MATCH_RADIUS_M,
+    INCIDENT_MAX_ACTIVE,
+    INCIDENT_TTL_SEC,
+)
+
+_EARTH_RADIUS_M = 6_371_008.8
+# Candidates measured per pass; bounds the (points × segments × 2) buffer
+_CHUNK_POINTS = 256
+
+Cell = Tuple[int, int]
+
+
+class Incident:
+    """One reported incident (immutable once stored)."""
+
+    __slots__ = ("id", "lat", "lon", "location", "type", "severity", "description",
+                 "reported_at", "expires_at")
+
+    def __init__(self, id: int, lat: float, lon: float, location: str, type: str,
+                 severity: str, description: str, reported_at: float, expires_at: float):
+        self.id = id
+        self.lat = lat
+        self.lon = lon
+        self.location = location
+        self.type = type
+        self.severity = severity
+        self.description = description
+        self.reported_at = reported_at
+        self.expires_at = expires_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class IncidentStore:
+    """
+    Uniform-grid spatial index: cell (floor(lat / grid), floor(lon / grid))
+    → incident ids. Expired incidents are purged lazily (expiry heap) on every
+    insert and query, so reads never see them. At most *max_active* incidents
+    are kept; beyond that the soonest-expiring ones are dropped. *revision*
+    changes whenever the active set does, for caches of derived results.
+    """
+
+    def __init__(self, grid_deg: float, ttl: float, max_active: int):
+        self.grid_deg = grid_deg
+        self.ttl = ttl
+        self.max_active = max_active
+        self._incidents: Dict[int, Incident] = {}
+        self._cells: Dict[Cell, Set[int]] = {}
+        self._expiry: List[Tuple[float, int]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._revision = 0
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return math.floor(lat / self.grid_deg), math.floor(lon / self.grid_deg)
+
+    def _remove(self, incident_id: int) -> None:
+        incident = self._incidents.pop(incident_id, None)
+        if incident is None:
+            return
+        self._revision += 1
+        cell = self._cell(incident.lat, incident.lon)
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(incident_id)
+            if not members:
+                del self._cells[cell]
+
+    def _purge(self, now: float) -> None:
+        while self._expiry and (self._expiry[0][0] <= now or len(self._incidents) > self.max_active):
+            _, incident_id = heapq.heappop(self._expiry)
+            self._remove(incident_id)
+
+    def add(self, lat: float, lon: float, location: str, type: str, severity: str,
+            description: str = "", ttl: Optional[float] = None) -> Incident:
+        now = time.time()
+        with self._lock:
+            incident = Incident(
+                id=next(self._ids), lat=lat, lon=lon, location=location, type=type,
+                severity=severity, description=description,
+                reported_at=now, expires_at=now + (self.ttl if ttl is None else ttl),
+            )
+            self._incidents[incident.id] = incident
+            self._cells.setdefault(self._cell(lat, lon), set()).add(incident.id)
+            heapq.heappush(self._expiry, (incident.expires_at, incident.id))
+            self._revision += 1
+            self._purge(now)
+            return incident
+
+    @property
+    def revision(self) -> int:
+        """Counter bumped on every insert and removal (expiries included)."""
+        with self._lock:
+            self._purge(time.time())
+            return self._revision
+
+    def in_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Incident]:
+        """Active incidents inside the box (inclusive), oldest report first."""
+        with self._lock:
+            self._purge(time.time())
+            lat0, lon0 = self._cell(min_lat, min_lon)
+            lat1, lon1 = self._cell(max_lat, max_lon)
+            # Walk whichever is smaller: the box's cells or the occupied ones
+            if (lat1 - lat0 + 1) * (lon1 - lon0 + 1) <= len(self._cells):
+                cells = [(a, b) for a in range(lat0, lat1 + 1) for b in range(lon0, lon1 + 1)]
+            else:
+                cells = [c for c in self._cells if lat0 <= c[0] <= lat1 and lon0 <= c[1] <= lon1]
+            found = [
+                self._incidents[i]
+                for cell in cells
+                for i in self._cells.get(cell, ())
+            ]
+        found = [
+            inc for inc in found
+            if min_lat <= inc.lat <= max_lat and min_lon <= inc.lon <= max_lon
+        ]
+        return sorted(found, key=lambda inc: inc.reported_at)
+
+    def near_route(self, geometry: Sequence[Sequence[float]], radius_m: float = INCIDENT_MATCH_RADIUS_M) -> List[Incident]:
+        """
+        Active incidents within *radius_m* of a [lat, lon] polyline: grid
+        lookup over the route's bounding box (padded by the radius), then the
+        exact distance from every candidate to every segment at once.
+        """
+        if not self._incidents or len(geometry) == 0:
+            return []
+        coords = np.asarray(geometry, dtype=np.float64)
+        lat_pad = math.degrees(radius_m / _EARTH_RADIUS_M)
+        lon_pad = lat_pad / max(math.cos(math.radians(float(np.abs(coords[:, 0]).max()))), 1e-6)
+        (min_lat, min_lon), (max_lat, max_lon) = coords.min(axis=0), coords.max(axis=0)
+        candidates = self.in_bbox(min_lat - lat_pad, min_lon - lon_pad, max_lat + lat_pad, max_lon + lon_pad)
+        if not candidates:
+            return []
+        points = np.array([(inc.lat, inc.lon) for inc in candidates])
+        distances = np.concatenate([
+            point_to_polyline_m(points[i:i + _CHUNK_POINTS], coords)
+            for i in range(0, len(points), _CHUNK_POINTS)
+        ])
+        return [inc for inc, d in zip(candidates, distances) if d <= radius_m]
+
+    def __len__(self) -> int:
+        return len(self._incidents)
+
+
+def point_to_polyline_m(points: np.ndarray, coords: np.ndarray) -> np.ndarray:
+    """
+    Distance (m) from each [lat, lon] point to the nearest segment of a
+    [lat, lon] polyline, in a local equirectangular projection — a (points ×
+    segments) array computation.
+    """
+    ref_lat = math.radians(float(coords[:, 0].mean()))
+    scale = np.array([_EARTH_RADIUS_M, _EARTH_RADIUS_M * math.cos(ref_lat)])
+    path = np.radians(coords) * scale                       # (n, 2) as (y, x)
+    pts = np.radians(points) * scale                        # (k, 2)
+    if len(path) == 1:
+        return np.hypot(*(pts - path[0]).T)
+    a = path[:-1]                                           # (s, 2)
+    ab = path[1:] - a
+    denom = np.einsum("ij,ij->i", ab, ab)
+    denom[denom == 0.0] = 1.0                               # zero-length segment → endpoint
+    ap = pts[:, None, :] - a[None, :, :]                    # (k, s, 2)
+    t = np.clip(np.einsum("ksj,sj->ks", ap, ab) / denom, 0.0, 1.0)
+    closest = ap - t[..., None] * ab[None, :, :]
+    return np.sqrt(np.einsum("ksj,ksj->ks", closest, closest).min(axis=1))
+
+
+incident_store = IncidentStore(
+    grid_deg=INCIDENT_GRID_DEG,
+    ttl=INCIDENT_TTL_SEC,
+    max_active=INCIDENT_MAX_ACTIVE,
+)
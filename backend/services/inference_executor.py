@@ -0,0 +1,236 @@
+"""
+Inference executor — runs model calls off the event loop and micro-batches
+them: feature matrices submitted within INFERENCE_MAX_WAIT_MS of each other
+(up to INFERENCE_MAX_BATCH_ROWS rows) are stacked into one predict call.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+from typing import List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from config.settings import (
+    INFERENCE_EXECUTOR,
+    INFERENCE_WORKERS,
+    INFERENCE_MAX_BATCH_ROWS,
+    INFERENCE_MAX_WAIT_MS,
+)
+from services import ml_service
+from services.deadline import within_deadline
+from services.metrics import BATCH_SIZE_BUCKETS, histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_REQUESTS = histogram(
+    "traffic_inference_batch_requests",
+    "Submissions merged into one executor model call.",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+
+
+# ── Worker side (runs in the pool thread / process) ──────────────────────────
+
+_process_worker = False
+
+
+def _init_process_worker() -> None:
+    """Process pool initializer: load + warm the model once per worker."""
+    global _process_worker
+    _process_worker = True
+    ml_service.preload_models()
+
+
+def _ping() -> bool:
+    return True
+
+
+def _run_batch(features: np.ndarray, allow_surface: bool, version: str) -> Tuple[str, object, list]:
+    """
+    predict_delay with HTTPExceptions flattened to a picklable tuple, so
+    process workers report them like thread workers do. The model calls made
+    come back too: /metrics is served by the parent, which records them.
+    """
+    if _process_worker:
+        # Each process holds its own registry; it serves what the parent serves
+        ml_service.follow_model_version(version)
+    try:
+        delays, batch_rows = ml_service.predict_delay_counted(features, allow_surface=allow_surface)
+        return "ok", delays, batch_rows
+    except HTTPException as exc:
+        return "error", (exc.status_code, exc.detail), []
+
+
+# ── Event-loop side ──────────────────────────────────────────────────────────
+
+class _Pending:
+    __slots__ = ("features", "future")
+
+    def __init__(self, features: np.ndarray, future: asyncio.Future):
+        self.features = features
+        self.future = future
+
+
+class InferenceExecutor:
+    """
+    Micro-batcher in front of a thread or process pool.
+
+    Submissions are queued per *allow_surface* flag (the two are scored
+    differently). While a worker is idle a submission goes straight out, so
+    a quiet server adds no batching delay. Once every worker is busy,
+    submissions accumulate and the queue is flushed when it reaches
+    *max_batch_rows* rows, when a worker frees up, or *max_wait_ms* after
+    its first submission — whichever comes first. A single submission larger
+    than the limit goes alone. If a merged call fails, its members are
+    retried one by one so one bad matrix cannot fail its neighbours.
+    """
+
+    def __init__(self, kind: str, workers: int, max_batch_rows: int, max_wait_ms: float):
+        self.kind = kind
+        self.workers = workers
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        if kind == "process":
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+            )
+        else:
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="inference",
+            )
+        self._queues = {False: [], True: []}
+        self._rows = {False: 0, True: 0}
+        self._timers: dict = {}
+        self._running: set = set()        # strong refs to in-flight batch tasks
+
+    async def predict(self, features: np.ndarray, allow_surface: bool = False) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._queues[allow_surface]
+        queue.append(_Pending(features, future))
+        self._rows[allow_surface] += len(features)
+        if self._rows[allow_surface] >= self.max_batch_rows or len(self._running) < self.workers:
+            self._flush(allow_surface)
+        elif allow_surface not in self._timers:
+            self._timers[allow_surface] = loop.call_later(self.max_wait, self._flush, allow_surface)
+        return await future
+
+    def _flush(self, allow_surface: bool) -> None:
+        timer = self._timers.pop(allow_surface, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._queues[allow_surface]
+        if not batch:
+            return
+        self._queues[allow_surface] = []
+        self._rows[allow_surface] = 0
+        task = asyncio.ensure_future(self._execute(batch, allow_surface))
+        self._running.add(task)
+        task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        # A worker is free: send whatever queued up meanwhile
+        for allow_surface, queue in self._queues.items():
+            if queue and len(self._running) < self.workers:
+                self._flush(allow_surface)
+
+    async def _call(self, features: np.ndarray, allow_surface: bool) -> List[float]:
+        loop = asyncio.get_running_loop()
+        # The parent's registry decides the version (its reload task scans for new ones)
+        version = ml_service.model_version() if self.kind == "process" else ""
+        status, value, batch_rows = await loop.run_in_executor(
+            self._pool, _run_batch, features, allow_surface, version,
+        )
+        ml_service.record_batch_rows(batch_rows)
+        if status == "error":
+            status_code, detail = value
+            raise HTTPException(status_code=status_code, detail=detail)
+        return value
+
+    async def _execute(self, batch: List[_Pending], allow_surface: bool) -> None:
+        BATCH_REQUESTS.observe(len(batch))
+        live = [p for p in batch if not p.future.done()]     # callers may have been cancelled
+        if not live:
+            return
+        try:
+            # Stacking fails too when one matrix has the wrong width
+            stacked = live[0].features if len(live) == 1 else np.concatenate([p.features for p in live])
+            delays = await self._call(stacked, allow_surface)
+        except Exception as exc:
+            if len(live) == 1:
+                _settle(live[0].future, exc=exc)
+                return
+            await asyncio.gather(*(self._execute([p], allow_surface) for p in live))
+            return
+        offset = 0
+        for pending in live:
+            end = offset + len(pending.features)
+            _settle(pending.future, result=delays[offset:end])
+            offset = end
+
+    async def warm_up(self, workers: int) -> None:
+        """Start every worker now (process workers load the model) rather than on first use."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _ping) for _ in range(workers)))
+
+    def shutdown(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _settle(future: asyncio.Future, result=None, exc: Optional[BaseException] = None) -> None:
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+
+
+_executor: Optional[InferenceExecutor] = None
+
+
+def get_inference_executor() -> Optional[InferenceExecutor]:
+    """The shared executor (created on first use); None when INFERENCE_EXECUTOR=inline."""
+    global _executor
+    if INFERENCE_EXECUTOR == "inline":
+        return None
+    if _executor is None:
+        _executor = InferenceExecutor(
+            kind=INFERENCE_EXECUTOR,
+            workers=INFERENCE_WORKERS,
+            max_batch_rows=INFERENCE_MAX_BATCH_ROWS,
+            max_wait_ms=INFERENCE_MAX_WAIT_MS,
+        )
+        logger.info(
+            "Inference executor: %s pool × %d, batches ≤ %d rows / %.1f ms",
+            INFERENCE_EXECUTOR, INFERENCE_WORKERS, INFERENCE_MAX_BATCH_ROWS, INFERENCE_MAX_WAIT_MS,
+        )
+    return _executor
+
+
+def shutdown_inference_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+    _executor = None
+
+
+async def predict_delay_async(features: np.ndarray, allow_surface: bool = False) -> List[float]:
+    """
+    predict_delay() for request handlers: runs on the inference pool with
+    micro-batching, or inline when INFERENCE_EXECUTOR=inline. Waiting on the
+    pool is bounded by the request deadline (DeadlineExceeded).
+    """
+    executor = get_inference_executor()
+    if executor is None:
+        return ml_service.predict_delay(features, allow_surface=allow_surface)
+    return await within_deadline(executor.predict(features, allow_surface), "model")
@@ -0,0 +1,225 @@
+"""
+In-process metrics — counters and histograms rendered in the Prometheus text
+exposition format for GET /metrics. No client library: a handful of metric
+types is all the backend needs, and every update is a dict lookup + add.
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets (seconds) — sub-ms model calls up to slow upstream timeouts
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Rows per model call — single requests (≤ 3) up to full batches / sweeps
+BATCH_SIZE_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally labelled."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram (Prometheus semantics), optionally labelled."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values → [per-bucket counts (+ overflow), sum]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# ── Registry ─────────────────────────────────────────────────────────────────
+# Collectors produce samples at scrape time from state kept elsewhere (e.g.
+# cache hit counters): (name, type, help, [(labels dict, value), ...]).
+
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+_metrics: List[_Metric] = []
+_collectors: List[Collector] = []
+
+
+def counter(name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+    metric = Counter(name, documentation, labels)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labels: Sequence[str] = (),
+    buckets: Sequence[float] = LATENCY_BUCKETS,
+) -> Histogram:
+    metric = Histogram(name, documentation, labels, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(collector: Collector) -> Collector:
+    """Add a scrape-time sample source (usable as a decorator)."""
+    _collectors.append(collector)
+    return collector
+
+
+def render() -> str:
+    """Every registered metric in Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        for name, kind, documentation, samples in collector():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ── Caches ───────────────────────────────────────────────────────────────────
+
+_caches: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, float]]) -> None:
+    """
+    Export a cache's counters; *stats* returns hits, misses, evictions and
+    entries. The hit ratio gauge is derived from hits and misses.
+    """
+    _caches[name] = stats
+
+
+@register_collector
+def _cache_samples():
+    snapshot = {name: stats() for name, stats in _caches.items()}
+    for key, kind, documentation in (
+        ("hits", "counter", "Cache lookups answered from the cache."),
+        ("misses", "counter", "Cache lookups that went upstream."),
+        ("evictions", "counter", "Entries evicted to stay within the size bound."),
+        ("entries", "gauge", "Entries currently cached."),
+    ):
+        name = f"traffic_cache_{key}" + ("_total" if kind == "counter" else "")
+        yield name, kind, documentation, [({"cache": c}, s[key]) for c, s in snapshot.items()]
+    yield "traffic_cache_hit_ratio", "gauge", "Hits / lookups since startup.", [
+        ({"cache": c}, round(s["hits"] / (s["hits"] + s["misses"]), 4) if s["hits"] + s["misses"] else 0.0)
+        for c, s in snapshot.items()
+    ]
+
+
+# ── Shared metrics ───────────────────────────────────────────────────────────
+
+REQUEST_DURATION = histogram(
+    "traffic_http_request_duration_seconds",
+    "Time to first response byte per API request.",
+    labels=("method", "path", "status"),
+)
+STAGE_DURATION = histogram(
+    "traffic_stage_duration_seconds",
+    "Wall time per prediction pipeline stage.",
+    labels=("stage",),
+)
+UPSTREAM_DURATION = histogram(
+    "traffic_upstream_request_duration_seconds",
+    "Photon / OSRM request latency.",
+    labels=("upstream",),
+)
+UPSTREAM_REQUESTS = counter(
+    "traffic_upstream_requests_total",
+    "Photon / OSRM requests by outcome (HTTP status, or the transport error name).",
+    labels=("upstream", "status"),
+)
+MODEL_BATCH_ROWS = histogram(
+    "traffic_model_batch_rows",
+    "Feature rows per model call.",
+    labels=("tier",),
+    buckets=BATCH_SIZE_BUCKETS,
+)
@@ -3,20 +3,47 @@ ML service — load pre-trained artefacts and run inference.
 Nothing is retrained or re-fitted here.
 """
 
+import hashlib
+import logging
 import os
-from typing import List
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Union
 
 import joblib
 import numpy as np
-import pandas as pd
 from fastapi import HTTPException
 
-from config.settings import TRAFFIC_MODEL_PATH, WEATHER_ENCODER_PATH
+from config.settings import (
+    TRAFFIC_MODEL_PATH,
+    WEATHER_ENCODER_PATH,
+    USE_COMPILED_MODEL,
+    COMPILED_MODEL_TOLERANCE,
+    DELAY_SURFACE_ENABLED,
+    DELAY_SURFACE_MAX_ERROR_MIN,
+    MODEL_VERSIONS_DIR,
+    MODEL_VERSION,
+)
+from config.constants import WEATHER_SEVERITY_MAP
+from services.feature_engineering import FEATURE_NAMES, build_feature_matrix
+from services.delay_surface import DelaySurface
+from services.metrics import MODEL_BATCH_ROWS
+from services.model_registry import ModelBundle, ModelRegistry
+from services.compiled_model import (
+    CompiledTreeEnsemble,
+    compile_gradient_boosting,
+    validation_batch,
+    max_abs_error,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
 
 
 # ── Lazy singletons (loaded once, reused) ────────────────────────────────────
 
-_traffic_model = None
+_traffic_model = None      # pickled model — served only while no version is exported
 _weather_encoder = None
 
 
@@ -40,6 +67,45 @@ def _load_traffic_model():
     return _traffic_model
 
 
+def _legacy_bundle() -> ModelBundle:
+    """
+    Serve the pickled model (no version exported yet): its fastest verified
+    evaluator next to sklearn itself.
+
+    Tree ensembles sklearn can be flattened for are compiled to arrays and
+    checked against model.predict on a synthetic batch; any mismatch beyond
+    COMPILED_MODEL_TOLERANCE, or an unsupported model type, keeps sklearn.
+    """
+    model = _load_traffic_model()
+    if not hasattr(model, "predict"):
+        raise HTTPException(status_code=500, detail="Traffic model has no predict()")
+    with open(TRAFFIC_MODEL_PATH, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:8]
+    names = (
+        tuple(str(name) for name in model.feature_names_in_)
+        if hasattr(model, "feature_names_in_") else FEATURE_NAMES
+    )
+    bundle = ModelBundle(version=f"pkl-{digest}", source="pickle", feature_names=names, sklearn=model)
+    if not USE_COMPILED_MODEL:
+        return bundle
+    try:
+        compiled = compile_gradient_boosting(model)
+        if compiled is None:
+            logger.info("Model type %s not compilable; using sklearn predict", type(model).__name__)
+            return bundle
+        error = max_abs_error(compiled, model, validation_batch(compiled))
+        if error > COMPILED_MODEL_TOLERANCE:
+            logger.warning(
+                "Compiled model deviates from sklearn by %.3g (> %.3g); using sklearn predict",
+                error, COMPILED_MODEL_TOLERANCE,
+            )
+            return bundle
+        bundle.compiled = compiled
+    except Exception as exc:
+        logger.warning("Model compilation failed (%s); using sklearn predict", exc)
+    return bundle
+
+
 def _load_weather_encoder():
     """Load the weather encoder from disk (once)."""
     global _weather_encoder
@@ -62,8 +128,6 @@ def _load_weather_encoder():
 
 # ── Public API ───────────────────────────────────────────────────────────────
 
-from config.constants import WEATHER_SEVERITY_MAP
-
 
 def encode_weather(weather: str) -> float:
     """
@@ -90,24 +154,182 @@ def encode_weather(weather: str) -> float:
     )
 
 
-def predict_delay(features: pd.DataFrame) -> List[float]:
+def model_feature_names() -> Tuple[str, ...]:
+    """Column order the active model expects (training order if unrecorded)."""
+    return _registry.active.feature_names
+
+
+def model_version() -> str:
+    """Version of the model currently serving predictions."""
+    return _registry.active.version
+
+
+BatchRows = List[Tuple[str, int]]       # (tier, rows) per model call, for MODEL_BATCH_ROWS
+
+
+def _model_call(bundle: ModelBundle, features: np.ndarray, batch_rows: BatchRows) -> np.ndarray:
+    """bundle.predict_raw for request traffic — rows per call are noted in *batch_rows*."""
+    tier = "compiled" if bundle.uses_compiled(len(features)) else "sklearn"
+    batch_rows.append((tier, len(features)))
+    return bundle.predict_raw(features)
+
+
+def record_batch_rows(batch_rows: BatchRows) -> None:
+    """Observe predict_delay_counted()'s model calls in this process's /metrics."""
+    for tier, rows in batch_rows:
+        MODEL_BATCH_ROWS.observe(rows, tier=tier)
+
+
+def predict_delay(
+    features: Union[np.ndarray, "pd.DataFrame"],
+    allow_surface: bool = False,
+) -> List[float]:
     """
-    Run the traffic model on the feature DataFrame and return
+    Run the traffic model on the feature matrix and return
     predicted delay_minutes for each route.
+
+    *features* is a float64 matrix in model_feature_names() order; a labelled
+    DataFrame (build_features, for debugging) is re-ordered by column name.
+    With *allow_surface* (batch / sweep workloads) rows covered by the delay
+    surface are read from its tables instead; the rest still go through the model.
+    The active model is read once, so a reload mid-call cannot mix versions.
     """
-    model = _load_traffic_model()
-    
-    # Ensure column order matches model expectations
-    if hasattr(model, 'feature_names_in_'):
-        features = features[model.feature_names_in_]
-    
+    delays, batch_rows = predict_delay_counted(features, allow_surface)
+    record_batch_rows(batch_rows)
+    return delays
+
+
+def predict_delay_counted(
+    features: Union[np.ndarray, "pd.DataFrame"],
+    allow_surface: bool = False,
+) -> Tuple[List[float], BatchRows]:
+    """
+    predict_delay() without touching /metrics: also returns its model calls,
+    so a process worker can hand them back to the parent to record.
+    """
+    bundle = _registry.active
+    if hasattr(features, "columns"):      # labelled DataFrame (debugging path)
+        features = features[list(bundle.feature_names)].to_numpy(dtype=np.float64)
+
+    batch_rows: BatchRows = []
     try:
-        preds = model.predict(features)
+        surface = bundle.surface if allow_surface else None
+        if surface is None:
+            preds = _model_call(bundle, features, batch_rows)
+        else:
+            preds, covered = surface.lookup(features)
+            batch_rows.append(("surface", int(covered.sum())))
+            if not covered.all():
+                preds[~covered] = _model_call(bundle, features[~covered], batch_rows)
         # Ensure non-negative delays
         preds = np.maximum(preds, 0.0)
-        return [round(float(p), 2) for p in preds]
+        return [round(float(p), 2) for p in preds], batch_rows
     except Exception as exc:
         raise HTTPException(
             status_code=500,
             detail=f"Model prediction failed: {exc}",
-        )
\ No newline at end of file
+        )
+
+
+def build_delay_surface(bundle: ModelBundle) -> Dict[str, Any]:
+    """
+    Tabulate *bundle*'s model into the delay surface (see services.delay_surface)
+    and attach it only if its measured max error is within
+    DELAY_SURFACE_MAX_ERROR_MIN. Needs the compiled evaluator, whose trees
+    the tables are read from.
+    """
+    bundle.surface = None
+    if bundle.compiled is None:
+        return {"enabled": False, "reason": "requires the compiled predictor"}
+
+    start = time.perf_counter()
+    surface = DelaySurface.build(bundle.compiled, bundle.feature_names, WEATHER_SEVERITY_MAP.values())
+    surface.measure_error(bundle.predict_raw)
+    report = {**surface.stats(), "build_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    if surface.max_error > DELAY_SURFACE_MAX_ERROR_MIN:
+        logger.warning(
+            "Delay surface max error %.3f min exceeds %.3f; surface tier disabled",
+            surface.max_error, DELAY_SURFACE_MAX_ERROR_MIN,
+        )
+        return {"enabled": False, **report}
+    bundle.surface = surface
+    return {"enabled": True, **report}
+
+
+# ── Startup lifecycle ────────────────────────────────────────────────────────
+
+_WARMUP_ROUTES = [
+    {"distance_km": 5.0, "base_duration_min": 12.0},
+    {"distance_km": 20.0, "base_duration_min": 35.0},
+    {"distance_km": 60.0, "base_duration_min": 80.0},
+]
+
+
+def _prepare_bundle(bundle: ModelBundle) -> None:
+    """
+    Registry hook run before a model version goes live: a synthetic warm-up
+    prediction, then the delay surface when enabled. Raising rejects the version.
+    """
+    start = time.perf_counter()
+    features = build_feature_matrix(_WARMUP_ROUTES, "08:00", "monday", 0.0, bundle.feature_names)
+    delays = bundle.predict_raw(features)
+    if len(delays) != len(_WARMUP_ROUTES) or not np.all(np.isfinite(delays)):
+        raise HTTPException(status_code=500, detail=f"Warm-up prediction invalid: {delays}")
+    bundle.report["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    if DELAY_SURFACE_ENABLED:
+        bundle.report["delay_surface"] = build_delay_surface(bundle)
+
+
+_registry = ModelRegistry(
+    versions_dir=MODEL_VERSIONS_DIR,
+    fallback=_legacy_bundle,
+    prepare=_prepare_bundle,
+    pinned=MODEL_VERSION or None,
+)
+
+
+def refresh_models() -> bool:
+    """Switch to the newest valid exported model version, if any; True on a swap."""
+    return _registry.refresh()
+
+
+def follow_model_version(version: str) -> bool:
+    """Serve exactly *version* (a process worker tracking its parent); True on a swap."""
+    return _registry.follow(version)
+
+
+def model_status() -> Dict[str, Any]:
+    """Active version, versions on disk and rejected ones (with the reason)."""
+    return _registry.status()
+
+
+def preload_models() -> Dict[str, Any]:
+    """
+    Load and validate every artefact, then run a synthetic warm-up prediction,
+    so the first real request pays none of it. Returns a startup report with
+    per-step timings (ms).
+
+    The traffic model is required — its errors propagate (HTTPException). The
+    weather encoder is only a fallback behind WEATHER_SEVERITY_MAP, so a
+    failure there is reported, not raised.
+    """
+    report: Dict[str, Any] = {}
+
+    start = time.perf_counter()
+    bundle = _registry.active
+    report["model_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    report["model_version"] = bundle.version
+    report["model_source"] = bundle.source
+    report["predictor"] = "compiled" if bundle.compiled is not None else "sklearn"
+
+    start = time.perf_counter()
+    try:
+        _load_weather_encoder()
+        report["weather_encoder"] = "ok"
+    except HTTPException as exc:
+        report["weather_encoder"] = f"unavailable: {exc.detail}"
+    report["weather_encoder_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    report.update(bundle.report)
+    return report
@@ -0,0 +1,342 @@
+"""
+Model registry — versioned, memory-mapped model artefacts with hot reload.
+
+A version is a directory under MODEL_VERSIONS_DIR holding the compiled tree
+arrays as .npy files, a smoke batch (X + reference predictions) and
+meta.json, which is written last and marks the version complete:
+
+    versions/20261017T120000Z/
+        feature.npy threshold.npy left.npy value.npy roots.npy
+        smoke.npz
+        meta.json
+
+Arrays are opened with mmap_mode="r", so every worker process on a host
+maps the same page-cache pages instead of unpickling its own copy. Without
+any version on disk the pickled model (TRAFFIC_MODEL_PATH) is served.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from config.settings import COMPILED_MODEL_MAX_ROWS, COMPILED_MODEL_TOLERANCE
+from services.compiled_model import (
+    CompiledTreeEnsemble,
+    compile_gradient_boosting,
+    max_abs_error,
+    validation_batch,
+)
+from services.feature_engineering import FEATURE_NAMES
+
+logger = logging.getLogger(__name__)
+
+ARTEFACT_FORMAT = 1
+_ARRAYS = ("feature", "threshold", "left", "value", "roots")
+_META = "meta.json"
+_SMOKE = "smoke.npz"
+
+
+class ModelBundle:
+    """
+    One loaded model version — everything a prediction needs, swapped as a
+    unit. *compiled* and/or *sklearn* is set; with both, small batches use the
+    compiled arrays and large ones sklearn. *surface* is the optional delay
+    surface built for this version.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        source: str,
+        feature_names: Sequence[str],
+        compiled: Optional[CompiledTreeEnsemble] = None,
+        sklearn: Any = None,
+    ):
+        self.version = version
+        self.source = source
+        self.feature_names = tuple(feature_names)
+        self.compiled = compiled
+        self.sklearn = sklearn
+        self.surface = None
+        self.report: Dict[str, Any] = {}      # filled by the registry's prepare step
+        self.loaded_at = time.time()
+
+    def uses_compiled(self, n_rows: int) -> bool:
+        return self.compiled is not None and (self.sklearn is None or n_rows <= COMPILED_MODEL_MAX_ROWS)
+
+    def predict_raw(self, features: np.ndarray) -> np.ndarray:
+        """Unclipped model output for a matrix in feature_names order."""
+        if self.uses_compiled(len(features)):
+            return self.compiled.predict(features)
+        with warnings.catch_warnings():
+            # A plain ndarray already in the model's column order, by design
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            return np.asarray(self.sklearn.predict(features), dtype=np.float64)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "predictor": "compiled" if self.compiled is not None else "sklearn",
+            "loaded_at": datetime.fromtimestamp(self.loaded_at, timezone.utc).isoformat(timespec="seconds"),
+        }
+
+
+# ── Artefacts on disk ────────────────────────────────────────────────────────
+
+def export_version(model, versions_dir: str, version: Optional[str] = None) -> str:
+    """
+    Compile a fitted GradientBoostingRegressor and publish it as a new version.
+
+    The compiled arrays are checked against model.predict before anything is
+    written; the version directory is assembled under a temporary name and
+    renamed into place, so the registry never sees a partial version.
+    Returns the version name.
+    """
+    compiled = compile_gradient_boosting(model)
+    if compiled is None:
+        raise ValueError(f"Model type {type(model).__name__} cannot be compiled to arrays")
+    X = validation_batch(compiled)
+    error = max_abs_error(compiled, model, X)
+    if error > COMPILED_MODEL_TOLERANCE:
+        raise ValueError(f"Compiled model deviates from sklearn by {error:.3g}")
+
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    target = os.path.join(versions_dir, version)
+    if os.path.exists(target):
+        raise FileExistsError(f"Model version {version} already exists at {target}")
+    os.makedirs(versions_dir, exist_ok=True)
+
+    feature_names = (
+        [str(name) for name in model.feature_names_in_]
+        if hasattr(model, "feature_names_in_") else list(FEATURE_NAMES)
+    )
+    staging = tempfile.mkdtemp(prefix=f".{version}.", dir=versions_dir)
+    try:
+        for name in _ARRAYS:
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(getattr(compiled, name)))
+        np.savez(os.path.join(staging, _SMOKE), X=X, expected=compiled.predict(X))
+        meta = {
+            "format": ARTEFACT_FORMAT,
+            "version": version,
+            "model_type": type(model).__name__,
+            "feature_names": feature_names,
+            "depth": compiled.depth,
+            "init": compiled.init,
+            "learning_rate": compiled.learning_rate,
+            "n_features": compiled.n_features,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="microseconds"),
+        }
+        with open(os.path.join(staging, _META), "w") as f:
+            json.dump(meta, f, indent=2)
+        os.rename(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return version
+
+
+def load_version(path: str) -> ModelBundle:
+    """Memory-map one version directory and smoke-test it (raises on any problem)."""
+    with open(os.path.join(path, _META)) as f:
+        meta = json.load(f)
+    if meta.get("format") != ARTEFACT_FORMAT:
+        raise ValueError(f"Unsupported artefact format {meta.get('format')!r}")
+    arrays = {
+        # np.asarray drops the memmap subclass; the view still reads the mapping
+        name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        for name in _ARRAYS
+    }
+    compiled = CompiledTreeEnsemble(
+        depth=int(meta["depth"]),
+        init=float(meta["init"]),
+        learning_rate=float(meta["learning_rate"]),
+        n_features=int(meta["n_features"]),
+        **arrays,
+    )
+    bundle = ModelBundle(
+        version=str(meta["version"]),
+        source="mmap",
+        feature_names=meta["feature_names"],
+        compiled=compiled,
+    )
+    smoke_test(bundle, path)
+    return bundle
+
+
+def smoke_test(bundle: ModelBundle, path: str) -> None:
+    """
+    A version must take the features we build, and reproduce its recorded
+    smoke-batch predictions — catches truncated or mismatched arrays.
+    """
+    if set(bundle.feature_names) != set(FEATURE_NAMES):
+        raise ValueError(f"Feature names {bundle.feature_names} do not match {FEATURE_NAMES}")
+    if bundle.compiled.n_features != len(bundle.feature_names):
+        raise ValueError("n_features does not match feature_names")
+    n_nodes = len(bundle.compiled.feature)
+    for name in ("threshold", "left", "value"):
+        if len(getattr(bundle.compiled, name)) != n_nodes:
+            raise ValueError(f"{name}.npy has the wrong length")
+    if bundle.compiled.left.max(initial=0) >= n_nodes or bundle.compiled.roots.max(initial=0) >= n_nodes:
+        raise ValueError("Node references out of range")
+    with np.load(os.path.join(path, _SMOKE)) as smoke:
+        X, expected = smoke["X"], smoke["expected"]
+    got = bundle.predict_raw(X)
+    if not np.all(np.isfinite(got)):
+        raise ValueError("Smoke batch produced non-finite predictions")
+    error = float(np.max(np.abs(got - expected)))
+    if error > COMPILED_MODEL_TOLERANCE:
+        raise ValueError(f"Smoke batch deviates from recorded predictions by {error:.3g}")
+
+
+def _created_at(path: str) -> float:
+    """Export time of a version (meta.json created_at), else its meta.json mtime."""
+    meta_path = os.path.join(path, _META)
+    try:
+        with open(meta_path) as f:
+            return datetime.fromisoformat(json.load(f)["created_at"]).timestamp()
+    except (OSError, ValueError, KeyError, TypeError):
+        try:
+            return os.path.getmtime(meta_path)
+        except OSError:
+            return 0.0
+
+
+def list_versions(versions_dir: str) -> List[str]:
+    """
+    Complete versions (meta.json present), oldest first by export time — not
+    by name, so a custom --version name never hides later timestamped ones.
+    """
+    try:
+        names = os.listdir(versions_dir)
+    except FileNotFoundError:
+        return []
+    complete = [
+        name for name in names
+        if not name.startswith(".") and os.path.isfile(os.path.join(versions_dir, name, _META))
+    ]
+    return sorted(complete, key=lambda name: (_created_at(os.path.join(versions_dir, name)), name))
+
+
+# ── Registry ─────────────────────────────────────────────────────────────────
+
+class ModelRegistry:
+    """
+    Holds the active ModelBundle and moves it to the newest valid version.
+
+    refresh() scans the versions directory; a newer version is loaded,
+    smoke-tested and passed to *prepare* (warm-up, delay surface) before the
+    single reference assignment that activates it. Requests already holding
+    the previous bundle finish on it. A version that fails is remembered and
+    skipped; the registry never moves to an older version than the active
+    one. *pinned* fixes the version. With no loadable version *fallback*
+    supplies the bundle (the pickled model). A process worker's registry
+    does not scan on its own: follow() moves it to whatever its parent's
+    registry has active.
+    """
+
+    def __init__(
+        self,
+        versions_dir: str,
+        fallback: Callable[[], ModelBundle],
+        prepare: Callable[[ModelBundle], None],
+        pinned: Optional[str] = None,
+    ):
+        self.versions_dir = versions_dir
+        self.fallback = fallback
+        self.prepare = prepare
+        self.pinned = pinned
+        self.rejected: Dict[str, str] = {}
+        self.swaps = 0
+        self._active: Optional[ModelBundle] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> ModelBundle:
+        bundle = self._active
+        if bundle is None:
+            self.refresh()
+            bundle = self._active
+        return bundle
+
+    def refresh(self) -> bool:
+        """Activate the newest valid version if it isn't already; True on a swap."""
+        with self._lock:
+            current = self._active
+            candidates = [self.pinned] if self.pinned else list_versions(self.versions_dir)[::-1]
+            skip: Set[str] = set(self.rejected)
+            for version in candidates:
+                if current is not None and version == current.version:
+                    return False
+                if version in skip:
+                    continue
+                if self._try_activate(version):
+                    return True
+            if current is None:
+                self._activate_fallback()
+                return True
+            return False
+
+    def follow(self, version: str) -> bool:
+        """
+        Activate exactly *version*, the one the parent process serves; True on
+        a swap. A version missing here (the parent's pickled fallback) or
+        failing to load keeps the current bundle.
+        """
+        with self._lock:
+            if self._active is not None and self._active.version == version:
+                return False
+            if version in list_versions(self.versions_dir) and self._try_activate(version):
+                return True
+            if self._active is None:
+                self._activate_fallback()
+                return True
+            return False
+
+    def _try_activate(self, version: str) -> bool:
+        current = self._active
+        try:
+            bundle = load_version(os.path.join(self.versions_dir, version))
+            if current is not None and bundle.feature_names != current.feature_names:
+                # Callers build matrices in the active order before the swap
+                raise ValueError("feature column order differs from the active version")
+            self.prepare(bundle)
+        except Exception as exc:
+            self.rejected[version] = str(exc)
+            logger.warning("Model version %s rejected: %s", version, exc)
+            return False
+        self._activate(bundle)
+        return True
+
+    def _activate_fallback(self) -> None:
+        bundle = self.fallback()
+        self.prepare(bundle)
+        self._activate(bundle)
+
+    def _activate(self, bundle: ModelBundle) -> None:
+        previous = self._active
+        self._active = bundle                       # the swap: one reference assignment
+        self.swaps += 1
+        logger.info(
+            "Model version %s (%s) active%s", bundle.version, bundle.source,
+            f", replacing {previous.version}" if previous else "",
+        )
+
+    def status(self) -> Dict[str, Any]:
+        bundle = self._active
+        return {
+            "active": bundle.describe() if bundle else None,
+            "available": list_versions(self.versions_dir),
+            "pinned": self.pinned,
+            "rejected": self.rejected,
+            "swaps": self.swaps,
+        }
@@ -0,0 +1,88 @@
+"""
+Response cache — serialised /predict-route bodies with strong ETags.
+
+Entries are keyed by the caller (canonical request, model version, incident
+revision, representation) and all expire at the next RESPONSE_CACHE_SLOT_SEC
+wall-clock boundary, the same moment the max-age handed to browsers and
+proxies runs out. A conditional request whose If-None-Match names the
+current ETag gets a 304 without the pipeline running.
+"""
+
+import hashlib
+import time
+from typing import Any, Dict, Hashable, Optional
+
+from config.settings import RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_SLOT_SEC
+from services import metrics
+from services.cache import TTLCache
+
+
+class CachedResponse:
+    """One serialised body and its validator (immutable once stored)."""
+
+    __slots__ = ("body", "media_type", "etag")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self.etag = strong_etag(body)
+
+
+def strong_etag(body: bytes) -> str:
+    """Quoted strong validator — a digest of the exact bytes sent."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str, safe_method: bool = True) -> bool:
+    """
+    If-None-Match evaluation (RFC 9110 §13.1.2): any listed tag, compared
+    weakly — a W/ prefix on the client's copy still matches. "*" matches
+    only for GET/HEAD (*safe_method*); on a POST it would mean 412, not a
+    304 for a body the client never saw, so it is treated as no match.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate == "*" and safe_method) or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def slot_remaining(now: Optional[float] = None) -> int:
+    """Whole seconds until the next slot boundary (≥ 1); 0 while caching is off."""
+    if not enabled():
+        return 0
+    now = time.time() if now is None else now
+    return max(1, int(RESPONSE_CACHE_SLOT_SEC - now % RESPONSE_CACHE_SLOT_SEC))
+
+
+_responses = TTLCache(
+    max_weight=RESPONSE_CACHE_MAX_BYTES,
+    default_ttl=RESPONSE_CACHE_SLOT_SEC,
+    weigh=lambda entry: len(entry.body),
+)
+
+
+def enabled() -> bool:
+    return RESPONSE_CACHE_SLOT_SEC > 0
+
+
+def lookup(key: Hashable) -> Optional[CachedResponse]:
+    return _responses.get(key) if enabled() else None
+
+
+def store(key: Hashable, body: bytes, media_type: str) -> CachedResponse:
+    """Wrap *body* with its ETag and keep it until the current slot ends."""
+    entry = CachedResponse(body, media_type)
+    if enabled():
+        _responses.set(key, entry, ttl=slot_remaining())
+    return entry
+
+
+def response_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the response cache (weight = body bytes)."""
+    return _responses.stats()
+
+
+metrics.register_cache("responses", _responses.stats)
@@ -4,57 +4,136 @@ FREE public endpoint, no API key required.
 Config from settings — no hard-coded URLs or timeouts.
 """
 
-from typing import Any, Dict, List
+import asyncio
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-import requests
+import httpx
+import numpy as np
 from fastapi import HTTPException
 
-from config.settings import OSRM_BASE_URL, OSRM_TIMEOUT_SEC
-from config.constants import ROUTE_NAME_FALLBACK_PREFIX
+from config.settings import (
+    OSRM_TIMEOUT_SEC,
+    OSRM_TABLE_MAX_COORDS,
+    ROUTE_CACHE_GRID_DEG,
+    ROUTE_CACHE_TTL_SEC,
+    ROUTE_CACHE_MAX_POINTS,
+)
+from config.constants import (
+    ROUTE_NAME_FALLBACK_PREFIX,
+    DEGRADED_DETOUR_FACTOR,
+    DEGRADED_SPEED_KMH,
+    DEGRADED_ROUTE_NAME,
+)
+from services import metrics
+from services.cache import TTLCache
+from services.singleflight import SingleFlight
+from services.upstream_pool import osrm_pool
 
+_EARTH_RADIUS_KM = 6371.0088
 
-def fetch_routes(
+
+# ── Route cache ──────────────────────────────────────────────────────────────
+# Keyed on origin/destination snapped to a ROUTE_CACHE_GRID_DEG grid, so
+# near-identical pairs share an entry. Bounded by total geometry points
+# (the bulk of each entry's memory; an annotated edge counts as one more),
+# not entry count. Treat hits as read-only.
+
+def _route_weight(routes: List[Dict[str, Any]]) -> int:
+    return 1 + sum(len(r["geometry"]) + len(r.get("edge_distance_m", ())) for r in routes)
+
+
+_route_cache = TTLCache(
+    max_weight=ROUTE_CACHE_MAX_POINTS,
+    default_ttl=ROUTE_CACHE_TTL_SEC,
+    weigh=_route_weight,
+)
+
+
+def _snap(value: float) -> int:
+    return round(value / ROUTE_CACHE_GRID_DEG)
+
+
+def _route_cache_key(
+    origin_lat: float,
+    origin_lon: float,
+    dest_lat: float,
+    dest_lon: float,
+    max_routes: int,
+) -> Tuple[int, int, int, int, int]:
+    return (_snap(origin_lat), _snap(origin_lon), _snap(dest_lat), _snap(dest_lon), max_routes)
+
+
+def route_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the route cache (weight = geometry points)."""
+    return _route_cache.stats()
+
+
+metrics.register_cache("routes", _route_cache.stats)
+
+
+def cached_routes(
     origin_lat: float,
     origin_lon: float,
     dest_lat: float,
     dest_lon: float,
     max_routes: int = 3,
-) -> List[Dict[str, Any]]:
-    """
-    Query the OSRM public routing API for alternative driving routes.
+) -> Optional[List[Dict[str, Any]]]:
+    """Routes from the route cache only (None on a miss) — never calls OSRM."""
+    return _route_cache.get(_route_cache_key(origin_lat, origin_lon, dest_lat, dest_lon, max_routes))
 
-    Returns a list of dicts (up to *max_routes*), each containing:
-        route_name       — summary string
-        distance_km      — total distance in kilometres
-        base_duration_min — total duration in minutes
-        geometry         — list of [lat, lng] coordinate pairs
 
-    Raises:
-        HTTPException 400 — no routes found
-        HTTPException 502 — OSRM service failure
+def straight_line_route(
+    origin_lat: float,
+    origin_lon: float,
+    dest_lat: float,
+    dest_lon: float,
+) -> Dict[str, Any]:
+    """
+    A stand-in route when OSRM can't be asked: great-circle distance times
+    DEGRADED_DETOUR_FACTOR at DEGRADED_SPEED_KMH, drawn as a straight line.
     """
+    lat1, lon1, lat2, lon2 = map(math.radians, (origin_lat, origin_lon, dest_lat, dest_lon))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    distance_km = 2 * _EARTH_RADIUS_KM * math.asin(math.sqrt(a)) * DEGRADED_DETOUR_FACTOR
+    return {
+        "route_name": DEGRADED_ROUTE_NAME,
+        "distance_km": round(distance_km, 2),
+        "base_duration_min": round(distance_km / DEGRADED_SPEED_KMH * 60, 2),
+        "geometry": [[origin_lat, origin_lon], [dest_lat, dest_lon]],
+    }
+
 
-    base = OSRM_BASE_URL.rstrip("/")
-    url = (
-        f"{base}/route/v1/driving/"
+def _route_request(
+    origin_lat: float,
+    origin_lon: float,
+    dest_lat: float,
+    dest_lon: float,
+) -> Tuple[str, Dict[str, str]]:
+    """OSRM /route path (relative to a backend's base URL) and query params."""
+    path = (
+        f"/route/v1/driving/"
         f"{origin_lon},{origin_lat};{dest_lon},{dest_lat}"
     )
     params = {
         "alternatives": "true",
         "overview": "full",
         "geometries": "geojson",
+        # Per-edge distance / travel time along the full geometry (segment profiles)
+        "annotations": "distance,duration",
     }
+    return path, params
 
-    try:
-        resp = requests.get(url, params=params, timeout=OSRM_TIMEOUT_SEC)
-        resp.raise_for_status()
-    except requests.RequestException as exc:
-        raise HTTPException(
-            status_code=502,
-            detail=f"OSRM routing request failed: {exc}",
-        )
 
-    data = resp.json()
+def _parse_osrm_response(
+    data: Dict[str, Any],
+    origin_lat: float,
+    origin_lon: float,
+    dest_lat: float,
+    dest_lon: float,
+    max_routes: int,
+) -> List[Dict[str, Any]]:
+    """Turn an OSRM /route response into the route dicts used downstream."""
     if data.get("code") != "Ok" or not data.get("routes"):
         raise HTTPException(
             status_code=400,
@@ -79,11 +158,197 @@ def fetch_routes(
         summary = legs[0].get("summary", "") if legs else ""
         route_name = summary if summary else f"{ROUTE_NAME_FALLBACK_PREFIX}{idx + 1}"
 
-        routes.append({
+        parsed = {
             "route_name": route_name,
             "distance_km": round(distance_m / 1000, 2),
             "base_duration_min": round(duration_s / 60, 2),
             "geometry": geometry,
-        })
+        }
+        edges = _edge_annotations(legs, len(geometry))
+        if edges is not None:
+            parsed["edge_distance_m"], parsed["edge_duration_s"] = edges
+        routes.append(parsed)
+
+    return routes
+
+
+def _edge_annotations(legs: List[Dict[str, Any]], n_points: int) -> Optional[Tuple[List[float], List[float]]]:
+    """
+    Distance (m) and travel time (s) of each geometry edge, from the legs'
+    annotations — None unless OSRM sent both for every edge.
+    """
+    distance: List[float] = []
+    duration: List[float] = []
+    for leg in legs:
+        annotation = leg.get("annotation") or {}
+        if "distance" not in annotation or "duration" not in annotation:
+            return None
+        distance.extend(annotation["distance"])
+        duration.extend(annotation["duration"])
+    if not legs or len(distance) != n_points - 1 or len(duration) != n_points - 1:
+        return None
+    return distance, duration
+
+
+def fetch_routes(
+    origin_lat: float,
+    origin_lon: float,
+    dest_lat: float,
+    dest_lon: float,
+    max_routes: int = 3,
+) -> List[Dict[str, Any]]:
+    """
+    Query the OSRM public routing API for alternative driving routes.
+
+    Returns a list of dicts (up to *max_routes*), each containing:
+        route_name       — summary string
+        distance_km      — total distance in kilometres
+        base_duration_min — total duration in minutes
+        geometry         — list of [lat, lng] coordinate pairs
+
+    Raises:
+        HTTPException 400 — no routes found
+        HTTPException 502 — OSRM service failure
+    """
+    import requests   # blocking path only (scripts) — kept off the app import path
+
+    key = _route_cache_key(origin_lat, origin_lon, dest_lat, dest_lon, max_routes)
+    cached = _route_cache.get(key)
+    if cached is not None:
+        return cached
+
+    path, params = _route_request(origin_lat, origin_lon, dest_lat, dest_lon)
+
+    try:
+        resp = requests.get(osrm_pool.primary_url() + path, params=params, timeout=OSRM_TIMEOUT_SEC)
+        resp.raise_for_status()
+    except requests.RequestException as exc:
+        raise HTTPException(
+            status_code=502,
+            detail=f"OSRM routing request failed: {exc}",
+        )
 
+    routes = _parse_osrm_response(
+        resp.json(), origin_lat, origin_lon, dest_lat, dest_lon, max_routes
+    )
+    _route_cache.set(key, routes)
     return routes
+
+
+_route_flight = SingleFlight("routes")
+
+
+async def fetch_routes_async(
+    origin_lat: float,
+    origin_lon: float,
+    dest_lat: float,
+    dest_lon: float,
+    max_routes: int = 3,
+) -> List[Dict[str, Any]]:
+    """
+    Non-blocking fetch_routes() through the shared, pooled HTTP client.
+    Same return value and error contract as fetch_routes(), same cache.
+    Concurrent misses for the same cache key share one OSRM request.
+    """
+    key = _route_cache_key(origin_lat, origin_lon, dest_lat, dest_lon, max_routes)
+    cached = _route_cache.get(key)
+    if cached is not None:
+        return cached
+    return await _route_flight.do(
+        key, lambda: _fetch_routes_upstream(key, origin_lat, origin_lon, dest_lat, dest_lon, max_routes)
+    )
+
+
+async def _fetch_routes_upstream(
+    key: Tuple[int, int, int, int, int],
+    origin_lat: float,
+    origin_lon: float,
+    dest_lat: float,
+    dest_lon: float,
+    max_routes: int,
+) -> List[Dict[str, Any]]:
+    """OSRM request for a cache miss; caches the parsed routes under *key*."""
+    path, params = _route_request(origin_lat, origin_lon, dest_lat, dest_lon)
+
+    try:
+        resp = await osrm_pool.get(path, params=params)
+        resp.raise_for_status()
+    except httpx.HTTPError as exc:
+        raise HTTPException(
+            status_code=502,
+            detail=f"OSRM routing request failed: {exc}",
+        )
+
+    routes = _parse_osrm_response(
+        resp.json(), origin_lat, origin_lon, dest_lat, dest_lon, max_routes
+    )
+    _route_cache.set(key, routes)
+    return routes
+
+
+# ── Distance / duration matrix (OSRM /table) ─────────────────────────────────
+
+def _table_chunks(n_sources: int, n_destinations: int, max_coords: int) -> Tuple[int, int]:
+    """Source / destination block sizes whose sum stays within *max_coords*."""
+    max_coords = max(2, max_coords)
+    src = min(n_sources, max(1, max_coords - min(n_destinations, max_coords // 2)))
+    return src, min(n_destinations, max_coords - src)
+
+
+async def _fetch_table_block(
+    sources: Sequence[Tuple[float, float]],
+    destinations: Sequence[Tuple[float, float]],
+) -> Tuple[np.ndarray, np.ndarray]:
+    coords = ";".join(f"{lon},{lat}" for lat, lon in (*sources, *destinations))
+    params = {
+        "sources": ";".join(str(i) for i in range(len(sources))),
+        "destinations": ";".join(str(len(sources) + j) for j in range(len(destinations))),
+        "annotations": "duration,distance",
+    }
+    try:
+        resp = await osrm_pool.get(f"/table/v1/driving/{coords}", params=params)
+        resp.raise_for_status()
+    except httpx.HTTPError as exc:
+        raise HTTPException(
+            status_code=502,
+            detail=f"OSRM table request failed: {exc}",
+        )
+    data = resp.json()
+    if data.get("code") != "Ok" or "durations" not in data or "distances" not in data:
+        raise HTTPException(
+            status_code=400,
+            detail=f"OSRM table lookup failed. OSRM code: {data.get('code')}",
+        )
+    # null (no route) → NaN
+    durations = np.array(data["durations"], dtype=np.float64)
+    distances = np.array(data["distances"], dtype=np.float64)
+    return distances / 1000, durations / 60
+
+
+async def fetch_table_async(
+    sources: Sequence[Tuple[float, float]],
+    destinations: Sequence[Tuple[float, float]],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Driving distance (km) and duration (min) between every (lat, lon) source
+    and destination, as two (sources × destinations) arrays; NaN where OSRM
+    finds no route. Large matrices are split into blocks of at most
+    OSRM_TABLE_MAX_COORDS coordinates, fetched concurrently.
+
+    Raises:
+        HTTPException 400 — OSRM rejected the table request
+        HTTPException 502 — OSRM service failure
+    """
+    n, m = len(sources), len(destinations)
+    src_step, dst_step = _table_chunks(n, m, OSRM_TABLE_MAX_COORDS)
+    blocks = [(i, j) for i in range(0, n, src_step) for j in range(0, m, dst_step)]
+    results = await asyncio.gather(*(
+        _fetch_table_block(sources[i:i + src_step], destinations[j:j + dst_step])
+        for i, j in blocks
+    ))
+    distance_km = np.empty((n, m), dtype=np.float64)
+    duration_min = np.empty((n, m), dtype=np.float64)
+    for (i, j), (dist, dur) in zip(blocks, results):
+        distance_km[i:i + src_step, j:j + dst_step] = dist
+        duration_min[i:i + src_step, j:j + dst_step] = dur
+    return distance_km, duration_min
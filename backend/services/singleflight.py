@@ -0,0 +1,62 @@
+"""
+In-flight call coalescing ("singleflight") — concurrent calls with the same
+key share one execution and all receive its result (or its exception).
+Nothing is kept once the call completes; that is the caches' job.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from config.settings import COALESCE_REQUESTS
+from services.deadline import DeadlineExceeded, expired
+from services.metrics import counter
+
+T = TypeVar("T")
+
+COALESCED_CALLS = counter(
+    "traffic_coalesced_calls_total",
+    "Calls per coalescing group: 'leader' ran the work, 'follower' shared its result.",
+    labels=("group", "role"),
+)
+
+
+class SingleFlight:
+    """
+    Per-key in-flight registry for one kind of call (a request pipeline,
+    geocode lookups, route lookups, ...).
+
+    The shared work runs as its own task and callers await it through
+    asyncio.shield, so a caller that is cancelled (client gone, fail-fast
+    fan-out) never cancels the work the other callers are waiting on.
+    Results are shared objects — callers must treat them as read-only.
+    The work runs under the first caller's request deadline; if that budget
+    runs out while a later caller still has time, the later caller runs the
+    work again under its own.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        if not COALESCE_REQUESTS:
+            return await fn()
+        task = self._inflight.get(key)
+        if task is None:
+            COALESCED_CALLS.inc(group=self.group, role="leader")
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+        else:
+            COALESCED_CALLS.inc(group=self.group, role="follower")
+        try:
+            return await asyncio.shield(task)
+        except DeadlineExceeded:
+            if expired():
+                raise
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+            return await self.do(key, fn)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
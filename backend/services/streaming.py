@@ -0,0 +1,71 @@
+"""
+Streaming responses — NDJSON or Server-Sent Events fed by a producer
+coroutine through a bounded queue, so results go out as soon as they exist
+and a slow client throttles the producer instead of growing memory.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+import orjson
+
+from config.constants import NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE
+
+Emit = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+_DONE = object()
+
+MEDIA_TYPES = {"ndjson": NDJSON_MEDIA_TYPE, "sse": SSE_MEDIA_TYPE}
+
+
+def encode_event(fmt: str, event: str, seq: int, data: Dict[str, Any]) -> bytes:
+    """
+    One event in wire format. NDJSON: a JSON line carrying "event" and
+    "seq"; SSE: an ``event:`` / ``id:`` / ``data:`` block.
+    """
+    if fmt == "sse":
+        return b"event: %s\nid: %d\ndata: %s\n\n" % (event.encode(), seq, orjson.dumps(data))
+    return orjson.dumps({"event": event, "seq": seq, **data}) + b"\n"
+
+
+async def stream_events(
+    produce: Callable[[Emit], Awaitable[None]],
+    fmt: str,
+    queue_size: int,
+) -> AsyncIterator[bytes]:
+    """
+    Run *produce(emit)* as a task and yield its events encoded as *fmt*.
+
+    ``await emit(event, data)`` blocks once *queue_size* events are waiting
+    on the client — that is the backpressure. A producer failure becomes a
+    final "error" event. If the client goes away, the producer is cancelled.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def emit(event: str, data: Dict[str, Any]) -> None:
+        await queue.put((event, data))
+
+    async def run() -> None:
+        # Cancellation means the consumer is gone: no sentinel, nobody reads it
+        # (and a put on a full queue would block forever)
+        try:
+            await produce(emit)
+        except Exception as exc:
+            detail = getattr(exc, "detail", None) or str(exc)
+            await queue.put(("error", {"status_code": getattr(exc, "status_code", 500), "error": detail}))
+        await queue.put(_DONE)
+
+    producer = asyncio.ensure_future(run())
+    seq = 0
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            event, data = item
+            yield encode_event(fmt, event, seq, data)
+            seq += 1
+    finally:
+        # Cancel, then wait for the task to unwind — never for the sentinel
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
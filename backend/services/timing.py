@@ -0,0 +1,77 @@
+"""
+Per-request stage timing — pipeline stages record their wall time into the
+current request's context (reported as a Server-Timing header) and into the
+stage / request latency histograms served on /metrics.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from services.metrics import REQUEST_DURATION, STAGE_DURATION
+
+# Stage name → accumulated ms for the request being served (None outside one).
+# Concurrent sub-tasks (batch items) share the dict, so their times add up.
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as pipeline stage *name*."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=name)
+        stages = _stages.get()
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + elapsed * 1000
+
+
+def server_timing(stages: Dict[str, float]) -> str:
+    """Server-Timing header value, e.g. 'geocode;dur=52.1, osrm;dur=80.4'."""
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in stages.items())
+
+
+class StageTimingMiddleware:
+    """
+    ASGI middleware: opens a stage dict per HTTP request, adds
+    ``Server-Timing`` (the recorded stages plus ``total``) to the response and
+    records the request latency histogram. Plain ASGI rather than
+    BaseHTTPMiddleware — no extra task per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stages: Dict[str, float] = {}
+        token = _stages.set(stages)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                stages["total"] = elapsed * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stages).encode("latin-1")))
+                # Lets the browser's Resource Timing API see the cross-origin entries
+                headers.append((b"timing-allow-origin", b"*"))
+                message = {**message, "headers": headers}
+                # Router sets "endpoint" on a match; label unmatched paths
+                # together so arbitrary URLs can't grow the label set
+                path = scope["path"] if "endpoint" in scope else "unmatched"
+                REQUEST_DURATION.observe(
+                    elapsed, method=scope["method"], path=path, status=str(message["status"]),
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _stages.reset(token)
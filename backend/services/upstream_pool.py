@@ -0,0 +1,275 @@
+"""
+Upstream pools — several interchangeable Photon / OSRM backends behind one
+call: latency-aware load balancing, hedged requests after a percentile
+deadline, and a circuit breaker per backend.
+"""
+
+import asyncio
+import collections
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+from config.settings import (
+    OSRM_BASE_URLS,
+    OSRM_TIMEOUT_SEC,
+    PHOTON_URLS,
+    PHOTON_TIMEOUT_SEC,
+    UPSTREAM_BREAKER_COOLDOWN_SEC,
+    UPSTREAM_BREAKER_FAILURES,
+    UPSTREAM_EWMA_ALPHA,
+    UPSTREAM_HEDGE_MIN_MS,
+    UPSTREAM_HEDGE_PERCENTILE,
+)
+from services import http_client
+from services.deadline import capped_timeout, expired, raise_exceeded
+from services.metrics import counter, register_collector
+
+# Recent latencies kept per pool for the hedge deadline, and the fewest that
+# give a percentile worth trusting
+_LATENCY_WINDOW = 256
+_MIN_HEDGE_SAMPLES = 20
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+UPSTREAM_HEDGES = counter(
+    "traffic_upstream_hedges_total",
+    "Hedged duplicate requests, by whether the hedge answered first.",
+    labels=("upstream", "outcome"),
+)
+UPSTREAM_FAILOVERS = counter(
+    "traffic_upstream_failovers_total",
+    "Requests retried on another backend after a failure.",
+    labels=("upstream",),
+)
+
+
+class NoBackendAvailable(httpx.TransportError):
+    """Every backend of a pool has its circuit open."""
+
+
+class Backend:
+    """One base URL with its latency estimate, load and circuit state."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.ewma: Optional[float] = None     # seconds; None until the first answer
+        self.inflight = 0
+        self.failures = 0                     # consecutive
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial_running = False
+
+    def score(self) -> float:
+        # Unmeasured backends score 0 so each gets tried early
+        return (self.ewma or 0.0) * (1 + self.inflight)
+
+    def record(self, ok: bool, elapsed: float, alpha: float, max_failures: int) -> None:
+        self.ewma = elapsed if self.ewma is None else alpha * elapsed + (1 - alpha) * self.ewma
+        self.trial_running = False
+        if ok:
+            self.failures = 0
+            self.state = CLOSED
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= max_failures:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "state": self.state,
+            "ewma_ms": round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            "inflight": self.inflight,
+            "consecutive_failures": self.failures,
+        }
+
+
+class UpstreamPool:
+    """
+    GETs against whichever of *urls* looks fastest right now.
+
+    Backends are ordered by latency EWMA × (1 + in-flight). The request goes
+    to the first; if it has not answered after the pool's recent
+    *hedge_percentile* latency, a duplicate goes to the next backend and the
+    first usable answer wins (the other is cancelled). A transport error or
+    5xx fails over to the next backend at once. After *breaker_failures*
+    consecutive failures a backend is skipped for *cooldown* seconds, then
+    gets a single trial request (half-open) that closes or re-opens it.
+    4xx answers are the caller's problem and count as healthy. Each attempt's
+    timeout is capped at the request's remaining deadline (services.deadline);
+    running out raises DeadlineExceeded.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        urls: Sequence[str],
+        timeout: float,
+        hedge_percentile: float = UPSTREAM_HEDGE_PERCENTILE,
+        hedge_min_ms: float = UPSTREAM_HEDGE_MIN_MS,
+        ewma_alpha: float = UPSTREAM_EWMA_ALPHA,
+        breaker_failures: int = UPSTREAM_BREAKER_FAILURES,
+        cooldown: float = UPSTREAM_BREAKER_COOLDOWN_SEC,
+    ):
+        if not urls:
+            raise ValueError(f"Upstream pool {name!r} needs at least one URL")
+        self.name = name
+        self.backends = [Backend(url) for url in urls]
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min = hedge_min_ms / 1000
+        self.ewma_alpha = ewma_alpha
+        self.breaker_failures = breaker_failures
+        self.cooldown = cooldown
+        self._latencies: collections.deque = collections.deque(maxlen=_LATENCY_WINDOW)
+
+    def _ranked(self) -> Tuple[Optional[Backend], List[Backend]]:
+        """Read-only view: (a tripped backend due a probe, or None; closed backends by score)."""
+        now = time.monotonic()
+        probe = next(
+            (b for b in self.backends
+             if b.state != CLOSED and not b.trial_running and now - b.opened_at >= self.cooldown),
+            None,
+        )
+        return probe, sorted((b for b in self.backends if b.state == CLOSED), key=Backend.score)
+
+    def _candidates(self) -> List[Backend]:
+        """
+        Backends for one request, in order: a due probe first, then closed
+        ones by score. The probe is claimed here (half-open, trial running)
+        before anything awaits, so concurrent requests cannot probe the same
+        backend; at most one probe per request keeps a dead backend's cost
+        to one slow attempt.
+        """
+        probe, closed = self._ranked()
+        if probe is None:
+            return closed
+        probe.state = HALF_OPEN
+        probe.trial_running = True
+        return [probe] + closed
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds before hedging, or None while hedging is off / unmeasured."""
+        if self.hedge_percentile <= 0 or len(self._latencies) < _MIN_HEDGE_SAMPLES:
+            return None
+        return max(self.hedge_min, float(np.percentile(self._latencies, self.hedge_percentile)))
+
+    def _failure_sample(self, elapsed: float) -> float:
+        # A fast failure must not look like a fast backend: count it as twice
+        # the slowest healthy estimate in the pool
+        slowest = max((b.ewma for b in self.backends if b.ewma is not None and b.state == CLOSED), default=0.0)
+        return max(elapsed, 2 * slowest)
+
+    def primary_url(self) -> str:
+        """Best closed backend right now — for blocking callers that don't hedge (no probing)."""
+        _, closed = self._ranked()
+        return (closed[0] if closed else self.backends[0]).url
+
+    async def _attempt(self, backend: Backend, path: str, params: Optional[dict]) -> httpx.Response:
+        try:
+            timeout = capped_timeout(self.timeout, self.name)     # the request's remaining budget
+        except BaseException:
+            backend.trial_running = False       # a claimed probe that never went out
+            raise
+        backend.inflight += 1
+        start = time.perf_counter()
+        try:
+            response = await http_client.get(
+                backend.url + path, params=params, timeout=timeout, upstream=self.name,
+            )
+        except httpx.HTTPError:
+            if expired():
+                # Cut short by the request deadline, not the backend's fault
+                backend.trial_running = False
+                raise_exceeded(self.name)
+            elapsed = self._failure_sample(time.perf_counter() - start)
+            backend.record(False, elapsed, self.ewma_alpha, self.breaker_failures)
+            raise
+        except asyncio.CancelledError:
+            backend.trial_running = False      # lost a hedge race: says nothing about health
+            raise
+        finally:
+            backend.inflight -= 1
+        elapsed = time.perf_counter() - start
+        ok = response.status_code < 500
+        if ok:
+            self._latencies.append(elapsed)
+        else:
+            elapsed = self._failure_sample(elapsed)
+        backend.record(ok, elapsed, self.ewma_alpha, self.breaker_failures)
+        return response
+
+    async def get(self, path: str = "", params: Optional[dict] = None) -> httpx.Response:
+        """
+        GET *path* (appended to a backend's base URL). Returns the first usable
+        response — or, when every backend failed, the last 5xx response / raises
+        the last transport error, so callers keep their raise_for_status handling.
+        """
+        order = self._candidates()
+        if not order:
+            raise NoBackendAvailable(f"Every {self.name} backend has its circuit open")
+
+        running: Dict[asyncio.Future, bool] = {}       # attempt → is the hedge
+        last_response: Optional[httpx.Response] = None
+        last_error: Optional[BaseException] = None
+        hedge_after = self.hedge_delay()
+        hedged = False
+
+        def launch(is_hedge: bool) -> None:
+            running[asyncio.ensure_future(self._attempt(order.pop(0), path, params))] = is_hedge
+
+        launch(False)
+        try:
+            while running:
+                wait = hedge_after if order and not hedged else None
+                done, _ = await asyncio.wait(running, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:                            # hedge deadline passed
+                    hedged = True
+                    launch(True)
+                    continue
+                for task in done:
+                    is_hedge = running.pop(task)
+                    try:
+                        response = task.result()
+                    except httpx.HTTPError as exc:
+                        last_error = exc
+                        continue
+                    if response.status_code >= 500:
+                        last_response = response
+                        continue
+                    if hedged:
+                        UPSTREAM_HEDGES.inc(upstream=self.name, outcome="won" if is_hedge else "lost")
+                    return response
+                if not running and order:
+                    UPSTREAM_FAILOVERS.inc(upstream=self.name)
+                    launch(False)
+        finally:
+            for task in running:
+                task.cancel()
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [backend.describe() for backend in self.backends]
+
+
+photon_pool = UpstreamPool("photon", PHOTON_URLS, timeout=PHOTON_TIMEOUT_SEC)
+osrm_pool = UpstreamPool("osrm", OSRM_BASE_URLS, timeout=OSRM_TIMEOUT_SEC)
+
+
+@register_collector
+def _pool_samples():
+    pools = (photon_pool, osrm_pool)
+    yield "traffic_upstream_backend_open", "gauge", "1 while a backend's circuit is open or half-open.", [
+        ({"upstream": pool.name, "backend": b.url}, 0 if b.state == CLOSED else 1)
+        for pool in pools for b in pool.backends
+    ]
+    yield "traffic_upstream_backend_ewma_seconds", "gauge", "Smoothed backend latency used for balancing.", [
+        ({"upstream": pool.name, "backend": b.url}, round(b.ewma, 6))
+        for pool in pools for b in pool.backends if b.ewma is not None
+    ]
@@ -0,0 +1,58 @@
+"""
+Shared test setup. Settings are read at import time, so the environment is
+fixed here, before any backend module is imported: no on-disk geocode cache
+and no model preload.
+"""
+
+import os
+import sys
+
+os.environ.setdefault("GEOCODE_CACHE_DB_PATH", "")
+os.environ.setdefault("PRELOAD_MODELS", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from api import routes
+from services import ml_service, response_cache
+
+_STUB_ROUTES = [
+    {"route_name": "A", "distance_km": 12.0, "base_duration_min": 20.0, "geometry": [[52.0, 13.0], [52.1, 13.1]]},
+    {"route_name": "B", "distance_km": 15.0, "base_duration_min": 22.0, "geometry": [[52.0, 13.0], [52.05, 13.2]]},
+]
+
+
+@pytest.fixture
+def stub_routes():
+    """The candidate routes every place pair resolves to under the client fixture."""
+    return [dict(route) for route in _STUB_ROUTES]
+
+
+@pytest.fixture
+def client(monkeypatch, stub_routes):
+    """
+    App client with geocoding and OSRM stubbed out: _resolve_routes returns
+    stub_routes and records each (source, destination) in resolve_calls.
+    The response cache starts and ends empty.
+    """
+    calls = []
+
+    async def resolve(source, destination):
+        calls.append((source, destination))
+        return stub_routes
+
+    monkeypatch.setattr(routes, "_resolve_routes", resolve)
+    response_cache._responses.clear()
+    client = TestClient(main.app)
+    client.resolve_calls = calls
+    yield client
+    response_cache._responses.clear()
+
+
+@pytest.fixture
+def exact_model(monkeypatch):
+    """Exact model answers: the active bundle's delay surface is switched off."""
+    monkeypatch.setattr(ml_service._registry.active, "surface", None)
@@ -0,0 +1,47 @@
+import pytest
+from fastapi import HTTPException
+
+from api import routes
+
+_ITEM = {"source": "Batch A", "destination": "Batch B", "travel_day": "Monday", "travel_time": "08:00", "weather": "Rain"}
+
+
+@pytest.fixture
+def client(client, monkeypatch, exact_model):
+    """The shared client, with one unknown place and the model passes counted."""
+    model_calls = []
+
+    async def resolve(source, destination):
+        if source == "Atlantis":
+            raise HTTPException(status_code=404, detail="Location 'Atlantis' not found")
+        return await resolve_routes(source, destination)
+
+    async def predict(features, allow_surface=False):
+        model_calls.append(len(features))
+        return await predict_delay_async(features, allow_surface)
+
+    resolve_routes, predict_delay_async = routes._resolve_routes, routes.predict_delay_async
+    monkeypatch.setattr(routes, "_resolve_routes", resolve)
+    monkeypatch.setattr(routes, "predict_delay_async", predict)
+    client.model_calls = model_calls
+    return client
+
+
+def test_failing_items_do_not_fail_the_batch(client):
+    items = [_ITEM, {**_ITEM, "source": "Atlantis"}, {**_ITEM, "travel_time": "noon"}, {**_ITEM, "weather": "Clear"}]
+    body = client.post("/predict-routes/batch", json={"items": items}).json()
+    assert (body["succeeded"], body["failed"]) == (2, 2)
+    statuses = [(r["index"], r["status_code"]) for r in body["results"]]
+    assert statuses == [(0, 200), (1, 404), (2, 400), (3, 200)]
+    assert body["results"][1]["error"] == "Location 'Atlantis' not found"
+    assert client.model_calls == [4]                    # both good items' routes in one model pass
+
+    for index in (0, 3):
+        single = client.post("/predict-route", json=items[index]).json()
+        batched = body["results"][index]["result"]["routes"]
+        assert [{k: v for k, v in route.items() if v is not None} for route in batched] == single["routes"]
+
+
+def test_compact_batch(client):
+    body = client.post("/predict-routes/batch?format=compact", json={"items": [_ITEM]}).json()
+    assert body["succeeded"] == 1 and body["results"][0]["result"]["routes"][0]["rank"] == 1
@@ -0,0 +1,40 @@
+import numpy as np
+import orjson
+import pytest
+
+from services import ml_service
+
+_ITEM = {"source": "A town", "destination": "B town", "travel_day": "Monday", "travel_time": "08:00", "weather": "Rain"}
+
+
+class _FlatSurface:
+    """Stand-in delay surface answering 7.0 everywhere — marks surface-tier results."""
+
+    def lookup(self, features):
+        return np.full(len(features), 7.0), np.ones(len(features), dtype=bool)
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setattr(ml_service._registry.active, "surface", _FlatSurface())
+    return client
+
+
+def _delays(result):
+    return sorted(route["delay_min"] for route in result["routes"])
+
+
+def test_streamed_and_plain_batch_score_alike(client):
+    body = {"items": [_ITEM, {**_ITEM, "weather": "Clear"}]}
+    plain = client.post("/predict-routes/batch?format=compact", json=body).json()
+    lines = client.post("/predict-routes/batch?format=compact&stream=ndjson", json=body).content.splitlines()
+    streamed = {event["index"]: event for event in map(orjson.loads, lines) if event["event"] == "item"}
+
+    for item in plain["results"]:
+        assert _delays(item["result"]) == [7.0, 7.0]                 # surface tier used
+        assert _delays(streamed[item["index"]]["result"]) == _delays(item["result"])
+
+
+def test_single_prediction_stays_on_the_exact_model(client):
+    result = client.post("/predict-route?format=compact", json=_ITEM).json()
+    assert _delays(result) != [7.0, 7.0]
@@ -0,0 +1,39 @@
+from api.schemas import CompactPredictionResponse
+from config.constants import COMPACT_MEDIA_TYPE, COMPACT_SCHEMA_VERSION
+
+_ITEM = {"source": "Compact A", "destination": "Compact B", "travel_day": "Monday",
+         "travel_time": "08:00", "weather": "Rain"}
+
+
+def test_compact_and_verbose_carry_the_same_values(client):
+    verbose = client.post("/predict-route", json=_ITEM).json()
+    response = client.post("/predict-route?format=compact", json=_ITEM)
+    assert response.headers["content-type"] == COMPACT_MEDIA_TYPE
+    compact = CompactPredictionResponse.model_validate(response.json())
+    assert compact.schema_version == COMPACT_SCHEMA_VERSION
+    assert (compact.confidence, compact.congestion, compact.peak_hour) == (
+        verbose["confidence"], verbose["congestionLevel"], verbose["peakHourFlag"],
+    )
+    for short, full in zip(compact.routes, verbose["routes"]):
+        assert (short.rank, short.name, short.distance_km, short.base_time_min) == (
+            full["rank"], full["route"], full["distance_km"], full["base_time_min"],
+        )
+        assert (short.delay_min, short.total_time_min, short.recommended, short.risk_score) == (
+            full["predicted_delay_min"], full["predicted_time_min"], full["isRecommended"], full["riskScore"],
+        )
+        assert short.geometry == full["geometry"]
+
+
+def test_compact_is_chosen_by_accept_header_unless_format_says_otherwise(client):
+    by_header = client.post("/predict-route", json=_ITEM, headers={"Accept": COMPACT_MEDIA_TYPE})
+    assert by_header.json()["schema_version"] == COMPACT_SCHEMA_VERSION
+    overridden = client.post("/predict-route?format=verbose", json=_ITEM, headers={"Accept": COMPACT_MEDIA_TYPE})
+    assert "schema_version" not in overridden.json() and "predictedDelay" in overridden.json()["routes"][0]
+
+
+def test_compact_body_has_no_aliases_or_nulls(client):
+    payload = {**_ITEM, "geometry_format": "polyline"}
+    route = client.post("/predict-route?format=compact", json=payload).json()["routes"][0]
+    assert not {"predictedDelay", "predicted_delay", "baseTime", "route"} & set(route)
+    assert "geometry" not in route and isinstance(route["polyline"], str)
+    assert None not in route.values()
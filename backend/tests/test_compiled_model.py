@@ -0,0 +1,62 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+from services.compiled_model import compile_gradient_boosting, max_abs_error, validation_batch
+from services.model_registry import ModelBundle
+
+
+def _fit(n_features=4, **params):
+    rng = np.random.RandomState(1)
+    X = rng.uniform(0, 100, (400, n_features))
+    y = X[:, 0] * 0.3 + np.sin(X[:, 1] / 7) * 5 + (X[:, 2] > 50) * 4 + rng.normal(0, 0.5, 400)
+    columns = [f"f{i}" for i in range(n_features)]
+    return GradientBoostingRegressor(random_state=0, **params).fit(pd.DataFrame(X, columns=columns), y)
+
+
+@pytest.mark.parametrize("params", [
+    {"n_estimators": 30, "max_depth": 3},
+    {"n_estimators": 20, "max_depth": 5, "learning_rate": 0.3},
+    {"n_estimators": 10, "init": "zero"},
+])
+def test_compiled_matches_sklearn(params):
+    model = _fit(**params)
+    compiled = compile_gradient_boosting(model)
+    assert compiled is not None
+    X = validation_batch(compiled, n_rows=1000)          # includes rows exactly on thresholds
+    assert max_abs_error(compiled, model, X) < 1e-9
+
+
+def test_compiled_handles_more_rows_than_one_chunk():
+    model = _fit(n_estimators=5)
+    compiled = compile_gradient_boosting(model)
+    X = np.random.RandomState(2).uniform(0, 100, (700, 4))
+    assert max_abs_error(compiled, model, X) < 1e-9
+
+
+def test_unsupported_models_are_not_compiled():
+    X = np.random.RandomState(0).uniform(size=(50, 2))
+    forest = RandomForestRegressor(n_estimators=2, random_state=0).fit(X, X[:, 0])
+    assert compile_gradient_boosting(forest) is None
+    assert compile_gradient_boosting(GradientBoostingRegressor()) is None    # not fitted
+
+
+def test_wrong_width_is_rejected():
+    compiled = compile_gradient_boosting(_fit(n_estimators=3))
+    with pytest.raises(ValueError):
+        compiled.predict(np.zeros((2, 3)))
+
+
+def test_sklearn_tier_is_quiet_without_touching_global_filters():
+    model = _fit(n_estimators=3)
+    bundle = ModelBundle(version="t", source="pickle", feature_names=[f"f{i}" for i in range(4)], sklearn=model)
+    before = list(warnings.filters)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        bundle.predict_raw(np.zeros((3, 4)))             # ndarray on a model fitted with names
+    assert warnings.filters == before
+    with pytest.warns(UserWarning, match="valid feature names"):
+        model.predict(np.zeros((1, 4)))                   # still reported everywhere else
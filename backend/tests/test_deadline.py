@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from api import routes
+from services.deadline import (
+    DeadlineExceeded,
+    capped_timeout,
+    deadline_scope,
+    expired,
+    remaining,
+    within_deadline,
+)
+
+_ITEM = {"source": "Slow origin", "destination": "Slow destination",
+         "travel_day": "Monday", "travel_time": "08:00", "weather": "Clear"}
+
+
+def test_no_budget_outside_a_scope():
+    assert remaining() is None and not expired()
+    assert capped_timeout(5.0, "t") == 5.0
+
+
+def test_timeouts_are_capped_and_exhaustion_raises():
+    with deadline_scope(1.0):
+        assert 0.9 < capped_timeout(5.0, "t") <= 1.0
+        assert capped_timeout(0.5, "t") == 0.5
+    with deadline_scope(0.0):
+        assert expired()
+        with pytest.raises(DeadlineExceeded) as exc:
+            capped_timeout(5.0, "osrm")
+        assert exc.value.stage == "osrm"
+
+
+def test_within_deadline_cancels_the_work():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        with deadline_scope(0.02):
+            # The budget is inherited by tasks started inside the scope
+            inner = await asyncio.create_task(_remaining())
+            with pytest.raises(DeadlineExceeded):
+                await within_deadline(slow(), "model")
+        return inner
+
+    assert 0 < asyncio.run(main()) <= 0.02
+    assert cancelled == [True]
+
+
+async def _remaining():
+    return remaining()
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    """The shared client, with route resolution outlasting any test budget."""
+    async def slow_routes(source, destination):
+        await asyncio.sleep(2)
+
+    monkeypatch.setattr(routes, "_resolve_routes", slow_routes)
+    return client
+
+
+def test_uncached_endpoints_leave_nothing_to_degrade_to(client, monkeypatch):
+    monkeypatch.setattr(routes, "cached_geocode", lambda place: None)
+    response = client.post("/predict-route?deadline_ms=50", json=_ITEM)
+    assert response.status_code == 504
+    assert "geocode cache" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("cached, source", [(False, "straight_line"), (True, "cache")])
+def test_exhausted_budget_degrades(client, stub_routes, monkeypatch, cached, source):
+    points = {"Slow origin": (19.076, 72.8777), "Slow destination": (18.5204, 73.8567)}
+    monkeypatch.setattr(routes, "cached_geocode", points.get)
+    monkeypatch.setattr(routes, "cached_routes", lambda *args, **kwargs: stub_routes if cached else None)
+
+    response = client.post("/predict-route?format=compact&deadline_ms=50", json=_ITEM)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-store" and "etag" not in response.headers
+    body = response.json()
+    assert body["degraded"] == {"reason": "deadline_exceeded", "stage": "request", "route_source": source}
+    assert body["routes"][0]["delay_min"] >= 0
+    assert "degraded;dur=" in response.headers["server-timing"]
+
+
+@pytest.mark.parametrize("query", ["", "?deadline_ms=50"])
+def test_unparseable_time_is_a_400(client, query):
+    response = client.post(f"/predict-route{query}", json={**_ITEM, "travel_time": "noon"})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid travel_time")
+    assert client.get(f"/predict-route{query}", params={**_ITEM, "travel_time": "noon"}).status_code == 400
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+
+from config.settings import DEFAULT_DENSITY, DEFAULT_LANES, DEFAULT_SIGNALS
+from services import ml_service
+from services.compiled_model import compile_gradient_boosting
+from services.delay_surface import DelaySurface
+from services.feature_engineering import FEATURE_NAMES, HOUR_COS, HOUR_SIN, build_feature_matrix_columns
+from services.model_registry import ModelBundle
+
+_LEVELS = (0.0, 1.0, 2.5)
+
+
+@pytest.fixture(scope="module")
+def compiled():
+    rng = np.random.RandomState(0)
+    n = 3000
+    hours = rng.randint(0, 24, n)
+    X = np.column_stack((
+        rng.uniform(0, 100, n), rng.uniform(0, 200, n), HOUR_SIN[hours], HOUR_COS[hours],
+        rng.randint(0, 2, n), rng.choice(_LEVELS, n),
+        np.full(n, DEFAULT_DENSITY), np.full(n, DEFAULT_LANES), np.full(n, DEFAULT_SIGNALS),
+    ))
+    # Interactions between the continuous inputs and every context feature
+    y = 0.1 * X[:, 1] * (1 + X[:, 5]) + 3 * X[:, 2] * (X[:, 0] > 40) - 2 * X[:, 4] + rng.normal(0, 0.5, n)
+    model = GradientBoostingRegressor(n_estimators=40, max_depth=4, random_state=0).fit(X, y)
+    return compile_gradient_boosting(model)
+
+
+@pytest.fixture(scope="module")
+def surface(compiled):
+    return DelaySurface.build(compiled, FEATURE_NAMES, _LEVELS)
+
+
+def _rows(distance, duration, hour=8, weekend=0, weather=1.0):
+    return build_feature_matrix_columns(np.asarray(distance), np.asarray(duration), hour, weekend, weather)
+
+
+def test_on_table_rows_match_the_model_exactly(surface, compiled):
+    rng = np.random.RandomState(1)
+    for hour, weekend, weather in [(0, 0, 0.0), (8, 1, 1.0), (17, 0, 2.5), (23, 1, 2.5)]:
+        # Past the outermost splits too: the step function is flat out there
+        X = _rows(rng.uniform(-20, 150, 500), rng.uniform(-20, 300, 500), hour, weekend, weather)
+        estimate, covered = surface.lookup(X)
+        assert covered.all()
+        np.testing.assert_allclose(estimate, compiled.predict(X), atol=1e-4)     # float32 table
+
+
+def test_inputs_exactly_on_a_threshold(surface, compiled):
+    cuts = compiled.threshold[np.isfinite(compiled.threshold) & (compiled.feature == 0)]
+    X = _rows(cuts, np.full(cuts.size, 80.0))
+    estimate, _ = surface.lookup(X)
+    np.testing.assert_allclose(estimate, compiled.predict(X), atol=1e-4)
+
+
+def test_rows_off_the_table_are_not_covered(surface):
+    X = _rows([10.0, 10.0, 10.0, np.nan], [20.0, 20.0, 20.0, 20.0])
+    X[0, 5] = 1.7                               # weather level not tabulated
+    X[1, 6] = DEFAULT_DENSITY + 1               # non-default input
+    _, covered = surface.lookup(X)
+    assert covered.tolist() == [False, False, True, False]
+
+
+def test_measured_error_is_within_float32_rounding(surface, compiled):
+    report = surface.measure_error(compiled.predict)
+    assert report["max_error_min"] < 1e-3
+    stats = surface.stats()
+    assert stats["contexts"] == 24 * 2 * len(_LEVELS)
+    assert stats["bytes"] >= stats["cells"] * 4
+
+
+def test_surface_requires_the_compiled_predictor():
+    bundle = ModelBundle(version="t", source="pickle", feature_names=FEATURE_NAMES, sklearn=object())
+    assert ml_service.build_delay_surface(bundle) == {"enabled": False, "reason": "requires the compiled predictor"}
+    assert bundle.surface is None
+
+
+def test_surface_is_enabled_for_the_shipped_model():
+    bundle = ml_service._registry.active
+    surface = bundle.surface
+    try:
+        report = ml_service.build_delay_surface(bundle)
+        assert report["enabled"] and report["max_error_min"] < 1e-3
+    finally:
+        bundle.surface = surface
+
+
+class _Model:
+    def __init__(self, compiled):
+        self.compiled = compiled
+
+    def predict(self, X):
+        return self.compiled.predict(X) + 100.0     # tells model answers from surface ones
+
+
+def test_predict_delay_sends_only_uncovered_rows_to_the_model(surface, compiled, monkeypatch):
+    bundle = ModelBundle(version="t", source="pickle", feature_names=FEATURE_NAMES, sklearn=_Model(compiled))
+    bundle.surface = surface
+    monkeypatch.setattr(ml_service._registry, "_active", bundle)
+    X = _rows([10.0, 20.0], [30.0, 40.0])
+    X[1, 5] = 1.7
+    expected = compiled.predict(X)
+    delays, batch_rows = ml_service.predict_delay_counted(X, allow_surface=True)
+    assert delays == pytest.approx([max(expected[0], 0), expected[1] + 100], abs=0.01)
+    assert batch_rows == [("surface", 1), ("sklearn", 1)]
+    assert ml_service.predict_delay(X) == pytest.approx(list(np.maximum(expected + 100, 0)), abs=0.01)
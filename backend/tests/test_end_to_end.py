@@ -0,0 +1,58 @@
+"""
+The whole /predict-route pipeline against the benchmark's Photon/OSRM
+stand-ins, served in-process through httpx's ASGI transport (no sockets).
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks import stub_servers
+from benchmarks.run_benchmark import _parse_server_timing
+from services import http_client, response_cache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    for name in ("PHOTON_LATENCY_MS", "OSRM_LATENCY_MS", "JITTER_MS"):
+        monkeypatch.setattr(stub_servers, name, 0.0)
+    monkeypatch.setattr(stub_servers, "GEOMETRY_POINTS", 50)
+    monkeypatch.setattr(
+        http_client, "_build_client",
+        lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_servers.app)),
+    )
+    asyncio.run(http_client.close_http_client())
+    response_cache._responses.clear()
+    yield TestClient(main.app)
+    asyncio.run(http_client.close_http_client())
+
+
+def _payload(n):
+    return {"source": f"E2E origin {n}", "destination": f"E2E destination {n}",
+            "travel_day": "Tuesday", "travel_time": "08:15", "weather": "Rain"}
+
+
+def test_prediction_runs_every_stage(client):
+    response = client.post("/predict-route?format=compact", json=_payload(1))
+    assert response.status_code == 200
+    routes = sorted(response.json()["routes"], key=lambda route: route["rank"])
+    assert 1 <= len(routes) <= 3
+    totals = [route["total_time_min"] for route in routes]
+    assert totals == sorted(totals)
+
+    stages = _parse_server_timing(response.headers["server-timing"])
+    assert {"geocode", "osrm", "features", "model", "rank", "total"} <= set(stages)
+    assert stages["total"] >= stages["model"]
+    assert response.headers["timing-allow-origin"] == "*"
+
+
+def test_repeat_lookups_are_served_from_cache(client):
+    before = dict(stub_servers.calls)
+    client.post("/predict-route", json=_payload(2))
+    client.post("/predict-route", json={**_payload(2), "weather": "Clear"})
+    made = {name: stub_servers.calls[name] - before.get(name, 0) for name in ("photon", "osrm")}
+    assert made == {"photon": 2, "osrm": 1}
+
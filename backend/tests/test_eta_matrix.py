@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from api import routes
+from services import routing_service
+
+
+@pytest.mark.parametrize("n, m, limit", [(1, 1, 100), (3, 40, 10), (40, 3, 10), (25, 25, 10), (7, 9, 2)])
+def test_table_chunks_stay_within_the_coordinate_limit(n, m, limit):
+    src, dst = routing_service._table_chunks(n, m, limit)
+    assert 1 <= src <= n and 1 <= dst <= m
+    assert src + dst <= limit
+
+
+class _FakeTable:
+    """Distance = 1000 m × (source lat + destination lon); lat 0 has no routes."""
+
+    def __init__(self):
+        self.coords_per_call = []
+
+    async def get(self, path, params=None):
+        points = [tuple(map(float, p.split(","))) for p in path.rsplit("/", 1)[1].split(";")]
+        self.coords_per_call.append(len(points))
+        src = [points[int(i)] for i in params["sources"].split(";")]
+        dst = [points[int(i)] for i in params["destinations"].split(";")]
+        distances = [[None if s[1] == 0 else 1000 * (s[1] + d[0]) for d in dst] for s in src]
+        durations = [[None if v is None else v * 0.06 for v in row] for row in distances]
+        body = {"code": "Ok", "distances": distances, "durations": durations}
+        return httpx.Response(200, json=body, request=httpx.Request("GET", "http://osrm" + path))
+
+
+def test_blocks_are_stitched_back_in_place(monkeypatch):
+    fake = _FakeTable()
+    monkeypatch.setattr(routing_service.osrm_pool, "get", fake.get)
+    monkeypatch.setattr(routing_service, "OSRM_TABLE_MAX_COORDS", 6)
+    sources = [(float(i), 0.0) for i in range(7)]             # (lat, lon)
+    destinations = [(0.0, float(j)) for j in range(5)]
+
+    distance_km, duration_min = asyncio.run(routing_service.fetch_table_async(sources, destinations))
+    expected = np.add.outer(np.arange(7.0), np.arange(5.0))
+    expected[0] = np.nan
+    np.testing.assert_array_equal(distance_km, expected)
+    np.testing.assert_allclose(duration_min, expected, rtol=1e-12)
+    assert len(fake.coords_per_call) > 1 and max(fake.coords_per_call) <= 6
+
+
+def test_matrix_endpoint(monkeypatch):
+    geocoded = []
+
+    async def geocode_many(names):
+        geocoded.append(names)
+        return [(19.0 + len(name) / 100, 72.8) for name in names]
+
+    async def fetch_table(sources, destinations):
+        distance = np.array([[10.0, np.nan], [20.0, 30.0]])
+        return distance, distance * 1.5
+
+    monkeypatch.setattr(routes, "geocode_many", geocode_many)
+    monkeypatch.setattr(routes, "fetch_table_async", fetch_table)
+    body = {"sources": ["Thane", "Dadar"], "destinations": ["  thane ", "Worli"],
+            "travel_day": "Monday", "travel_time": "09:00", "weather": "Rain"}
+    response = TestClient(main.app).post("/predict-matrix", json=body)
+    assert response.status_code == 200
+    matrix = response.json()
+    assert geocoded == [["Thane", "Dadar", "Worli"]]          # one lookup per normalised name
+    assert matrix["distance_km"] == [[10.0, None], [20.0, 30.0]]
+    assert matrix["delay_min"][0][1] is None and matrix["total_time_min"][0][1] is None
+    delay = matrix["delay_min"][1][0]
+    assert matrix["total_time_min"][1][0] == round(30.0 + delay, 2)
+
+
+def test_matrix_rejects_a_bad_time():
+    body = {"sources": ["A"], "destinations": ["B"], "travel_day": "Monday", "travel_time": "noon", "weather": "Clear"}
+    assert TestClient(main.app).post("/predict-matrix", json=body).status_code == 400
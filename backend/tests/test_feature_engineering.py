@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from services.feature_engineering import (
+    FEATURE_NAMES,
+    build_feature_matrix,
+    build_feature_matrix_batch,
+    build_feature_matrix_columns,
+    build_features,
+    column_positions,
+    time_context,
+)
+
+_ROUTES = [{"distance_km": 12.5, "base_duration_min": 20.0}, {"distance_km": 30.0, "base_duration_min": 41.5}]
+
+
+@pytest.mark.parametrize("travel_time, travel_day", [("08:30", "Monday"), ("00:00", "sunday"), ("23:59", " Saturday ")])
+def test_matrix_matches_the_dataframe_path(travel_time, travel_day):
+    frame = build_features(_ROUTES, travel_time, travel_day, 2.0)
+    matrix = build_feature_matrix(_ROUTES, travel_time, travel_day, 2.0)
+    assert matrix.dtype == np.float64
+    np.testing.assert_array_equal(matrix, frame[list(FEATURE_NAMES)].to_numpy(dtype=np.float64))
+
+
+def test_columns_follow_the_model_order():
+    order = tuple(reversed(FEATURE_NAMES))
+    matrix = build_feature_matrix(_ROUTES, "08:00", "monday", 1.0, order)
+    reference = build_feature_matrix(_ROUTES, "08:00", "monday", 1.0)
+    np.testing.assert_array_equal(matrix, reference[:, ::-1])
+    with pytest.raises(ValueError):
+        column_positions(FEATURE_NAMES[:-1])
+
+
+def test_batch_and_column_builders_agree():
+    hour, weekend = time_context("17:00", "friday")
+    batch = build_feature_matrix_batch([(_ROUTES, hour, weekend, 1.0), (_ROUTES[:1], hour, weekend, 1.0)])
+    columns = build_feature_matrix_columns(
+        np.array([12.5, 30.0, 12.5]), np.array([20.0, 41.5, 20.0]), hour, weekend, 1.0,
+    )
+    np.testing.assert_array_equal(batch, columns)
+
+
+def test_bad_time_raises_value_error():
+    with pytest.raises(ValueError):
+        time_context("8x", "monday")
+
+
+def test_pandas_stays_off_the_import_path():
+    code = "import sys; import services.feature_engineering; print('pandas' in sys.modules)"
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=backend)
+    assert out.stdout.strip() == "False"
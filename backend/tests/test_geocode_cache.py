@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from services import geocoding_service
+from services.geocoding_service import _MISS, GeocodeCache, normalize_place_name
+
+
+def _cache(db_path=None):
+    return GeocodeCache(memory_size=100, ttl=60, negative_ttl=30, db_path=db_path)
+
+
+def test_normalize_place_name():
+    assert normalize_place_name("  Zürich   HB ") == normalize_place_name("zurich hb") == "zurich hb"
+
+
+def test_db_is_opened_on_first_use_not_construction(tmp_path):
+    path = tmp_path / "sub" / "geocode.sqlite"
+    cache = _cache(str(path))
+    assert not path.parent.exists()
+    assert cache.get("x") is _MISS
+    assert path.exists()
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "geocode.sqlite")
+    first = _cache(path)
+    first.set("berlin", (52.5, 13.4))
+    first.set("nowhere", None)
+
+    second = _cache(path)
+    assert second.get("berlin") == (52.5, 13.4)
+    assert second.get("nowhere") is None
+    stats = second.stats()
+    assert stats["disk_hits"] == 2 and stats["negative_hits"] == 1
+
+
+def test_expired_disk_rows_are_misses(tmp_path):
+    path = str(tmp_path / "geocode.sqlite")
+    _cache(path).set("old", (1.0, 2.0), ttl=-1)
+    assert _cache(path).get("old") is _MISS
+
+
+def test_unusable_path_degrades_to_memory_once(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = _cache(str(blocker / "geocode.sqlite"))       # parent is a file
+    cache.set("a", (1.0, 2.0))
+    assert cache.get("a") == (1.0, 2.0)
+    assert cache.get("b") is _MISS
+    stats = cache.stats()
+    assert stats["disk_enabled"] is False and stats["disk_errors"] == 1
+
+
+def test_async_variants_do_sqlite_work_off_the_loop(tmp_path, monkeypatch):
+    cache = _cache(str(tmp_path / "geocode.sqlite"))
+    threads = []
+    for name in ("_get_disk", "_set_disk"):
+        original = getattr(cache, name)
+
+        def spy(*args, _original=original):
+            threads.append(threading.current_thread() is threading.main_thread())
+            return _original(*args)
+
+        monkeypatch.setattr(cache, name, spy)
+
+    async def main():
+        await cache.set_async("k", (3.0, 4.0))
+        cache._memory.clear()
+        return await cache.get_async("k"), await cache.get_async("k")
+
+    assert asyncio.run(main()) == ((3.0, 4.0), (3.0, 4.0))
+    assert threads == [False, False]                       # the second read hit memory
+
+
+class _FakePhoton:
+    def __init__(self, features):
+        self.features = features
+        self.calls = 0
+
+    async def get(self, params=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"features": self.features}, request=httpx.Request("GET", "http://photon"))
+
+
+@pytest.fixture
+def photon(monkeypatch):
+    monkeypatch.setattr(geocoding_service, "_geocode_cache", _cache())
+    fake = _FakePhoton([{"geometry": {"coordinates": [13.4, 52.5]}}])
+    monkeypatch.setattr(geocoding_service.photon_pool, "get", fake.get)
+    return fake
+
+
+def test_concurrent_misses_share_one_request_then_hit_the_cache(photon):
+    geocode_async = geocoding_service.geocode_async
+
+    async def main():
+        first = await asyncio.gather(*(geocode_async(n) for n in ("Berlin", "berlin ", "BERLIN")))
+        return first, await geocode_async("Berlin")
+
+    first, again = asyncio.run(main())
+    assert first == [(52.5, 13.4)] * 3 and again == (52.5, 13.4)
+    assert photon.calls == 1
+
+
+def test_no_result_is_cached_as_a_400(photon):
+    photon.features = []
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(geocoding_service.geocode_async("Atlantis"))
+        assert exc.value.status_code == 400
+    assert photon.calls == 1
@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from services import geocoding_service
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    state = {"cancelled": [], "in_flight": 0, "peak": 0}
+
+    async def geocode(name):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            if name == "Bad":
+                await asyncio.sleep(0.01)
+                raise HTTPException(status_code=404, detail="Location 'Bad' not found")
+            await asyncio.sleep(0.2 if name.startswith("Slow") else 0.05)
+            return (float(len(name)), 0.0)
+        except asyncio.CancelledError:
+            state["cancelled"].append(name)
+            raise
+        finally:
+            state["in_flight"] -= 1
+
+    monkeypatch.setattr(geocoding_service, "geocode_async", geocode)
+    return state
+
+
+def test_lookups_run_concurrently_in_input_order(lookups):
+    started = time.perf_counter()
+    result = asyncio.run(geocoding_service.geocode_many(["Slow origin", "Pune", "Goa"]))
+    assert result == [(11.0, 0.0), (4.0, 0.0), (3.0, 0.0)]
+    assert lookups["peak"] == 3
+    assert time.perf_counter() - started < 0.35
+
+
+def test_first_failure_cancels_the_rest(lookups):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(geocoding_service.geocode_many(["Slow origin", "Bad"]))
+    assert exc.value.status_code == 404
+    assert lookups["cancelled"] == ["Slow origin"] and lookups["in_flight"] == 0
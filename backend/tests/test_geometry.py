@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from services.geometry import encode_polyline, prepare_geometry, simplify, zoom_tolerance_m
+
+
+def _reference_polyline(coords, precision):
+    """Straight transcription of the published algorithm, one value at a time."""
+    out, previous = [], (0, 0)
+    for lat, lon in coords:
+        point = (round(lat * 10 ** precision), round(lon * 10 ** precision))
+        for value in (point[0] - previous[0], point[1] - previous[1]):
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        previous = point
+    return "".join(out)
+
+
+def test_polyline_matches_the_published_example():
+    coords = np.array([[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]])
+    assert encode_polyline(coords, precision=5) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+def test_polyline_matches_reference_on_random_routes(precision):
+    rng = np.random.RandomState(precision)
+    coords = np.column_stack((rng.uniform(-89, 89, 300), rng.uniform(-179, 179, 300)))
+    coords[100:110] = coords[99]                        # zero deltas
+    assert encode_polyline(coords, precision) == _reference_polyline(coords, precision)
+    assert encode_polyline(np.zeros((0, 2))) == ""
+
+
+def test_simplify_drops_collinear_points_and_keeps_corners():
+    line = np.array([[0.0, 0.0], [0.0, 0.001], [0.0, 0.002], [0.001, 0.002], [0.002, 0.002]])
+    kept = simplify(line, tolerance_m=1.0)
+    np.testing.assert_array_equal(kept, line[[0, 2, 4]])
+
+
+def test_simplify_keeps_deviations_above_the_tolerance_only():
+    # The middle vertex sits ~11 m off the straight line between the ends
+    line = np.array([[0.0, 0.0], [0.0001, 0.005], [0.0, 0.01]])
+    assert len(simplify(line, tolerance_m=20.0)) == 2
+    assert len(simplify(line, tolerance_m=5.0)) == 3
+    assert simplify(line, tolerance_m=0) is line
+
+
+def test_simplify_handles_loops():
+    # Start and end coincide: distances are to the point, not a degenerate line
+    loop = np.array([[0.0, 0.0], [0.01, 0.0], [0.01, 0.01], [0.0, 0.01], [0.0, 0.0]])
+    kept = simplify(loop, tolerance_m=10.0)
+    assert len(kept) >= 4
+    np.testing.assert_array_equal(kept[[0, -1]], loop[[0, -1]])
+
+
+def test_zoom_tolerance_halves_per_level():
+    assert zoom_tolerance_m(11, 0.0) == pytest.approx(zoom_tolerance_m(10, 0.0) / 2)
+    assert zoom_tolerance_m(10, 60.0) == pytest.approx(zoom_tolerance_m(10, 0.0) / 2)
+
+
+def test_prepare_geometry_formats():
+    geometry = [[19.076, 72.8777], [19.033, 73.0169]]
+    coords, polyline = prepare_geometry(geometry)
+    assert coords == geometry and polyline is None
+    coords, polyline = prepare_geometry(geometry, "polyline")
+    assert coords is None and polyline == encode_polyline(np.array(geometry))
+    assert prepare_geometry(geometry, "none") == (None, None)
+    assert prepare_geometry([], "coordinates") == (None, None)
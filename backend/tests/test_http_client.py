@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services import http_client
+from services.metrics import UPSTREAM_REQUESTS
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Route the shared client through a handler instead of the network."""
+    state = {"active": {}, "peak": {}, "handler": None}
+
+    async def handle(request):
+        host = request.url.host
+        state["active"][host] = state["active"].get(host, 0) + 1
+        state["peak"][host] = max(state["peak"].get(host, 0), state["active"][host])
+        try:
+            return await state["handler"](request)
+        finally:
+            state["active"][host] -= 1
+
+    monkeypatch.setattr(
+        http_client, "_build_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handle)),
+    )
+    yield state
+    asyncio.run(http_client.close_http_client())
+
+
+def test_per_host_concurrency_is_capped(transport, monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_MAX_CONNECTIONS_PER_HOST", 2)
+
+    async def slow(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"ok": True})
+
+    transport["handler"] = slow
+
+    async def main():
+        urls = [f"http://{host}/x" for host in ("a", "b") for _ in range(6)]
+        return await asyncio.gather(*(http_client.get(url, upstream="test") for url in urls))
+
+    responses = asyncio.run(main())
+    assert all(r.status_code == 200 for r in responses)
+    assert transport["peak"] == {"a": 2, "b": 2}
+
+
+def test_outcomes_are_counted_per_upstream(transport):
+    async def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(503)
+
+    transport["handler"] = handler
+    before = dict(UPSTREAM_REQUESTS._values)
+
+    async def main():
+        await http_client.get("http://h/up", upstream="counted")
+        with pytest.raises(httpx.ConnectError):
+            await http_client.get("http://h/down", upstream="counted")
+
+    asyncio.run(main())
+    for status in ("503", "ConnectError"):
+        key = ("counted", status)
+        assert UPSTREAM_REQUESTS._values[key] == before.get(key, 0) + 1
+
+
+def test_client_is_shared_until_closed(transport):
+    async def main():
+        first = await http_client.open_http_client()
+        assert http_client.get_http_client() is first
+        await http_client.close_http_client()
+        assert first.is_closed
+        return http_client.get_http_client()
+
+    assert not asyncio.run(main()).is_closed
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.incident_store import IncidentStore, point_to_polyline_m
+
+
+def _store(max_active=100):
+    return IncidentStore(grid_deg=0.05, ttl=60, max_active=max_active)
+
+
+def _add(store, lat, lon, **kwargs):
+    return store.add(lat=lat, lon=lon, location="x", type="accident", severity="high", **kwargs)
+
+
+def test_bbox_query_is_inclusive_and_filters_exactly():
+    store = _store()
+    inside = _add(store, 52.0, 13.0)
+    edge = _add(store, 52.1, 13.1)
+    _add(store, 52.11, 13.0)                    # same grid cell row, just outside
+    found = store.in_bbox(51.9, 12.9, 52.1, 13.1)
+    assert [inc.id for inc in found] == [inside.id, edge.id]
+
+
+def test_expired_incidents_disappear_and_bump_revision():
+    store = _store()
+    _add(store, 52.0, 13.0, ttl=-1)             # already expired
+    revision = store.revision
+    assert len(store) == 0
+    assert store.in_bbox(51, 12, 53, 14) == []
+    _add(store, 52.0, 13.0)
+    assert store.revision == revision + 1
+
+
+def test_max_active_drops_soonest_expiring():
+    store = _store(max_active=2)
+    short = _add(store, 52.0, 13.0, ttl=10)
+    _add(store, 52.0, 13.0, ttl=100)
+    _add(store, 52.0, 13.0, ttl=50)
+    ids = {inc.id for inc in store.in_bbox(51, 12, 53, 14)}
+    assert len(ids) == 2 and short.id not in ids
+
+
+def test_point_to_polyline_distance():
+    # One degree of latitude is ~111.2 km; a point on the line is 0 m away
+    line = np.array([[0.0, 0.0], [0.0, 1.0]])
+    d = point_to_polyline_m(np.array([[1.0, 0.5], [0.0, 0.5]]), line)
+    assert d[0] == pytest.approx(111_195, rel=1e-3)
+    assert d[1] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_near_route_uses_the_radius():
+    store = _store()
+    near = _add(store, 52.001, 13.05)           # ~110 m off the route
+    _add(store, 52.02, 13.05)                   # ~2.2 km off
+    route = [[52.0, 13.0], [52.0, 13.1]]
+    assert [inc.id for inc in store.near_route(route, radius_m=200)] == [near.id]
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("bbox", [
+    "nan,0,1,1",
+    "0,0,inf,1",
+    "-inf,-inf,inf,inf",
+    "-181,0,0,1",
+    "0,-91,1,1",
+    "0,0,1,90.5",
+    "1,0,0,1",
+    "0,0,1",
+    "a,b,c,d",
+])
+def test_invalid_bbox_is_a_400(client, bbox):
+    assert client.get("/incidents", params={"bbox": bbox}).status_code == 400
+
+
+def test_reported_incident_is_listed(client):
+    body = {"location": "Harbour bridge", "type": "accident", "severity": "high", "lat": -33.852, "lon": 151.211}
+    reported = client.post("/report-incident", json=body).json()["incident"]
+    listed = client.get("/incidents", params={"bbox": "151.2,-33.86,151.22,-33.84"}).json()
+    assert reported["id"] in [inc["id"] for inc in listed["incidents"]]
+    assert client.get("/incidents", params={"bbox": "-180,-90,180,90"}).status_code == 200
@@ -0,0 +1,97 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from sklearn.ensemble import GradientBoostingRegressor
+
+from services import inference_executor, ml_service
+from services.feature_engineering import FEATURE_NAMES, build_feature_matrix
+from services.inference_executor import InferenceExecutor
+from services.metrics import MODEL_BATCH_ROWS
+from services.model_registry import ModelRegistry, export_version
+
+
+def _features(*distances):
+    routes = [{"distance_km": d, "base_duration_min": d * 1.5} for d in distances]
+    return build_feature_matrix(routes, "08:00", "monday", 0.0, ml_service.model_feature_names())
+
+
+def _rows_recorded() -> float:
+    return sum(total for _, total in MODEL_BATCH_ROWS._values.values())
+
+
+def _run(executor, coro):
+    async def main():
+        try:
+            return await coro()
+        finally:
+            executor.shutdown()
+    return asyncio.run(main())
+
+
+def test_concurrent_submissions_are_merged_and_split_back(monkeypatch):
+    calls = []
+    run_batch = inference_executor._run_batch
+
+    def spy(features, allow_surface, version):
+        calls.append(len(features))
+        return run_batch(features, allow_surface, version)
+
+    monkeypatch.setattr(inference_executor, "_run_batch", spy)
+    executor = InferenceExecutor("thread", workers=1, max_batch_rows=100, max_wait_ms=50)
+    matrices = [_features(5.0), _features(10.0, 20.0), _features(40.0), _features(60.0, 70.0, 80.0)]
+
+    results = _run(executor, lambda: asyncio.gather(*(executor.predict(m) for m in matrices)))
+    assert results == [ml_service.predict_delay(m) for m in matrices]
+    assert len(calls) < len(matrices) and sum(calls) == 7
+
+
+def test_a_bad_matrix_does_not_fail_its_neighbours():
+    executor = InferenceExecutor("thread", workers=1, max_batch_rows=100, max_wait_ms=50)
+    good, bad = _features(5.0), np.zeros((1, 3))
+
+    async def main():
+        return await asyncio.gather(
+            executor.predict(good), executor.predict(bad), executor.predict(good), return_exceptions=True,
+        )
+
+    first, failed, last = _run(executor, main)
+    assert first == last == ml_service.predict_delay(good)
+    assert isinstance(failed, HTTPException) and failed.status_code == 500
+
+
+def test_batch_rows_are_recorded_by_the_caller():
+    executor = InferenceExecutor("thread", workers=1, max_batch_rows=100, max_wait_ms=1)
+    before = _rows_recorded()
+    _run(executor, lambda: executor.predict(_features(5.0, 6.0)))
+    assert _rows_recorded() == before + 2
+
+
+def _constant_model(level):
+    X = pd.DataFrame(np.random.RandomState(0).uniform(0, 100, (200, len(FEATURE_NAMES))), columns=FEATURE_NAMES)
+    return GradientBoostingRegressor(n_estimators=5, random_state=0).fit(X, level + (X["distance_km"] > 50))
+
+
+def test_process_workers_follow_the_parent_and_report_metrics(tmp_path, monkeypatch):
+    versions = str(tmp_path / "versions")
+    export_version(_constant_model(10.0), versions, version="v1")
+    monkeypatch.setenv("MODEL_VERSIONS_DIR", versions)                  # read by spawned workers
+    registry = ModelRegistry(versions, fallback=ml_service._legacy_bundle, prepare=ml_service._prepare_bundle)
+    monkeypatch.setattr(ml_service, "_registry", registry)
+    executor = InferenceExecutor("process", workers=1, max_batch_rows=100, max_wait_ms=1)
+
+    async def main():
+        await executor.warm_up(1)
+        before = _rows_recorded()
+        first = await executor.predict(_features(5.0))
+        recorded = _rows_recorded() - before
+        export_version(_constant_model(42.0), versions, version="v2")
+        assert ml_service.refresh_models()                              # the parent's reload
+        return first, recorded, await executor.predict(_features(5.0))
+
+    first, recorded, second = _run(executor, main)
+    assert first == [pytest.approx(10.0, abs=0.5)]
+    assert recorded == 1                                                # worker's call, parent's histogram
+    assert second == [pytest.approx(42.0, abs=0.5)]                     # worker swapped with the parent
@@ -0,0 +1,72 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from services import metrics
+from services.timing import StageTimingMiddleware, server_timing, stage
+
+
+def test_counter_and_histogram_render_in_exposition_format():
+    requests = metrics.Counter("t_requests_total", "Requests.", labels=("path",))
+    requests.inc(path="/a")
+    requests.inc(2, path='/"b"')
+    assert requests.render() == [
+        "# HELP t_requests_total Requests.",
+        "# TYPE t_requests_total counter",
+        't_requests_total{path="/\\"b\\""} 2.0',
+        't_requests_total{path="/a"} 1.0',
+    ]
+
+    latency = metrics.Histogram("t_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    lines = latency.render()
+    assert 't_seconds_bucket{le="0.1"} 2' in lines           # bounds are inclusive
+    assert 't_seconds_bucket{le="1.0"} 3' in lines
+    assert 't_seconds_bucket{le="+Inf"} 4' in lines
+    assert "t_seconds_sum 3.65" in lines and "t_seconds_count 4" in lines
+
+
+def test_registered_caches_are_exported():
+    metrics.register_cache("t_cache", lambda: {"hits": 3, "misses": 1, "evictions": 0, "entries": 2})
+    try:
+        text = metrics.render()
+    finally:
+        del metrics._caches["t_cache"]
+    assert 'traffic_cache_hits_total{cache="t_cache"} 3' in text
+    assert 'traffic_cache_hit_ratio{cache="t_cache"} 0.75' in text
+
+
+def test_stages_accumulate_per_request():
+    async def app(scope, receive, send):
+        with stage("t_stage"):
+            await asyncio.sleep(0.002)
+        with stage("t_stage"):
+            pass
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/x"}
+    asyncio.run(StageTimingMiddleware(app)(scope, None, send))
+    headers = dict(sent[0]["headers"])
+    timing = headers[b"server-timing"].decode()
+    assert timing.startswith("t_stage;dur=") and ", total;dur=" in timing
+    assert 'path="unmatched"' in "\n".join(metrics.REQUEST_DURATION.render())
+
+
+def test_server_timing_format():
+    assert server_timing({"geocode": 52.14, "osrm": 80.0}) == "geocode;dur=52.1, osrm;dur=80.0"
+
+
+def test_metrics_endpoint():
+    client = TestClient(main.app)
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'traffic_http_request_duration_seconds_count{method="GET",path="/health",status="200"}' in response.text
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor
+
+from services.feature_engineering import FEATURE_NAMES
+from services.model_registry import ModelBundle, ModelRegistry, export_version, list_versions
+
+
+def _model(level=10.0, columns=FEATURE_NAMES):
+    X = pd.DataFrame(np.random.RandomState(0).uniform(0, 100, (200, len(columns))), columns=list(columns))
+    return GradientBoostingRegressor(n_estimators=5, random_state=0).fit(X, level + (X["distance_km"] > 50))
+
+
+def _fallback():
+    return ModelBundle(version="pkl-test", source="pickle", feature_names=FEATURE_NAMES, sklearn=_model())
+
+
+def _registry(versions_dir, **kwargs):
+    return ModelRegistry(str(versions_dir), fallback=_fallback, prepare=lambda bundle: None, **kwargs)
+
+
+def test_follow_moves_to_exactly_the_given_version(tmp_path):
+    export_version(_model(10.0), str(tmp_path), version="v1")
+    export_version(_model(20.0), str(tmp_path), version="v2")
+    registry = _registry(tmp_path)
+    assert registry.follow("v1")
+    assert registry.active.version == "v1"              # not the newest: the parent's choice
+    assert not registry.follow("v1")
+    assert registry.follow("v2") and registry.active.version == "v2"
+
+
+def test_follow_keeps_the_current_bundle_for_unknown_versions(tmp_path):
+    registry = _registry(tmp_path)
+    assert registry.follow("pkl-other")                  # nothing loaded yet: the fallback
+    assert registry.active.version == "pkl-test"
+    export_version(_model(), str(tmp_path), version="v1")
+    assert registry.follow("v1")
+    assert not registry.follow("pkl-test")              # the parent's fallback isn't on disk
+    assert registry.active.version == "v1"
+
+
+def test_refresh_hot_swaps_to_the_newest_valid_version(tmp_path):
+    registry = _registry(tmp_path)
+    assert registry.active.version == "pkl-test"             # nothing exported yet
+    old = registry.active
+
+    export_version(_model(10.0), str(tmp_path), version="20260101T000000Z")
+    export_version(_model(30.0), str(tmp_path), version="20260201T000000Z")
+    assert registry.refresh()
+    assert registry.active.version == "20260201T000000Z"
+    assert registry.active.source == "mmap"
+    assert not registry.refresh()                           # nothing newer
+
+    # A request that captured the old bundle keeps using it
+    X = np.zeros((1, len(FEATURE_NAMES)))
+    assert abs(old.predict_raw(X)[0] - 10) < 1 and abs(registry.active.predict_raw(X)[0] - 30) < 1
+
+
+def test_versions_are_ordered_by_export_time_not_name(tmp_path):
+    registry = _registry(tmp_path)
+    export_version(_model(10.0), str(tmp_path), version="v2")
+    assert registry.refresh() and registry.active.version == "v2"
+    later = export_version(_model(20.0), str(tmp_path))       # default timestamp name sorts before "v2"
+    assert list_versions(str(tmp_path)) == ["v2", later]
+    assert registry.refresh() and registry.active.version == later
+
+
+def test_corrupt_and_reordered_versions_are_rejected(tmp_path):
+    export_version(_model(10.0), str(tmp_path), version="v1")
+    registry = _registry(tmp_path)
+    assert registry.active.version == "v1"
+
+    export_version(_model(20.0), str(tmp_path), version="v2")
+    value = tmp_path / "v2" / "value.npy"
+    np.save(value, np.load(value)[:-1])                     # truncated array
+    export_version(_model(20.0, columns=FEATURE_NAMES[::-1]), str(tmp_path), version="v3")
+
+    assert not registry.refresh()
+    assert registry.active.version == "v1"
+    assert set(registry.rejected) == {"v2", "v3"}
+    assert "column order" in registry.rejected["v3"]
+    assert not registry.refresh()                           # rejections are remembered
+
+
+def test_prepare_failure_rejects_the_version(tmp_path):
+    def prepare(bundle):
+        if bundle.version == "bad":
+            raise ValueError("warm-up failed")
+
+    export_version(_model(), str(tmp_path), version="a")
+    registry = ModelRegistry(str(tmp_path), fallback=_fallback, prepare=prepare)
+    assert registry.active.version == "a"
+    export_version(_model(), str(tmp_path), version="bad")
+    assert not registry.refresh()
+    assert registry.status()["rejected"] == {"bad": "warm-up failed"}
+
+
+def test_pinned_version_is_kept(tmp_path):
+    export_version(_model(), str(tmp_path), version="a")
+    export_version(_model(), str(tmp_path), version="b")
+    assert _registry(tmp_path, pinned="a").active.version == "a"
+
+
+def test_incomplete_versions_are_invisible(tmp_path):
+    export_version(_model(), str(tmp_path), version="a")
+    (tmp_path / "b").mkdir()                                # no meta.json yet
+    (tmp_path / ".c.tmp").mkdir()
+    assert list_versions(str(tmp_path)) == ["a"]
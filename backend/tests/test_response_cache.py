@@ -0,0 +1,90 @@
+import pytest
+
+from services import response_cache
+
+_ITEM = {"source": "Cache town", "destination": "Other town", "travel_day": "Monday", "travel_time": "08:00", "weather": "Clear"}
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+])
+def test_etag_matching(header, expected):
+    assert response_cache.etag_matches(header, '"abc"') is expected
+
+
+def test_wildcard_only_matches_safe_methods():
+    assert response_cache.etag_matches("*", '"abc"', safe_method=False) is False
+    assert response_cache.etag_matches('"abc"', '"abc"', safe_method=False) is True
+
+
+def test_etag_is_a_digest_of_the_body():
+    assert response_cache.strong_etag(b"a") == response_cache.strong_etag(b"a")
+    assert response_cache.strong_etag(b"a") != response_cache.strong_etag(b"b")
+
+
+def test_slot_remaining_counts_down_to_the_boundary(monkeypatch):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_SLOT_SEC", 900)
+    assert response_cache.slot_remaining(now=9000.0) == 900
+    assert response_cache.slot_remaining(now=9000.0 + 600) == 300
+    assert response_cache.slot_remaining(now=9000.0 + 899.7) == 1
+
+
+def test_disabled_cache_neither_stores_nor_divides_by_zero(monkeypatch):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_SLOT_SEC", 0)
+    response_cache._responses.clear()
+    assert response_cache.slot_remaining() == 0
+    entry = response_cache.store("k", b"body", "application/json")
+    assert entry.etag == response_cache.strong_etag(b"body")
+    assert response_cache.lookup("k") is None
+
+
+def test_conditional_get_returns_304_without_recomputing(client):
+    first = client.get("/predict-route", params=_ITEM)
+    assert first.status_code == 200
+    assert first.headers["cache-control"].startswith("public, max-age=")
+    etag = first.headers["etag"]
+
+    second = client.get("/predict-route", params=_ITEM, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert second.content == b""
+    assert len(client.resolve_calls) == 1
+
+
+def test_post_is_revalidated_only(client):
+    response = client.post("/predict-route", json=_ITEM)
+    assert response.headers["cache-control"] == "private, no-cache"
+    again = client.post("/predict-route", json=_ITEM, headers={"If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
+    wildcard = client.post("/predict-route", json=_ITEM, headers={"If-None-Match": "*"})
+    assert wildcard.status_code == 200 and wildcard.content == response.content
+
+
+def test_entries_expire_at_the_slot_boundary(monkeypatch):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_SLOT_SEC", 900)
+    response_cache._responses.clear()
+    clock = {"wall": 9000.0 + 898.0, "mono": 100.0}
+    monkeypatch.setattr(response_cache.time, "time", lambda: clock["wall"])
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: clock["mono"])
+
+    entry = response_cache.store("k", b"body", "application/json")
+    clock["mono"] += 1.5
+    assert response_cache.lookup("k") is entry
+    clock["mono"] += 1.0                        # past the boundary two seconds out
+    assert response_cache.lookup("k") is None
+    response_cache._responses.clear()
+
+
+def test_disabled_cache_serves_no_cache(client, monkeypatch):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_SLOT_SEC", 0)
+    first = client.get("/predict-route", params=_ITEM)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-cache, max-age=0"
+    # Still a valid validator, but every request runs the pipeline
+    assert client.get("/predict-route", params=_ITEM, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    assert len(client.resolve_calls) == 2
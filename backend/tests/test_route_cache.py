@@ -0,0 +1,96 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from services import routing_service
+from services.cache import TTLCache
+
+_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks", "fixtures", "osrm_route.json")
+
+
+def test_ttl_cache_evicts_least_recently_used_by_weight():
+    cache = TTLCache(max_weight=10, default_ttl=60, weigh=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "xxxx")
+    assert cache.get("a") == "xxxx"             # "b" is now least recently used
+    cache.set("c", "xxxx")
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+    cache.set("huge", "x" * 11)                 # heavier than the whole cache: not stored
+    assert cache.get("huge") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_entries_expire():
+    cache = TTLCache(max_weight=10, default_ttl=60)
+    cache.set("gone", 1, ttl=-1)
+    cache.set("kept", 2)
+    assert cache.get("gone") is None and cache.get("kept") == 2
+    assert len(cache) == 1
+
+
+def test_nearby_pairs_share_a_key():
+    key = routing_service._route_cache_key
+    assert key(19.07601, 72.87771, 18.52041, 73.85671, 3) == key(19.07597, 72.87768, 18.52039, 73.85668, 3)
+    assert key(19.076, 72.877, 18.520, 73.856, 3) != key(19.078, 72.877, 18.520, 73.856, 3)
+    assert key(19.076, 72.877, 18.520, 73.856, 3) != key(19.076, 72.877, 18.520, 73.856, 2)
+
+
+class _FakeOsrm:
+    def __init__(self):
+        with open(_FIXTURE) as f:
+            self.body = json.load(f)
+        self.status = 200
+        self.calls = 0
+
+    async def get(self, path, params=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(self.status, json=self.body, request=httpx.Request("GET", "http://osrm" + path))
+
+
+@pytest.fixture
+def osrm(monkeypatch):
+    fake = _FakeOsrm()
+    monkeypatch.setattr(routing_service.osrm_pool, "get", fake.get)
+    routing_service._route_cache.clear()
+    yield fake
+    routing_service._route_cache.clear()
+
+
+def _fetch(*coords, max_routes=3):
+    return routing_service.fetch_routes_async(*coords, max_routes=max_routes)
+
+
+def test_routes_are_parsed_cached_and_coalesced(osrm):
+    async def main():
+        first = await asyncio.gather(*(_fetch(19.076, 72.8777, 18.5204, 73.8567) for _ in range(3)))
+        return first, await _fetch(19.07601, 72.87771, 18.5204, 73.8567)
+
+    first, nearby = asyncio.run(main())
+    assert osrm.calls == 1
+    assert first[0] is first[1] is nearby
+    route = first[0][0]
+    assert route["route_name"] == "Mumbai-Pune Expressway"
+    assert (route["distance_km"], route["base_duration_min"]) == (148.9, 177.37)
+    assert route["geometry"][0] == [19.076, 72.8777]           # flipped to [lat, lon]
+    assert routing_service.cached_routes(19.076, 72.8777, 18.5204, 73.8567) is first[0]
+
+
+def test_upstream_failure_is_a_502_and_not_cached(osrm):
+    osrm.status = 503
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(_fetch(1.0, 2.0, 3.0, 4.0))
+        assert exc.value.status_code == 502
+    assert osrm.calls == 2
+
+
+def test_no_route_is_a_400(osrm):
+    osrm.body = {"code": "NoRoute", "routes": []}
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(_fetch(1.0, 2.0, 3.0, 4.0))
+    assert exc.value.status_code == 400
@@ -0,0 +1,99 @@
+import json
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+import score_trips
+
+_PLACES = ["Andheri", "Bandra", "Colaba", "Dadar", "Thane", "Nowhere"]
+
+
+@pytest.fixture
+def trips(tmp_path, monkeypatch):
+    lookups = {"geocode": 0, "route": 0}
+
+    async def geocode(name):
+        lookups["geocode"] += 1
+        if name == "Nowhere":
+            raise HTTPException(status_code=404, detail=f"Location '{name}' not found")
+        index = _PLACES.index(name)
+        return (19.0 + index / 100, 72.8 + index / 50)
+
+    async def fetch_routes(src_lat, src_lon, dst_lat, dst_lon, max_routes):
+        lookups["route"] += 1
+        km = 100 * (abs(dst_lat - src_lat) + abs(dst_lon - src_lon)) + 1
+        return [{"route_name": "Via A", "distance_km": km, "base_duration_min": 2 * km, "geometry": []},
+                {"route_name": "Via B", "distance_km": km + 3, "base_duration_min": 2 * km + 1, "geometry": []}]
+
+    monkeypatch.setattr(score_trips, "geocode_async", geocode)
+    monkeypatch.setattr(score_trips, "fetch_routes_async", fetch_routes)
+    rows = [
+        {"trip_id": str(n), "source": _PLACES[n % 6], "destination": _PLACES[(n * 7 + 1) % 5],
+         "travel_day": ("Monday", "Saturday")[n % 2], "travel_time": f"{n % 24:02d}:30",
+         "weather": ("Clear", "Rain", "Fog")[n % 3]}
+        for n in range(23)
+    ]
+    rows[4]["travel_time"] = "noon"
+    path = tmp_path / "trips.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path, lookups
+
+
+def _run(tmp_path, name, *extra):
+    score_trips.main([str(tmp_path / "trips.csv"), str(tmp_path / name), "--chunk-size", "5", *extra])
+    return (tmp_path / name).read_bytes()
+
+
+def test_rows_are_scored_and_lookups_deduplicated(trips, tmp_path, capsys):
+    _, lookups = trips
+    _run(tmp_path, "scored.csv")
+    scored = pd.read_csv(tmp_path / "scored.csv", dtype=str, keep_default_na=False)
+    summary = json.loads(capsys.readouterr().out)
+
+    assert len(scored) == 23 and scored["trip_id"].tolist() == [str(n) for n in range(23)]
+    assert scored.loc[4, "error"] == "invalid travel_time 'noon'"
+    assert scored.loc[5, "error"] == "geocode: Location 'Nowhere' not found"
+    ok = scored[scored["error"] == ""]
+    assert set(ok["route_name"]) <= {"Via A", "Via B"} and (ok["n_routes"] == "2").all()
+    total = ok["base_time_min"].astype(float) + ok["delay_min"].astype(float)
+    assert (total.round(2) - ok["total_time_min"].astype(float)).abs().max() < 0.011
+    assert summary["failed"] == 1 + (scored["source"] == "Nowhere").sum()
+    # Each place (the unknown one included) and each pair is looked up once
+    assert lookups["geocode"] == summary["geocode_lookups"] == 6
+    assert lookups["route"] == summary["route_lookups"]
+
+
+def test_interrupted_run_resumes_to_identical_output(trips, tmp_path, monkeypatch):
+    expected = _run(tmp_path, "clean.csv")
+
+    score = score_trips.TripScorer.score
+    calls = []
+
+    async def interrupted(self, frame):
+        calls.append(len(frame))
+        if len(calls) == 3:
+            raise RuntimeError("killed")
+        return await score(self, frame)
+
+    monkeypatch.setattr(score_trips.TripScorer, "score", interrupted)
+    with pytest.raises(RuntimeError):
+        _run(tmp_path, "scored.csv")
+    checkpoint = json.loads((tmp_path / "scored.csv.checkpoint.json").read_text())
+    assert checkpoint["chunks_done"] == 2 and checkpoint["rows_done"] == 10
+    # A chunk half-written when the process died is cut off on resume
+    with open(tmp_path / "scored.csv", "a") as f:
+        f.write("10,Andheri,Bandra,partial")
+
+    monkeypatch.setattr(score_trips.TripScorer, "score", score)
+    with pytest.raises(SystemExit):
+        _run(tmp_path, "scored.csv")                  # exists, and neither --force nor --resume
+    assert _run(tmp_path, "scored.csv", "--resume") == expected
+
+
+def test_resume_refuses_a_changed_input(trips, tmp_path):
+    _run(tmp_path, "scored.csv")
+    with open(tmp_path / "trips.csv", "a") as f:
+        f.write("99,Andheri,Bandra,Monday,08:00,Clear\n")
+    with pytest.raises(SystemExit, match="changed since checkpoint"):
+        _run(tmp_path, "scored.csv", "--resume")
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from api import routes
+from services import routing_service
+from services.geometry import haversine_m, split_segments
+
+# ~111 m per step along the equator
+_LINE = np.column_stack((np.zeros(21), np.arange(21) * 0.001))
+
+
+def test_haversine_edge_lengths():
+    np.testing.assert_allclose(haversine_m(np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]])),
+                               [111_195.0, 111_178.1], rtol=1e-4)
+
+
+def test_segments_are_contiguous_vertex_ranges():
+    bounds, lengths_m = split_segments(_LINE, 500.0)
+    assert bounds[0, 0] == 0 and bounds[-1, 1] == len(_LINE) - 1
+    assert (bounds[1:, 0] == bounds[:-1, 1]).all()
+    assert len(bounds) == 5                             # 2.2 km in 500 m pieces
+    # Each cut is the first vertex at or past a multiple of the length
+    cumulative = np.concatenate(([0.0], np.cumsum(haversine_m(_LINE))))
+    cuts = bounds[1:, 0]
+    assert (cumulative[cuts] >= 500.0 * np.arange(1, 5)).all()
+    assert (cumulative[cuts - 1] < 500.0 * np.arange(1, 5)).all()
+    assert lengths_m.sum() == pytest.approx(haversine_m(_LINE).sum())
+    assert split_segments(_LINE[:1], 500.0)[0].shape == (0, 2)
+
+
+def _profile():
+    bounds, lengths_m = split_segments(_LINE, 500.0)
+    return {"coords": _LINE, "bounds": bounds, "share": lengths_m / lengths_m.sum()}
+
+
+def test_model_delay_is_split_by_length_times_score():
+    profile = _profile()
+    segments = routes._segment_results(profile, [1.0, 3.0, -2.0, 0.0, 0.0], 8.0, [], 0.0, 2.2)
+    weights = profile["share"] * [1.0, 3.0, 0.0, 0.0, 0.0]
+    assert [s["delay_min"] for s in segments] == pytest.approx(list(8.0 * weights / weights.sum()), abs=0.01)
+    assert sum(s["distance_km"] for s in segments) == pytest.approx(2.2, abs=1e-3)
+    # Equal scores (or none usable): the delay follows the segments' lengths
+    for scores in ([0.0] * 5, [4.0] * 5):
+        even = routes._segment_results(profile, scores, 8.0, [], 0.0, 2.2)
+        assert [s["delay_min"] for s in even] == pytest.approx(list(8.0 * profile["share"]), abs=0.01)
+        assert len({s["congestion"] for s in even}) == 1
+
+
+def test_incident_delay_lands_on_the_nearest_segment():
+    incident = SimpleNamespace(lat=0.0001, lon=0.0195, severity="High")
+    profile = _profile()
+    segments = routes._segment_results(profile, [1.0] * 5, 5.0, [incident], 10.0, 2.2)
+    expected = 5.0 * profile["share"] + [0.0, 0.0, 0.0, 0.0, 10.0]
+    assert [s["delay_min"] for s in segments] == pytest.approx(list(expected), abs=0.01)
+
+
+def test_osrm_edge_annotations_are_kept():
+    leg = {"summary": "A1", "annotation": {"distance": [100.0, 250.0], "duration": [10.0, 30.0]}}
+    data = {"code": "Ok", "routes": [
+        {"distance": 350.0, "duration": 40.0, "legs": [leg],
+         "geometry": {"coordinates": [[13.0, 52.0], [13.001, 52.0], [13.004, 52.0]]}},
+        # Annotation that does not match the geometry: dropped
+        {"distance": 350.0, "duration": 40.0, "legs": [leg],
+         "geometry": {"coordinates": [[13.0, 52.0], [13.004, 52.0]]}},
+    ]}
+    parsed = routing_service._parse_osrm_response(data, 52.0, 13.0, 52.0, 13.004, max_routes=2)
+    assert (parsed[0]["edge_distance_m"], parsed[0]["edge_duration_s"]) == ([100.0, 250.0], [10.0, 30.0])
+    assert "edge_distance_m" not in parsed[1]
+
+
+def _segments(client, stub_routes, route, segment_length_m):
+    stub_routes[:] = [route]
+    payload = {"source": "Segment A", "destination": "Segment B", "travel_day": "Friday",
+               "travel_time": "18:00", "weather": "Rain", "segment_profile": True,
+               "segment_length_m": segment_length_m}
+    response = client.post("/predict-route?format=compact", json=payload)
+    assert response.status_code == 200
+    return response.json()["routes"][0]
+
+
+def test_prediction_carries_segment_profiles(client, stub_routes):
+    route = _segments(client, stub_routes, {"route_name": "Coast road", "distance_km": 2.2, "base_duration_min": 6.0,
+                       "geometry": _LINE.tolist()}, 500)
+    segments = route["segments"]
+    assert len(segments) == 5 and segments[-1]["end"] == len(route["geometry"]) - 1
+    assert sum(s["delay_min"] for s in segments) == pytest.approx(route["delay_min"], abs=0.03)
+    # No annotations: one average pace, so one delay per km and one level
+    per_km = [s["delay_min"] / s["distance_km"] for s in segments]
+    assert max(per_km) - min(per_km) < 0.1
+    assert len({s["congestion"] for s in segments}) == 1
+
+
+def test_slow_edges_carry_more_delay_per_km(client, stub_routes):
+    # 30 km in 1.5 km edges: the first half at 1 min/km, the second at 3 min/km
+    seconds = [90.0] * 10 + [270.0] * 10
+    route = _segments(client, stub_routes, {"route_name": "Ghat road", "distance_km": 30.0, "base_duration_min": sum(seconds) / 60,
+                       "geometry": _LINE.tolist(), "edge_distance_m": [1500.0] * 20, "edge_duration_s": seconds}, 3000)
+    segments = route["segments"]
+    assert len(segments) == 10
+    assert [s["distance_km"] for s in segments] == pytest.approx([3.0] * 10, abs=1e-3)
+    per_km = [s["delay_min"] / s["distance_km"] for s in segments]
+    assert max(per_km[:5]) - min(per_km[:5]) < 0.01 and max(per_km[5:]) - min(per_km[5:]) < 0.01
+    assert per_km[5] > per_km[0]
+    assert len({s["congestion"] for s in segments[:5]}) == len({s["congestion"] for s in segments[5:]}) == 1
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from services.deadline import DeadlineExceeded, deadline_scope
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"value": calls}
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+        return results
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert all(r is results[0] for r in results)
+    assert len(flight) == 0                     # nothing kept after completion
+
+
+def test_distinct_keys_run_separately():
+    flight = SingleFlight("test")
+
+    async def main():
+        return await asyncio.gather(flight.do("a", lambda: _value("a")), flight.do("b", lambda: _value("b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+
+
+async def _value(v):
+    await asyncio.sleep(0)
+    return v
+
+
+def test_exception_reaches_every_caller():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    flight = SingleFlight("test")
+
+    async def main():
+        done = asyncio.Event()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            done.set()
+            return 42
+
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        result = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return result, done.is_set()
+
+    assert asyncio.run(main()) == (42, True)
+
+
+def test_follower_with_time_left_retries_after_leader_deadline():
+    flight = SingleFlight("test")
+    runs = []
+
+    async def main():
+        async def work():
+            runs.append(1)
+            if len(runs) == 1:
+                await asyncio.sleep(0.01)
+                raise DeadlineExceeded("osrm")  # the leader's budget ran out
+            return "fresh"
+
+        async def leader():
+            with deadline_scope(0.005):
+                return await flight.do("k", work)
+
+        async def follower():
+            await asyncio.sleep(0.001)
+            with deadline_scope(1.0):
+                return await flight.do("k", work)
+
+        return await asyncio.gather(leader(), follower(), return_exceptions=True)
+
+    leader_result, follower_result = asyncio.run(main())
+    assert isinstance(leader_result, DeadlineExceeded)
+    assert follower_result == "fresh"
+    assert len(runs) == 2
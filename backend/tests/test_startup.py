@@ -0,0 +1,44 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from services import ml_service
+
+
+def test_preload_report():
+    report = ml_service.preload_models()
+    assert report["model_version"] == ml_service.model_version()
+    assert report["predictor"] in ("compiled", "sklearn")
+    assert report["weather_encoder"] == "ok" or report["weather_encoder"].startswith("unavailable: ")
+    assert report["model_load_ms"] >= 0 and report["weather_encoder_load_ms"] >= 0
+
+
+@pytest.fixture
+def startup(monkeypatch):
+    monkeypatch.setattr(main, "PRELOAD_MODELS", True)
+    monkeypatch.setattr(main, "get_inference_executor", lambda: None)
+    monkeypatch.setattr(main, "_startup", {"ready": False, "import_ms": 1.0})
+    return main._startup
+
+
+def test_ready_after_preload(startup):
+    assert TestClient(main.app).get("/ready").status_code == 503     # lifespan not run yet
+    with TestClient(main.app) as client:
+        response = client.get("/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready" and body["model_version"] == ml_service.model_version()
+    assert "model" in body and set(body["upstreams"]) == {"photon", "osrm"}
+
+
+def test_failed_preload_keeps_the_process_up_but_not_ready(startup, monkeypatch):
+    def broken():
+        raise HTTPException(status_code=500, detail="model artefact missing")
+
+    monkeypatch.setattr(main, "preload_models", broken)
+    with TestClient(main.app) as client:
+        assert client.get("/health").status_code == 200
+        response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["error"] == "model artefact missing"
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import orjson
+
+from services.streaming import encode_event, stream_events
+
+
+def _decode(chunks):
+    return [orjson.loads(chunk) for chunk in chunks]
+
+
+def _run_watched(main, timeout=2.0):
+    """asyncio.run(main()) in a daemon thread, so a hang fails the test instead of the run."""
+    outcome = {}
+    worker = threading.Thread(target=lambda: outcome.update(result=asyncio.run(main())), daemon=True)
+    worker.start()
+    worker.join(timeout)
+    assert not worker.is_alive(), "stream did not shut down"
+    return outcome["result"]
+
+
+def test_events_arrive_in_order_with_sequence_numbers():
+    async def produce(emit):
+        for i in range(5):
+            await emit("item", {"index": i})
+
+    async def main():
+        return [chunk async for chunk in stream_events(produce, "ndjson", queue_size=2)]
+
+    events = _decode(asyncio.run(main()))
+    assert [e["seq"] for e in events] == [0, 1, 2, 3, 4]
+    assert [e["index"] for e in events] == [0, 1, 2, 3, 4]
+
+
+def test_producer_failure_becomes_final_error_event():
+    async def produce(emit):
+        await emit("item", {"index": 0})
+        raise RuntimeError("broken")
+
+    async def main():
+        return [chunk async for chunk in stream_events(produce, "ndjson", queue_size=2)]
+
+    events = _decode(asyncio.run(main()))
+    assert events[-1]["event"] == "error"
+    assert events[-1]["status_code"] == 500
+    assert events[-1]["error"] == "broken"
+
+
+def test_backpressure_bounds_events_produced_ahead_of_the_client():
+    produced = []
+
+    async def produce(emit):
+        for i in range(100):
+            produced.append(i)
+            await emit("item", {"index": i})
+
+    async def main():
+        stream = stream_events(produce, "ndjson", queue_size=2)
+        await stream.__anext__()
+        await asyncio.sleep(0.01)
+        ahead = len(produced)
+        await stream.aclose()
+        return ahead
+
+    assert _run_watched(main) <= 4
+
+
+def test_client_disconnect_with_full_queue_does_not_hang():
+    async def main():
+        stopped = asyncio.Event()
+
+        async def produce(emit):
+            try:
+                for i in range(100):
+                    await emit("item", {"index": i})
+            finally:
+                stopped.set()
+
+        stream = stream_events(produce, "ndjson", queue_size=2)
+        await stream.__anext__()
+        await asyncio.sleep(0.01)             # producer fills the queue and blocks
+        await stream.aclose()
+        return stopped.is_set()
+
+    assert _run_watched(main) is True
+
+
+def test_sse_encoding():
+    assert encode_event("sse", "item", 3, {"a": 1}) == b'event: item\nid: 3\ndata: {"a":1}\n\n'
@@ -0,0 +1,61 @@
+import numpy as np
+import orjson
+import pytest
+
+from api import routes
+from services import ml_service
+from services.feature_engineering import build_feature_matrix
+
+_SWEEP = {"source": "A town", "destination": "B town", "weather": "Fog", "days": ["Monday", "saturday"],
+          "slot_minutes": 30}
+
+
+@pytest.fixture
+def client(client, exact_model):
+    return client
+
+
+def test_best_window_widens_over_near_optimal_slots():
+    totals = np.array([[30.0, 25.0, 21.0, 20.0, 21.5, 26.0],
+                       [19.5, 30.0, 30.0, 30.0, 30.0, 30.0]])
+    window = routes._best_window(totals, ["monday", "tuesday"], 30)
+    assert (window.day, window.best_time, window.predicted_time_min) == ("tuesday", "00:00", 19.5)
+    assert (window.window_start, window.window_end) == ("00:00", "00:30")
+    window = routes._best_window(totals[:1], ["monday"], 30)
+    assert (window.best_time, window.window_start, window.window_end) == ("01:30", "01:00", "02:30")
+
+
+def test_grid_matches_single_predictions(client, stub_routes):
+    response = client.post("/predict-route/sweep", json=_SWEEP)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["days"] == ["monday", "saturday"] and len(body["slots"]) == 48 and body["slots"][-1] == "23:30"
+
+    severity = ml_service.encode_weather("Fog")
+    for route, result in zip(stub_routes, body["routes"]):
+        grid = np.array(result["delay_grid"])
+        assert grid.shape == (2, 48)
+        np.testing.assert_array_equal(grid[:, 0::2], grid[:, 1::2])      # half-hours repeat their hour
+        for d, day in enumerate(("Monday", "Saturday")):
+            for hour in (0, 8, 17):
+                features = build_feature_matrix([route], f"{hour:02d}:00", day, severity,
+                                                ml_service.model_feature_names())
+                assert grid[d, 2 * hour] == pytest.approx(ml_service.predict_delay(features)[0], abs=0.01)
+    best = min(body["routes"], key=lambda r: r["best"]["predicted_time_min"])
+    assert body["best_route"] == best["route"] and body["best"] == best["best"]
+
+
+def test_streamed_sweep_matches_the_plain_one(client):
+    plain = client.post("/predict-route/sweep", json=_SWEEP).json()
+    response = client.post("/predict-route/sweep?stream=ndjson", json=_SWEEP)
+    events = [orjson.loads(line) for line in response.text.splitlines()]
+    assert [e["event"] for e in events] == ["meta", "route", "route", "end"]
+    assert events[0]["slots"] == plain["slots"]
+    streamed = [{k: v for k, v in e.items() if k in plain["routes"][0]} for e in events[1:3]]
+    assert streamed == plain["routes"]
+    assert events[-1]["best"] == plain["best"]
+
+
+@pytest.mark.parametrize("change", [{"slot_minutes": 7}, {"days": ["Funday"]}])
+def test_bad_sweeps_are_rejected(client, change):
+    assert client.post("/predict-route/sweep", json={**_SWEEP, **change}).status_code == 400
@@ -0,0 +1,143 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services import upstream_pool
+from services.upstream_pool import CLOSED, HALF_OPEN, OPEN, NoBackendAvailable, UpstreamPool
+
+
+class _FakeUpstream:
+    """Stands in for http_client.get: per-URL delay and status (or transport error)."""
+
+    def __init__(self, **behaviour):
+        self.behaviour = behaviour          # host → (delay_sec, status | None)
+        self.calls = []
+
+    async def get(self, url, params=None, timeout=None, upstream=None):
+        host = httpx.URL(url).host
+        self.calls.append(host)
+        delay, status = self.behaviour[host]
+        await asyncio.sleep(delay)
+        if status is None:
+            raise httpx.ConnectError(f"{host} unreachable")
+        return httpx.Response(status, request=httpx.Request("GET", url))
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    upstream = _FakeUpstream()
+    monkeypatch.setattr(upstream_pool.http_client, "get", upstream.get)
+    return upstream
+
+
+def _pool(*hosts, **kwargs):
+    kwargs.setdefault("hedge_min_ms", 0)
+    return UpstreamPool("test", [f"http://{h}" for h in hosts], timeout=1.0, **kwargs)
+
+
+def test_transport_error_fails_over_to_next_backend(fake):
+    fake.behaviour = {"a": (0, None), "b": (0, 200)}
+    pool = _pool("a", "b")
+    response = asyncio.run(pool.get("/x"))
+    assert response.status_code == 200
+    assert fake.calls == ["a", "b"]
+
+
+def test_every_backend_5xx_returns_last_response(fake):
+    fake.behaviour = {"a": (0, 503), "b": (0, 502)}
+    pool = _pool("a", "b")
+    assert asyncio.run(pool.get()).status_code == 502
+
+
+def test_4xx_counts_as_healthy(fake):
+    fake.behaviour = {"a": (0, 404)}
+    pool = _pool("a", breaker_failures=1)
+    assert asyncio.run(pool.get()).status_code == 404
+    assert pool.backends[0].state == CLOSED
+
+
+def test_breaker_opens_then_probe_closes_it(fake):
+    fake.behaviour = {"a": (0, None), "b": (0, 200)}
+    pool = _pool("a", "b", breaker_failures=2, cooldown=60)
+    a = pool.backends[0]
+    for _ in range(2):
+        a.ewma = 0.0                        # keep "a" ranked first until it trips
+        asyncio.run(pool.get())
+    assert a.state == OPEN
+
+    fake.calls.clear()
+    asyncio.run(pool.get())
+    assert fake.calls == ["b"]              # skipped while cooling down
+
+    a.opened_at -= 60                       # cooldown over
+    fake.behaviour["a"] = (0, 200)
+    fake.calls.clear()
+    asyncio.run(pool.get())
+    assert fake.calls == ["a"]              # the probe goes first
+    assert a.state == CLOSED and not a.trial_running
+
+
+def test_failed_probe_reopens(fake):
+    fake.behaviour = {"a": (0, None), "b": (0, 200)}
+    pool = _pool("a", "b", cooldown=60)
+    a = pool.backends[0]
+    a.state, a.opened_at = OPEN, -1000.0
+    asyncio.run(pool.get())
+    assert a.state == OPEN and not a.trial_running
+    assert a.opened_at > 0
+
+
+def test_only_one_concurrent_request_probes(fake):
+    fake.behaviour = {"a": (0.05, 200), "b": (0.05, 200), "c": (0, 200)}
+    pool = _pool("a", "b", "c", hedge_percentile=0)
+    for backend in pool.backends[:2]:
+        backend.state, backend.opened_at = OPEN, -1000.0
+
+    async def main():
+        await asyncio.gather(*(pool.get() for _ in range(4)))
+
+    asyncio.run(main())
+    # Each tripped backend is probed once; the other requests went to "c"
+    assert sorted(fake.calls) == ["a", "b", "c", "c"]
+    assert [b.state for b in pool.backends] == [CLOSED, CLOSED, CLOSED]
+
+
+def test_selection_views_have_no_side_effects(fake):
+    pool = _pool("a", "b", cooldown=60)
+    a, b = pool.backends
+    a.state, a.opened_at = OPEN, -1000.0
+    assert pool.primary_url() == "http://b"
+    assert pool.primary_url() == "http://b"
+    assert a.state == OPEN and not a.trial_running
+
+    order = pool._candidates()
+    assert order == [a, b]
+    assert a.state == HALF_OPEN and a.trial_running
+    assert pool._candidates() == [b]        # already claimed
+
+
+def test_all_open_raises(fake):
+    pool = _pool("a", cooldown=60)
+    pool.backends[0].state, pool.backends[0].opened_at = OPEN, 1e18
+    with pytest.raises(NoBackendAvailable):
+        asyncio.run(pool.get())
+
+
+def test_slow_primary_is_hedged(fake):
+    fake.behaviour = {"a": (0.5, 200), "b": (0, 200)}
+    pool = _pool("a", "b", hedge_percentile=50)
+    pool._latencies.extend([0.01] * 20)
+    pool.backends[0].ewma, pool.backends[1].ewma = 0.001, 0.002
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        response = await pool.get()
+        return response, loop.time() - start
+
+    response, elapsed = asyncio.run(main())
+    assert response.status_code == 200
+    assert fake.calls == ["a", "b"]
+    assert elapsed < 0.4                    # did not wait for "a"
+    assert pool.backends[0].inflight == 0   # the loser was cancelled